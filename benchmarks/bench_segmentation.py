@@ -0,0 +1,58 @@
+"""Time PythonSegmenter.segment on generated modules of increasing size.
+
+    python benchmarks/bench_segmentation.py [line counts...]
+
+The generated modules contain long runs of methods without blank lines
+between them, the shape of generated code that made lookbacks quadratic.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from gitspect.segmentation.python_segmentation import PythonSegmenter  # noqa: E402
+
+
+def generated_module(line_count: int, methods_per_class: int = 500) -> list[str]:
+    lines = []
+    ci = 0
+    while len(lines) < line_count:
+        lines.append(f"class Generated{ci}:")
+        for mi in range(methods_per_class):
+            lines.append(f"    @property")
+            lines.append(f"    def value_{mi}(self):")
+            lines.append(f"        return {mi}")
+        lines.append("")
+        ci += 1
+    return lines[:line_count]
+
+
+def time_segmentation(lines: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        PythonSegmenter("generated.py", lines).segment()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("line_counts", nargs="*", type=int, default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.DEBUG)
+    for line_count in args.line_counts:
+        elapsed = time_segmentation(generated_module(line_count), args.repeat)
+        print(
+            f"{line_count:>9} lines  {elapsed * 1000:9.1f} ms"
+            f"  {line_count / elapsed:12,.0f} lines/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
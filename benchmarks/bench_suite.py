@@ -0,0 +1,359 @@
+"""Benchmark repository traversal and segmentation on synthetic git repositories.
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --compare results.json
+
+A repository is generated with git fast-import from the given shape (commit,
+file and line counts, linear history or merged topic branches) and cached in
+the work directory, so runs with the same parameters time the same objects.
+Inputs (sampled commit and blob ids) are chosen once up front, and every
+benchmark runs in a fresh process that reports its peak RSS from the start
+of the workload and how much the workload raised it. With --compare,
+timings are checked against an earlier JSON report of the same backend and
+the exit status is 1 when any benchmark is slower by more than --threshold.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from gitspect.respository import GitRepository, PackRepository  # noqa: E402
+from gitspect.segmentation.python_segmentation import PythonSegmenter  # noqa: E402
+
+backends = {"git": GitRepository, "pack": PackRepository}
+benchmark_names = [
+    "commits",
+    "commits_between",
+    "list_diff_files",
+    "read_blob",
+    "segment",
+]
+
+
+def generate_repository(
+    path: Path,
+    commits: int,
+    files: int,
+    file_lines: int,
+    changes_per_commit: int,
+    shape: str,
+    merge_every: int,
+    seed: int,
+):
+    """Create a repository at ``path`` with git fast-import.
+
+    With the "merges" shape every ``merge_every``-th commit on main merges a
+    topic branch holding two commits of its own.
+    """
+    rng = random.Random(seed)
+    versions = [0] * files
+    stream = []
+    mark = 0
+    main_tip = None
+    timestamp = 1_700_000_000
+
+    def commit(ref: str, parents: list[int], changed: list[int], message: str) -> int:
+        nonlocal mark, timestamp
+        mark += 1
+        timestamp += 60
+        stream.append(f"commit {ref}\nmark :{mark}\n")
+        stream.append(f"author Bench Author <author@example.com> {timestamp} +0000\n")
+        stream.append(f"committer Bench Committer <c@example.com> {timestamp} +0000\n")
+        stream.append(_data(message))
+        for pi, parent in enumerate(parents):
+            stream.append(f"{'from' if pi == 0 else 'merge'} :{parent}\n")
+        for fi in changed:
+            versions[fi] += 1
+            content = _module(fi, versions[fi], file_lines)
+            stream.append(f"M 644 inline pkg/module_{fi}.py\n{_data(content)}")
+        stream.append("\n")
+        return mark
+
+    made = 0
+    topic = 0
+    while made < commits:
+        merge = shape == "merges" and main_tip is not None and made + 3 <= commits
+        if merge and (made + 1) % merge_every == 0:
+            ref = f"refs/heads/topic-{topic}"
+            tip = main_tip
+            for _ in range(2):
+                tip = commit(ref, [tip], rng.sample(range(files), 1), f"topic {topic}")
+            main_tip = commit(
+                "refs/heads/main", [main_tip, tip], [], f"merge topic {topic}"
+            )
+            topic += 1
+            made += 3
+        else:
+            changed = range(files) if main_tip is None else None
+            if changed is None:
+                changed = rng.sample(range(files), min(changes_per_commit, files))
+            parents = [] if main_tip is None else [main_tip]
+            main_tip = commit("refs/heads/main", parents, changed, f"commit {made}")
+            made += 1
+    path.mkdir(parents=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    subprocess.run(
+        ["git", "-C", str(path), "fast-import", "--quiet"],
+        input="".join(stream).encode(),
+        check=True,
+    )
+    subprocess.run(
+        ["git", "-C", str(path), "symbolic-ref", "HEAD", "refs/heads/main"], check=True
+    )
+
+
+def _data(text: str) -> str:
+    encoded = text.encode()
+    return f"data {len(encoded)}\n{text}\n"
+
+
+def _module(file_index: int, version: int, line_count: int) -> str:
+    lines = [f'"""Module {file_index}, version {version}."""', ""]
+    fi = 0
+    while len(lines) < line_count:
+        lines.extend(
+            [
+                "",
+                f"def function_{fi}(value):",
+                f"    result = value * {fi + version}",
+                "    if result > 100:",
+                "        return result - 100",
+                "    return result",
+            ]
+        )
+        fi += 1
+    return "\n".join(lines[:line_count]) + "\n"
+
+
+def prepare_inputs(backend: str, path: Path, sample: int) -> dict:
+    """The commit and blob ids the benchmarks work on."""
+    with backends[backend](path) as repo:
+        commit_ids = [c.commit_id for c in repo.commits()]
+        sampled = commit_ids[:: max(len(commit_ids) // sample, 1)][:sample]
+        blob_ids = [f.blob_id for c in sampled for f in repo.list_diff_files(c)]
+    return {
+        "middle": commit_ids[len(commit_ids) // 2],
+        "sampled": sampled,
+        "blob_ids": blob_ids[:sample],
+    }
+
+
+def run_benchmark(name: str, backend: str, path: Path, repeat: int, inputs: dict):
+    repo = backends[backend](path)
+    try:
+        return _measure(name, repo, repeat, **inputs)
+    finally:
+        repo.close()
+
+
+def _measure(
+    name: str, repo, repeat: int, middle: str, sampled: list[str], blob_ids: list[str]
+) -> dict:
+    # segmenting starts from decoded lines, so reading them is setup
+    texts = (
+        [repo.read_blob(b).split("\n") for b in blob_ids] if name == "segment" else []
+    )
+
+    # every workload returns the number of units it processed
+    def commits():
+        return sum(1 for _ in repo.commits())
+
+    def commits_between():
+        return sum(1 for _ in repo.commits_between(middle))
+
+    def list_diff_files():
+        return sum(len(repo.list_diff_files(c)) for c in sampled)
+
+    def read_blob():
+        return sum(len(repo.read_blob(b)) for b in blob_ids)
+
+    def segment():
+        return sum(
+            len(PythonSegmenter("bench.py", lines).segment().segments())
+            for lines in texts
+        )
+
+    work = {
+        "commits": commits,
+        "commits_between": commits_between,
+        "list_diff_files": list_diff_files,
+        "read_blob": read_blob,
+        "segment": segment,
+    }[name]
+    _reset_peak_rss()
+    rss_before = _peak_rss_kb()
+    best = float("inf")
+    units = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        units = work()
+        best = min(best, time.perf_counter() - started)
+    return {
+        "seconds": best,
+        "units": units,
+        "units_per_second": units / best if best else 0.0,
+        "unit": _units[name],
+        "peak_rss_kb": _peak_rss_kb(),
+        # how far the workload raised the peak above the process after setup
+        "workload_rss_kb": _peak_rss_kb() - rss_before,
+        "peak_git_rss_kb": _rss_kb(resource.RUSAGE_CHILDREN),
+    }
+
+
+_units = {
+    "commits": "commits",
+    "commits_between": "commits",
+    "list_diff_files": "files",
+    "read_blob": "characters",
+    "segment": "segments",
+}
+
+
+def _rss_kb(who: int) -> int:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _peak_rss_kb() -> int:
+    # Linux carries ru_maxrss over an exec, so a spawned process would report
+    # its parent's peak; VmHWM starts afresh.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return _rss_kb(resource.RUSAGE_SELF)
+
+
+def _reset_peak_rss():
+    # lowers VmHWM to the current RSS on Linux; elsewhere the setup's peak
+    # stays in the reported peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"{'benchmark':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<24}{'-':>12}{result['seconds'] * 1000:>10.1f}ms")
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<24}{before['seconds'] * 1000:>10.1f}ms"
+            f"{result['seconds'] * 1000:>10.1f}ms{change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=2000)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--file-lines", type=int, default=400)
+    parser.add_argument("--changes-per-commit", type=int, default=3)
+    parser.add_argument("--shape", choices=["linear", "merges"], default="merges")
+    parser.add_argument("--merge-every", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=sorted(backends), default="git")
+    parser.add_argument(
+        "--benchmarks", nargs="*", choices=benchmark_names, default=benchmark_names
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument(
+        "--work-dir", type=Path, default=Path(tempfile.gettempdir()) / "gitspect-bench"
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    shape = {
+        "commits": args.commits,
+        "files": args.files,
+        "file_lines": args.file_lines,
+        "changes_per_commit": args.changes_per_commit,
+        "shape": args.shape,
+        "merge_every": args.merge_every,
+        "seed": args.seed,
+    }
+    key = hashlib.sha1(json.dumps(shape, sort_keys=True).encode()).hexdigest()[:12]
+    path = args.work_dir / f"repo-{key}"
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"]["backend"] != args.backend:
+            parser.error(
+                f"{args.compare} has results of the {baseline['meta']['backend']}"
+                f" backend, not {args.backend}"
+            )
+    if not path.exists():
+        print(f"generating {path}", file=sys.stderr)
+        generate_repository(path, **shape)
+    inputs = prepare_inputs(args.backend, path, args.sample)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": subprocess.run(
+                ["git", "--version"], capture_output=True, text=True
+            ).stdout.strip(),
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "sample": args.sample,
+            "repository": shape,
+        },
+        "results": {},
+    }
+    for name in args.benchmarks:
+        # a fresh process per benchmark keeps peak RSS attributable
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(
+                run_benchmark, name, args.backend, path, args.repeat, inputs
+            ).result()
+        results["results"][name] = result
+        print(
+            f"{name:<18}{result['seconds'] * 1000:10.1f} ms"
+            f"{result['units_per_second']:14,.0f} {result['unit']}/s"
+            f"{result['peak_rss_kb'] / 1024:9.1f} MiB"
+            f"{result['workload_rss_kb'] / 1024:+9.1f} MiB",
+            file=sys.stderr,
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if baseline is not None:
+        if baseline["meta"]["repository"] != shape:
+            print("warning: baseline used a different repository", file=sys.stderr)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
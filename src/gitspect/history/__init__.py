@@ -0,0 +1,4 @@
+from ._parallel import *
+from ._lineage import *
+from ._scanner import *
+from ._clones import *
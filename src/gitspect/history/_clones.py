@@ -0,0 +1,365 @@
+import functools
+import hashlib
+import keyword
+import operator
+import re
+import sqlite3
+from array import array
+from collections import namedtuple
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from gitspect.model import Document
+from gitspect.respository import BlobId, CommitId, GitRepository
+from gitspect.segmentation import SegmenterRegistry, default_registry
+
+__all__ = ["CloneSegment", "CloneMatch", "CloneIndex", "CloneTracker"]
+
+CloneSegment = namedtuple("CloneSegment", "commit_id, path, start, end")
+CloneMatch = namedtuple("CloneMatch", "fingerprint_id, similarity, segments")
+
+_deleted_blob_ids = {"0" * 40, "0" * 64}
+
+_token = re.compile(
+    r"""
+    (?P<string>[rRbBuUfF]{0,2}(?:'''[\s\S]*?'''|\"\"\"[\s\S]*?\"\"\"
+        |'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"))
+    |(?P<comment>\#[^\n]*)
+    |(?P<number>\.?\d[\w.]*)
+    |(?P<name>[^\W\d]\w*)
+    |(?P<operator>[^\w\s])
+    """,
+    re.X,
+)
+_keywords = frozenset(keyword.kwlist + keyword.softkwlist)
+_empty_bin = 1 << 32
+
+_schema = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint_id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    key INTEGER NOT NULL,
+    fingerprint_id INTEGER NOT NULL,
+    PRIMARY KEY (key, fingerprint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS segments (
+    fingerprint_id INTEGER NOT NULL,
+    commit_id TEXT,
+    path TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    UNIQUE (fingerprint_id, path)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class CloneIndex:
+    """Near-duplicate search over segments with MinHash and LSH banding.
+
+    A segment's tokens are normalized (names, strings and numbers replaced by
+    placeholders, comments dropped) and cut into shingles of
+    ``shingle_size`` tokens. Its MinHash signature comes from one
+    permutation hashing: every shingle is hashed once into one of
+    ``num_perm`` bins, each bin keeps its lowest hash, and empty bins copy a
+    filled one (optimal densification). Two signatures agree at a position
+    with a probability close to the Jaccard similarity of the shingle sets.
+    Signatures are split into ``bands`` and a segment is a candidate match
+    when any band is equal, which a lookup per band finds without scanning
+    the index.
+
+    Segments with the same normalized tokens share one fingerprint, which
+    keeps the first position of each path and the commit it was added in.
+    Segments of fewer than ``min_tokens`` tokens are not indexed.
+    """
+
+    def __init__(
+        self,
+        path: Path = None,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        min_tokens: int = 20,
+    ):
+        if num_perm % bands:
+            raise ValueError(
+                f"bands must divide num_perm, num_perm={num_perm}, bands={bands}"
+            )
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(":memory:" if path is None else path)
+        self._db.executescript(_schema)
+        self._num_perm = num_perm
+        self._rows = num_perm // bands
+        self._shingle_size = shingle_size
+        self._min_tokens = min_tokens
+        self._check_parameters(
+            {"num_perm": num_perm, "bands": bands, "shingle_size": shingle_size}
+        )
+
+    def signature(self, lines: Sequence[str]) -> array | None:
+        """The MinHash signature of ``lines``, None below ``min_tokens``."""
+        tokens = _normalized_tokens("\n".join(lines))
+        if len(tokens) < max(self._min_tokens, self._shingle_size):
+            return None
+        return self._signature(tokens)
+
+    def add(
+        self,
+        lines: Sequence[str],
+        path: str,
+        start: int,
+        end: int,
+        commit_id: CommitId = None,
+    ) -> int | None:
+        """Index one segment; its fingerprint id, or None if it is too short."""
+        tokens = _normalized_tokens("\n".join(lines))
+        if len(tokens) < max(self._min_tokens, self._shingle_size):
+            return None
+        digest = _digest(tokens)
+        row = self._db.execute(
+            "SELECT fingerprint_id FROM fingerprints WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            signature = self._signature(tokens)
+            fingerprint_id = self._db.execute(
+                "INSERT INTO fingerprints (digest, signature) VALUES (?, ?)",
+                (digest, signature.tobytes()),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT OR IGNORE INTO buckets VALUES (?, ?)",
+                ((key, fingerprint_id) for key in self._band_keys(signature)),
+            )
+        else:
+            fingerprint_id = row[0]
+        self._db.execute(
+            "INSERT OR IGNORE INTO segments VALUES (?, ?, ?, ?, ?)",
+            (fingerprint_id, commit_id, path, start, end),
+        )
+        return fingerprint_id
+
+    def add_document(
+        self, document: Document, commit_id: CommitId = None
+    ) -> list[int | None]:
+        return [
+            self.add(view, document.document_name, view.start, view.end, commit_id)
+            for view in document.views()
+        ]
+
+    def similar(
+        self, lines: Sequence[str], threshold: float = 0.8, limit: int = None
+    ) -> list[CloneMatch]:
+        """Fingerprints estimated at least ``threshold`` similar to ``lines``.
+
+        Most similar first. Pairs below the banding threshold, about
+        ``(1 / bands) ** (1 / rows)``, are likely to be missed.
+        """
+        signature = self.signature(lines)
+        if signature is None:
+            return []
+        return self._matches(signature, threshold, limit)
+
+    def similar_to(
+        self, fingerprint_id: int, threshold: float = 0.8, limit: int = None
+    ) -> list[CloneMatch]:
+        """Like ``similar``, for an indexed fingerprint and without itself."""
+        row = self._db.execute(
+            "SELECT signature FROM fingerprints WHERE fingerprint_id = ?",
+            (fingerprint_id,),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown fingerprint {fingerprint_id}")
+        return self._matches(_unpack(row[0]), threshold, limit, fingerprint_id)
+
+    def segments(self, fingerprint_id: int) -> list[CloneSegment]:
+        rows = self._db.execute(
+            "SELECT commit_id, path, start, end FROM segments"
+            " WHERE fingerprint_id = ? ORDER BY rowid",
+            (fingerprint_id,),
+        )
+        return [CloneSegment(*row) for row in rows]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    @property
+    def last_commit(self) -> CommitId | None:
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = 'last_commit'"
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def mark_commit(self, commit_id: CommitId):
+        """Record ``commit_id`` as ``last_commit`` and write pending changes."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('last_commit', ?)", (commit_id,)
+        )
+        self._db.commit()
+
+    def flush(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _signature(self, tokens: list[str]) -> array:
+        size = self._shingle_size
+        shingles = {
+            "\x1f".join(tokens[ti : ti + size]) for ti in range(len(tokens) - size + 1)
+        }
+        num_perm = self._num_perm
+        bins = [_empty_bin] * num_perm
+        for shingle in shingles:
+            digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+            value, bin_index = divmod(int.from_bytes(digest, "little"), num_perm)
+            value &= 0xFFFFFFFF
+            if value < bins[bin_index]:
+                bins[bin_index] = value
+        signature = array("I", bytes(4 * num_perm))
+        for bi, value in enumerate(bins):
+            if value == _empty_bin:
+                # probe until a filled bin; the probes depend only on the bin,
+                # so equal shingle sets fill their empty bins alike
+                attempt = 0
+                while bins[(source := _probe(num_perm, bi, attempt))] == _empty_bin:
+                    attempt += 1
+                value = bins[source]
+            signature[bi] = value
+        return signature
+
+    def _band_keys(self, signature: array) -> list[int]:
+        rows = self._rows
+        keys = []
+        for band, start in enumerate(range(0, len(signature), rows)):
+            digest = hashlib.blake2b(
+                signature[start : start + rows].tobytes(),
+                digest_size=8,
+                salt=band.to_bytes(16, "little"),
+            ).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    def _matches(
+        self,
+        signature: array,
+        threshold: float,
+        limit: int | None,
+        exclude: int = None,
+    ) -> list[CloneMatch]:
+        keys = self._band_keys(signature)
+        candidates = self._db.execute(
+            "SELECT DISTINCT f.fingerprint_id, f.signature"
+            " FROM buckets b JOIN fingerprints f USING (fingerprint_id)"
+            f" WHERE b.key IN ({', '.join('?' * len(keys))})",
+            keys,
+        )
+        scored = []
+        for fingerprint_id, packed in candidates:
+            if fingerprint_id == exclude:
+                continue
+            agreeing = sum(map(operator.eq, signature, _unpack(packed)))
+            similarity = agreeing / self._num_perm
+            if similarity >= threshold:
+                scored.append((similarity, fingerprint_id))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [
+            CloneMatch(fingerprint_id, similarity, self.segments(fingerprint_id))
+            for similarity, fingerprint_id in scored[:limit]
+        ]
+
+    def _check_parameters(self, parameters: dict[str, int]):
+        for key, value in parameters.items():
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._db.execute("INSERT INTO meta VALUES (?, ?)", (key, str(value)))
+            elif int(row[0]) != value:
+                raise ValueError(
+                    f"The index was built with {key}={row[0]}, not {value}"
+                )
+        self._db.commit()
+
+
+class CloneTracker:
+    """Adds the segments of every file changed along history to an index."""
+
+    def __init__(
+        self,
+        repo: GitRepository,
+        index: CloneIndex,
+        registry: SegmenterRegistry = None,
+    ):
+        self._repo = repo
+        self._index = index
+        self._registry = registry or default_registry
+
+    def track(self, commit_ids: Iterable[CommitId]):
+        """Index the files changed by ``commit_ids``, in order."""
+        for commit_id, files in self._repo.diff_files(commit_ids, root=True):
+            # a copied file adds one blob under several paths
+            changed: dict[BlobId, list[str]] = {}
+            for f in files:
+                path = f.posix_path
+                if f.blob_id not in _deleted_blob_ids and self._registry.supports(path):
+                    changed.setdefault(f.blob_id, []).append(path)
+            for blob_id, data in self._repo.read_blobs_bytes(changed):
+                for path in changed[blob_id]:
+                    segmenter = self._registry.segmenter_for(path)
+                    document = segmenter.from_bytes(path, data, errors="replace")
+                    self._index.add_document(document.segment(), commit_id)
+            self._index.mark_commit(commit_id)
+
+    def track_between(self, start: CommitId = None, end: CommitId = None):
+        """Index the commits after ``start`` up to ``end``, oldest first.
+
+        ``start`` defaults to the index's ``last_commit``, which resumes an
+        earlier run.
+        """
+        start = start or self._index.last_commit
+        if start is None:
+            raise ValueError("The index has no last commit to resume from")
+        commit_ids = [c.commit_id for c in self._repo.commits_between(start, end)]
+        self.track(reversed(commit_ids))
+
+
+def _normalized_tokens(text: str) -> list[str]:
+    tokens = []
+    for match in _token.finditer(text):
+        kind = match.lastgroup
+        if kind == "name":
+            name = match.group()
+            tokens.append(name if name in _keywords else "N")
+        elif kind == "string":
+            tokens.append("S")
+        elif kind == "number":
+            tokens.append("0")
+        elif kind == "operator":
+            tokens.append(match.group())
+    return tokens
+
+
+@functools.cache
+def _probe(num_perm: int, bin_index: int, attempt: int) -> int:
+    digest = hashlib.blake2b(f"{bin_index}:{attempt}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_perm
+
+
+def _digest(tokens: list[str]) -> bytes:
+    return hashlib.blake2b("\x1f".join(tokens).encode(), digest_size=16).digest()
+
+
+def _unpack(packed: bytes) -> array:
+    signature = array("I")
+    signature.frombytes(packed)
+    return signature
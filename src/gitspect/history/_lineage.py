@@ -0,0 +1,314 @@
+import difflib
+import hashlib
+import re
+import sqlite3
+from collections import namedtuple
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from gitspect.model import Document
+from gitspect.respository import BlobId, CommitId, GitRepository
+from gitspect.segmentation import SegmenterRegistry
+from gitspect.segmentation._utils import indent_len
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+
+__all__ = ["SegmentVersion", "LiveSegment", "LineageIndex", "LineageTracker"]
+
+SegmentVersion = namedtuple(
+    "SegmentVersion", "lineage_id, commit_id, path, qualname, start, end"
+)
+
+LiveSegment = namedtuple("LiveSegment", "lineage_id, qualname, content_hash, text")
+_NamedSegment = namedtuple("_NamedSegment", "qualname, name, start, end, text")
+
+_definition = re.compile(r"^\s*(?:async\s+)?(?:def|class)\s+(\w+)")
+_deleted_blob_ids = {"0" * 40, "0" * 64}
+
+_schema = """
+CREATE TABLE IF NOT EXISTS versions (
+    lineage_id INTEGER NOT NULL,
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_lineage ON versions (lineage_id);
+CREATE INDEX IF NOT EXISTS versions_qualname ON versions (qualname);
+CREATE INDEX IF NOT EXISTS versions_name ON versions (name);
+CREATE TABLE IF NOT EXISTS live_segments (
+    path TEXT NOT NULL,
+    lineage_id INTEGER NOT NULL,
+    qualname TEXT NOT NULL,
+    content_hash BLOB NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS live_segments_path ON live_segments (path);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class LineageIndex:
+    def __init__(self, path: Path = None):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(":memory:" if path is None else path)
+        self._db.executescript(_schema)
+
+    def versions(self, lineage_id: int) -> list[SegmentVersion]:
+        rows = self._db.execute(
+            "SELECT lineage_id, commit_id, path, qualname, start, end FROM versions"
+            " WHERE lineage_id = ? ORDER BY seq",
+            (lineage_id,),
+        )
+        return [SegmentVersion(*row) for row in rows]
+
+    def lineages(self, name: str) -> list[int]:
+        """Lineages that were ever called ``name`` (qualified or not)."""
+        rows = self._db.execute(
+            "SELECT DISTINCT lineage_id FROM versions WHERE qualname = ?"
+            " UNION SELECT DISTINCT lineage_id FROM versions WHERE name = ?",
+            (name, name),
+        )
+        return sorted(row[0] for row in rows)
+
+    def commits_touching(self, name: str) -> list[CommitId]:
+        lineage_ids = self.lineages(name)
+        rows = self._db.execute(
+            "SELECT commit_id, MIN(seq) FROM versions"
+            f" WHERE lineage_id IN ({', '.join('?' * len(lineage_ids))})"
+            " GROUP BY commit_id ORDER BY MIN(seq)",
+            lineage_ids,
+        )
+        return [row[0] for row in rows]
+
+    @property
+    def last_commit(self) -> CommitId | None:
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = 'last_commit'"
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def mark_commit(self, commit_id: CommitId):
+        """Record ``commit_id`` as ``last_commit`` and write pending changes."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('last_commit', ?)", (commit_id,)
+        )
+        self._db.commit()
+
+    def live_segments(self, path: str) -> list[LiveSegment]:
+        """The segments of ``path`` as of ``last_commit``."""
+        rows = self._db.execute(
+            "SELECT lineage_id, qualname, content_hash, text FROM live_segments"
+            " WHERE path = ?",
+            (path,),
+        )
+        return [LiveSegment(*row) for row in rows]
+
+    def replace_live_segments(self, path: str, segments: Iterable[LiveSegment]):
+        self._db.execute("DELETE FROM live_segments WHERE path = ?", (path,))
+        self._db.executemany(
+            "INSERT INTO live_segments VALUES (?, ?, ?, ?, ?)",
+            ((path, *s) for s in segments),
+        )
+
+    def new_lineage_id(self) -> int:
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = 'next_lineage_id'"
+        ).fetchone()
+        lineage_id = 0 if row is None else int(row[0])
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('next_lineage_id', ?)",
+            (str(lineage_id + 1),),
+        )
+        return lineage_id
+
+    def add_version(self, version: SegmentVersion):
+        """Append ``version`` to its lineage."""
+        self._db.execute(
+            "INSERT INTO versions"
+            " (lineage_id, commit_id, path, qualname, name, start, end)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                version.lineage_id,
+                version.commit_id,
+                version.path,
+                version.qualname,
+                version.qualname.rpartition(".")[2],
+                version.start,
+                version.end,
+            ),
+        )
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LineageTracker:
+    def __init__(
+        self,
+        repo: GitRepository,
+        index: LineageIndex,
+        segmenter: type[PythonSegmenter] = PythonSegmenter,
+        similarity: float = 0.6,
+        suffixes: Sequence[str] = (".py",),
+        registry: SegmenterRegistry = None,
+    ):
+        self._repo = repo
+        self._index = index
+        self._similarity = similarity
+        # a registry replaces segmenter and suffixes
+        self._registry = registry or SegmenterRegistry(
+            {suffix: segmenter for suffix in suffixes}
+        )
+
+    def track(self, commit_ids: Iterable[CommitId]):
+        """Match segments through ``commit_ids``, parents before children."""
+        for commit_id, files in self._repo.diff_files(commit_ids, root=True):
+            # a commit may add one blob under several paths
+            changed: dict[BlobId, list[str]] = {}
+            for f in files:
+                path = f.posix_path
+                if not self._registry.supports(path):
+                    continue
+                if f.blob_id in _deleted_blob_ids:
+                    self._index.replace_live_segments(path, [])
+                else:
+                    changed.setdefault(f.blob_id, []).append(path)
+            for blob_id, text in self._repo.read_blobs(changed):
+                lines = text.split("\n")
+                # another suffix may segment the same blob differently
+                segmented = {}
+                for path in changed[blob_id]:
+                    segmenter = self._registry.segmenter_for(path)
+                    if segmenter not in segmented:
+                        document = segmenter(path, lines).segment()
+                        segmented[segmenter] = _named_segments(document)
+                    self._track_file(commit_id, path, segmented[segmenter])
+            self._index.mark_commit(commit_id)
+
+    def track_between(self, start: CommitId = None, end: CommitId = None):
+        """Match segments through the commits after ``start`` up to ``end``.
+
+        ``start`` defaults to the index's ``last_commit``, which resumes an
+        earlier run.
+        """
+        start = start or self._index.last_commit
+        if start is None:
+            raise ValueError("The index has no last commit to resume from")
+        commit_ids = [c.commit_id for c in self._repo.commits_between(start, end)]
+        self.track(reversed(commit_ids))
+
+    def _track_file(
+        self, commit_id: CommitId, path: str, segments: list[_NamedSegment]
+    ):
+        previous = self._index.live_segments(path)
+        hashes = [_content_hash(s.text) for s in segments]
+        matches: list[LiveSegment | None] = [None] * len(segments)
+        unmatched = list(previous)
+
+        # exact content first, then the same qualified name, then similar text
+        for key in (
+            lambda s, h, p: p.content_hash == h,
+            lambda s, h, p: p.qualname == s.qualname,
+        ):
+            for si, segment in enumerate(segments):
+                if matches[si] is None:
+                    for p in unmatched:
+                        if key(segment, hashes[si], p):
+                            matches[si] = p
+                            unmatched.remove(p)
+                            break
+        for si, segment in enumerate(segments):
+            if matches[si] is None and unmatched:
+                best = self._most_similar(segment.text, unmatched)
+                if best is not None:
+                    matches[si] = best
+                    unmatched.remove(best)
+
+        live = []
+        for segment, content_hash, match in zip(segments, hashes, matches):
+            if match is None:
+                lineage_id = self._index.new_lineage_id()
+            else:
+                lineage_id = match.lineage_id
+            if match is None or match.content_hash != content_hash:
+                self._index.add_version(
+                    SegmentVersion(
+                        lineage_id,
+                        commit_id,
+                        path,
+                        segment.qualname,
+                        segment.start,
+                        segment.end,
+                    )
+                )
+            live.append(
+                LiveSegment(lineage_id, segment.qualname, content_hash, segment.text)
+            )
+        self._index.replace_live_segments(path, live)
+
+    def _most_similar(
+        self, text: str, candidates: list[LiveSegment]
+    ) -> LiveSegment | None:
+        # the matcher caches what it learns about its second sequence
+        matcher = difflib.SequenceMatcher(None, b=text, autojunk=False)
+        best = None
+        bound = self._similarity
+        for candidate in candidates:
+            matcher.set_seq1(candidate.text)
+            # both quick ratios are upper bounds of ratio()
+            if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= bound and (best is None or ratio > bound):
+                best, bound = candidate, ratio
+        return best
+
+
+def _named_segments(document: Document) -> list[_NamedSegment]:
+    named = []
+    # the last segment spans the whole module
+    for view in list(document.views())[:-1]:
+        name = _definition_name(view)
+        if name is not None and view.start >= 0:
+            named.append((view.start, view.end, name, view))
+    # qualify names by the segments that contain them
+    named.sort(key=lambda n: (n[0], -n[1]))
+    segments = []
+    enclosing = []
+    for start, end, name, view in named:
+        while enclosing and not (start >= enclosing[-1][0] and end <= enclosing[-1][1]):
+            enclosing.pop()
+        qualname = ".".join([e[2] for e in enclosing] + [name])
+        enclosing.append((start, end, name))
+        segments.append(_NamedSegment(qualname, name, start, end, view.text()))
+    return segments
+
+
+def _definition_name(lines: Sequence[str]) -> str | None:
+    # The header is the least indented line of a segment; lines looked back
+    # over (decorators, preceding statements) share its indent, so the last
+    # definition at that indent is the one the segment belongs to.
+    indents = [(indent_len(line), line) for line in lines if line.strip()]
+    if not indents:
+        return None
+    header_indent = min(indent for indent, _ in indents)
+    name = None
+    for indent, line in indents:
+        if indent == header_indent and (match := _definition.match(line)):
+            name = match.group(1)
+    return name
+
+
+def _content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
@@ -0,0 +1,165 @@
+import multiprocessing
+from array import array
+import time
+from collections import deque, namedtuple
+from collections.abc import Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Tuple
+
+from gitspect.model import BlobLines, Document, SegmentTable
+from gitspect.respository import CommitId, GitRepository
+from gitspect.segmentation import SegmenterRegistry
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+
+__all__ = ["HistoryDocument", "SegmentationStats", "HistorySegmenter"]
+
+HistoryDocument = namedtuple("HistoryDocument", "commit_id, path, document")
+
+_deleted_blob_ids = {"0" * 40, "0" * 64}
+
+
+class SegmentationStats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.segments = 0
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(files={self.files}, segments={self.segments}, "
+            f"elapsed={self.elapsed:.3f}s, files/s={self.files_per_second:.1f})"
+        )
+
+    __repr__ = __str__
+
+
+class HistorySegmenter:
+    def __init__(
+        self,
+        repo: GitRepository,
+        max_workers: int = None,
+        chunk_size: int = 32,
+        max_pending_chunks: int = None,
+        ordered: bool = True,
+        segmenter: type[PythonSegmenter] = PythonSegmenter,
+        suffixes: Sequence[str] = (".py",),
+        registry: SegmenterRegistry = None,
+    ):
+        self._repo = repo
+        self._max_workers = max_workers or multiprocessing.cpu_count()
+        self._chunk_size = chunk_size
+        self._max_pending_chunks = max_pending_chunks or 2 * self._max_workers
+        self._ordered = ordered
+        # a registry replaces segmenter and suffixes
+        self._registry = registry or SegmenterRegistry(
+            {suffix: segmenter for suffix in suffixes}
+        )
+        self.stats = SegmentationStats()
+
+    def segment(self, commit_ids: Iterable[CommitId]) -> Iterable[HistoryDocument]:
+        started = time.perf_counter()
+        pending: deque[Tuple[Future, list]] = deque()
+        # spawn rather than fork: the parent holds threads draining git pipes
+        with ProcessPoolExecutor(
+            self._max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            try:
+                for chunk in self.file_chunks(commit_ids):
+                    future = executor.submit(_segment_chunk, self._registry, chunk)
+                    pending.append((future, chunk))
+                    # backpressure: never hold more than max_pending_chunks
+                    # chunks of blob text in flight
+                    while len(pending) >= self._max_pending_chunks:
+                        yield from self._collect(pending, started)
+                while pending:
+                    yield from self._collect(pending, started)
+            finally:
+                for future, _ in pending:
+                    future.cancel()
+                self.stats.elapsed = time.perf_counter() - started
+
+    def segment_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> Iterable[HistoryDocument]:
+        yield from self.segment(
+            c.commit_id for c in self._repo.commits_between(start, end)
+        )
+
+    def file_chunks(
+        self, commit_ids: Iterable[CommitId]
+    ) -> Iterable[list[Tuple[CommitId, str, bytes]]]:
+        """``(commit_id, path, data)`` of the files ``commit_ids`` change.
+
+        Files without a segmenter and deletions are left out. Files come in
+        commit order, ``chunk_size`` or more at a time, whole commits per
+        chunk.
+        """
+        files = []
+        # the root commit's files count as added
+        for commit_id, diff_files in self._repo.diff_files(commit_ids, root=True):
+            for f in diff_files:
+                if (
+                    self._registry.supports(f.posix_path)
+                    and f.blob_id not in _deleted_blob_ids
+                ):
+                    files.append((commit_id, f.posix_path, f.blob_id))
+            if len(files) >= self._chunk_size:
+                yield self._read(files)
+                files = []
+        if files:
+            yield self._read(files)
+
+    def _read(
+        self, files: list[Tuple[CommitId, str, str]]
+    ) -> list[Tuple[CommitId, str, bytes]]:
+        blobs = dict(self._repo.read_blobs_bytes(blob_id for _, _, blob_id in files))
+        return [(commit_id, path, blobs[blob_id]) for commit_id, path, blob_id in files]
+
+    def _collect(
+        self, pending: deque[Tuple[Future, list]], started: float
+    ) -> Iterable[HistoryDocument]:
+        if self._ordered:
+            future, chunk = pending.popleft()
+        else:
+            done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+            index = next(i for i, (f, _) in enumerate(pending) if f in done)
+            future, chunk = pending[index]
+            del pending[index]
+        for (commit_id, path, data), (starts, ends) in zip(chunk, future.result()):
+            document = _history_document(commit_id, path, data, starts, ends)
+            self.stats.files += 1
+            self.stats.bytes += len(data)
+            self.stats.segments += len(document.document.segments())
+            self.stats.elapsed = time.perf_counter() - started
+            yield document
+
+
+def _history_document(
+    commit_id: CommitId, path: str, data: bytes, starts: array, ends: array
+) -> HistoryDocument:
+    # lines are decoded only when a consumer reads them
+    segments = SegmentTable(path, starts, ends)
+    return HistoryDocument(
+        commit_id, Path(path), Document(path, BlobLines(data), segments)
+    )
+
+
+def _segment_chunk(
+    registry: SegmenterRegistry, chunk: list[Tuple[CommitId, str, bytes]]
+) -> list[Tuple[array, array]]:
+    results = []
+    for commit_id, path, data in chunk:
+        segmenter = registry.segmenter_for(path)
+        segments = segmenter.from_bytes(path, data).segment().segments()
+        results.append((segments.starts, segments.ends))
+    return results
@@ -0,0 +1,297 @@
+import multiprocessing
+import sqlite3
+import time
+from collections import deque, namedtuple
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+
+from gitspect.respository import GitRepository
+from gitspect.segmentation import SegmenterRegistry
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+
+from ._parallel import HistorySegmenter, _history_document, _segment_chunk
+
+__all__ = [
+    "ScanTarget",
+    "ScanDocument",
+    "RepositoryScan",
+    "ScanCheckpoint",
+    "RepositoryScanner",
+]
+
+ScanTarget = namedtuple("ScanTarget", "path, since", defaults=(None,))
+ScanDocument = namedtuple("ScanDocument", "repository, commit_id, path, document")
+RepositoryScan = namedtuple(
+    "RepositoryScan", "repository, status, files, segments, seconds, error"
+)
+
+_schema = """
+CREATE TABLE IF NOT EXISTS repositories (
+    repository TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    segments INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    error TEXT
+);
+"""
+
+
+class ScanCheckpoint:
+    """Outcome of every repository a scan has finished, kept in SQLite."""
+
+    def __init__(self, path: Path = None):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(":memory:" if path is None else path)
+        self._db.executescript(_schema)
+
+    def record(self, scan: RepositoryScan):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO repositories VALUES (?, ?, ?, ?, ?, ?)",
+                (str(scan.repository), *scan[1:]),
+            )
+
+    def scans(self) -> dict[Path, RepositoryScan]:
+        rows = self._db.execute("SELECT * FROM repositories ORDER BY rowid")
+        return {Path(row[0]): RepositoryScan(Path(row[0]), *row[1:]) for row in rows}
+
+    def completed(self) -> set[Path]:
+        rows = self._db.execute(
+            "SELECT repository FROM repositories WHERE status = 'done'"
+        )
+        return {Path(row[0]) for row in rows}
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class RepositoryScanner:
+    """Segments the changed files of many repositories with shared pools.
+
+    Up to ``max_repositories`` repositories are scanned at once, each with at
+    most two git processes (``diff-tree`` and ``cat-file``) fed from a shared
+    thread pool. Their chunks go to one pool of ``max_workers`` segmentation
+    processes, and every repository may have only ``chunks_per_repository``
+    chunks in that pool, so a large repository cannot starve the others.
+    Files are segmented by their ``registry`` segmenter, or by ``segmenter``
+    when their suffix is one of ``suffixes``.
+
+    A repository whose scan takes longer than ``timeout`` seconds is given
+    up. Repositories recorded as done in ``checkpoint`` are skipped, which
+    resumes an interrupted scan; a repository interrupted half-way is
+    scanned again from its start.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        max_repositories: int = 4,
+        chunk_size: int = 32,
+        chunks_per_repository: int = 2,
+        timeout: float = None,
+        checkpoint: ScanCheckpoint = None,
+        segmenter: type[PythonSegmenter] = PythonSegmenter,
+        suffixes: Sequence[str] = (".py",),
+        registry: SegmenterRegistry = None,
+    ):
+        self._max_workers = max_workers or multiprocessing.cpu_count()
+        self._max_repositories = max_repositories
+        self._chunk_size = chunk_size
+        self._chunks_per_repository = chunks_per_repository
+        self._timeout = timeout
+        self.checkpoint = checkpoint or ScanCheckpoint()
+        self._registry = registry or SegmenterRegistry(
+            {suffix: segmenter for suffix in suffixes}
+        )
+
+    def scan(self, targets: Iterable[Path | ScanTarget]) -> Iterable[ScanDocument]:
+        """Documents of every target, interleaved between repositories.
+
+        A target is a repository path, scanning all its commits, or a
+        ``ScanTarget`` scanning the commits since ``since``. Documents of one
+        repository come in commit order; its outcome is in ``checkpoint``
+        once its last document has been yielded.
+        """
+        completed = self.checkpoint.completed()
+        queue = deque(
+            target
+            for target in (
+                t if isinstance(t, ScanTarget) else ScanTarget(t) for t in targets
+            )
+            if target.path.absolute() not in completed
+        )
+        active: list[_RepositoryState] = []
+        # spawn rather than fork: the parent holds threads draining git pipes
+        with ThreadPoolExecutor(self._max_repositories) as readers, ProcessPoolExecutor(
+            self._max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as workers:
+            try:
+                while queue or active:
+                    while queue and len(active) < self._max_repositories:
+                        active.append(self._open(queue.popleft()))
+                    for state in active:
+                        self._schedule(state, readers, workers)
+                    futures = [f for state in active for f in state.futures()]
+                    if futures:
+                        wait(
+                            futures,
+                            timeout=self._wait_timeout(active),
+                            return_when=FIRST_COMPLETED,
+                        )
+                    for state in list(active):
+                        yield from self._advance(state)
+                        if state.finished():
+                            state.close()
+                            active.remove(state)
+            finally:
+                for state in active:
+                    state.cancel()
+                for state in active:
+                    # a running read holds the repository's git processes
+                    if state.read is not None:
+                        wait([state.read])
+                    state.close()
+
+    def _open(self, target: ScanTarget) -> "_RepositoryState":
+        path = target.path.absolute()
+        state = _RepositoryState(path, self.checkpoint, self._timeout)
+        try:
+            state.repo = GitRepository(path, lazy=True)
+        except ValueError as e:
+            state.abandon("failed", str(e))
+            return state
+        segmenter = HistorySegmenter(
+            state.repo,
+            chunk_size=self._chunk_size,
+            registry=self._registry,
+        )
+        if target.since is None:
+            commit_ids = (c.commit_id for c in state.repo.commits())
+        else:
+            commit_ids = (c.commit_id for c in state.repo.commits_between(target.since))
+        state.chunks = segmenter.file_chunks(commit_ids)
+        return state
+
+    def _schedule(
+        self,
+        state: "_RepositoryState",
+        readers: ThreadPoolExecutor,
+        workers: ProcessPoolExecutor,
+    ):
+        if state.outcome is not None:
+            return
+        if state.read is not None and state.read.done():
+            read, state.read = state.read, None
+            try:
+                chunk = read.result()
+            except Exception as e:
+                state.abandon("failed", str(e) or type(e).__name__)
+                return
+            if chunk is None:
+                state.exhausted = True
+            else:
+                future = workers.submit(_segment_chunk, self._registry, chunk)
+                state.pending.append((future, chunk))
+        if (
+            state.read is None
+            and not state.exhausted
+            and len(state.pending) < self._chunks_per_repository
+        ):
+            state.read = readers.submit(next, state.chunks, None)
+
+    def _advance(self, state: "_RepositoryState") -> Iterable[ScanDocument]:
+        if state.outcome is None and state.expired():
+            state.abandon("timeout", f"timed out after {self._timeout}s")
+        while state.outcome is None and state.pending and state.pending[0][0].done():
+            future, chunk = state.pending.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                state.abandon("failed", str(e) or type(e).__name__)
+                break
+            for (commit_id, path, data), (starts, ends) in zip(chunk, results):
+                document = _history_document(commit_id, path, data, starts, ends)
+                state.files += 1
+                state.segments += len(document.document.segments())
+                yield ScanDocument(state.path, *document)
+        if state.outcome is None and state.exhausted and not state.pending:
+            state.finish("done")
+
+    def _wait_timeout(self, active: list["_RepositoryState"]) -> float | None:
+        deadlines = [s.deadline for s in active if s.deadline and s.outcome is None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.0)
+
+
+class _RepositoryState:
+    def __init__(self, path: Path, checkpoint: ScanCheckpoint, timeout: float | None):
+        self.path = path
+        self.repo: GitRepository | None = None
+        self.chunks: Iterator[list] | None = None
+        self.read: Future | None = None
+        self.pending: deque[tuple[Future, list]] = deque()
+        self.exhausted = False
+        self.outcome: RepositoryScan | None = None
+        self.files = 0
+        self.segments = 0
+        self._checkpoint = checkpoint
+        self._started = time.monotonic()
+        self.deadline = None if timeout is None else self._started + timeout
+
+    def futures(self) -> list[Future]:
+        if self.outcome is not None:
+            return [self.read] if self.read is not None else []
+        pending = [self.pending[0][0]] if self.pending else []
+        return pending + ([self.read] if self.read is not None else [])
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def finish(self, status: str, error: str = None):
+        self.outcome = RepositoryScan(
+            self.path,
+            status,
+            self.files,
+            self.segments,
+            time.monotonic() - self._started,
+            error,
+        )
+        self._checkpoint.record(self.outcome)
+
+    def abandon(self, status: str, error: str):
+        if self.outcome is None:
+            self.cancel()
+            self.finish(status, error)
+
+    def cancel(self):
+        for future, _ in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+    def finished(self) -> bool:
+        # an abandoned repository is released once its running read returns
+        return self.outcome is not None and (self.read is None or self.read.done())
+
+    def close(self):
+        if self.chunks is not None:
+            self.chunks.close()
+            self.chunks = None
+        if self.repo is not None:
+            self.repo.close()
+            self.repo = None
@@ -0,0 +1 @@
+from ._instrumentation import *
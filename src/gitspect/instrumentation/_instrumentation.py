@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from collections.abc import Callable, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TextIO
+
+__all__ = [
+    "GitCommandEvent",
+    "SegmentationEvent",
+    "Collector",
+    "CounterCollector",
+    "JsonLinesCollector",
+    "CallbackCollector",
+    "add_collector",
+    "remove_collector",
+    "instrumented",
+    "enabled",
+    "trace_command",
+    "record_segmentation",
+]
+
+GitCommandEvent = namedtuple(
+    "GitCommandEvent", "command, args, seconds, processes, bytes_read, records"
+)
+SegmentationEvent = namedtuple(
+    "SegmentationEvent", "document_name, seconds, lines, segments"
+)
+
+# Checked on every git call and segmentation; kept as a tuple so the check is
+# a truth test and readers never see a list mid-update.
+_collectors: tuple = ()
+_collectors_lock = threading.Lock()
+
+
+class Collector(ABC):
+    """Receives ``GitCommandEvent`` and ``SegmentationEvent`` records.
+
+    Events are sent from whichever thread ran the work; events from worker
+    processes are not collected.
+    """
+
+    @abstractmethod
+    def record(self, event: GitCommandEvent | SegmentationEvent):
+        pass
+
+
+class CounterCollector(Collector):
+    """Sums events per git subcommand and over all segmentations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._seconds = None
+        self.commands: dict[str, dict[str, float]] = {}
+        self.segmentation = {"documents": 0, "seconds": 0.0, "lines": 0, "segments": 0}
+
+    def record(self, event: GitCommandEvent | SegmentationEvent):
+        with self._lock:
+            if isinstance(event, GitCommandEvent):
+                counts = self.commands.setdefault(
+                    event.command,
+                    {
+                        "calls": 0,
+                        "processes": 0,
+                        "seconds": 0.0,
+                        "bytes_read": 0,
+                        "records": 0,
+                    },
+                )
+                counts["calls"] += 1
+                counts["processes"] += event.processes
+                counts["seconds"] += event.seconds
+                counts["bytes_read"] += event.bytes_read
+                counts["records"] += event.records
+            else:
+                counts = self.segmentation
+                counts["documents"] += 1
+                counts["seconds"] += event.seconds
+                counts["lines"] += event.lines
+                counts["segments"] += event.segments
+
+    def stop(self):
+        if self._seconds is None:
+            self._seconds = time.perf_counter() - self._started
+
+    @property
+    def seconds(self) -> float:
+        """Wall time from creation until ``stop``, or until now."""
+        if self._seconds is None:
+            return time.perf_counter() - self._started
+        return self._seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "seconds": self.seconds,
+                "commands": {k: dict(v) for k, v in self.commands.items()},
+                "segmentation": dict(self.segmentation),
+            }
+
+    def summary(self) -> str:
+        report = self.as_dict()
+        lines = [
+            f"{'git command':<16}{'calls':>8}{'procs':>8}"
+            f"{'seconds':>10}{'MiB read':>10}{'records':>10}"
+        ]
+        for command, counts in sorted(
+            report["commands"].items(), key=lambda item: -item[1]["seconds"]
+        ):
+            lines.append(
+                f"{command:<16}{counts['calls']:>8}{counts['processes']:>8}"
+                f"{counts['seconds']:>10.3f}{counts['bytes_read'] / 2**20:>10.2f}"
+                f"{counts['records']:>10}"
+            )
+        seg = report["segmentation"]
+        lines.append(
+            f"segmentation: {seg['documents']} documents, {seg['lines']} lines, "
+            f"{seg['segments']} segments in {seg['seconds']:.3f}s"
+        )
+        lines.append(f"total wall time: {report['seconds']:.3f}s")
+        return "\n".join(lines)
+
+
+class JsonLinesCollector(Collector):
+    """Writes every event as a JSON object on its own line."""
+
+    def __init__(self, output: TextIO | Path):
+        self._owns_output = isinstance(output, Path)
+        self._output = output.open("a") if self._owns_output else output
+        self._lock = threading.Lock()
+
+    def record(self, event: GitCommandEvent | SegmentationEvent):
+        line = json.dumps({"event": type(event).__name__, **event._asdict()})
+        with self._lock:
+            self._output.write(line + "\n")
+
+    def close(self):
+        if self._owns_output:
+            self._output.close()
+
+
+class CallbackCollector(Collector):
+    def __init__(self, callback: Callable[[GitCommandEvent | SegmentationEvent], None]):
+        self._callback = callback
+
+    def record(self, event: GitCommandEvent | SegmentationEvent):
+        self._callback(event)
+
+
+def add_collector(collector: Collector):
+    global _collectors
+    with _collectors_lock:
+        _collectors = (*_collectors, collector)
+
+
+def remove_collector(collector: Collector):
+    global _collectors
+    with _collectors_lock:
+        _collectors = tuple(c for c in _collectors if c is not collector)
+
+
+def enabled() -> bool:
+    return bool(_collectors)
+
+
+@contextmanager
+def instrumented(*collectors: Collector):
+    """Collect events for the duration of the block.
+
+    Yields a ``CounterCollector`` for the run, whose ``summary()`` is the run's
+    report; ``collectors`` receive the same events.
+    """
+    counter = CounterCollector()
+    for collector in (counter, *collectors):
+        add_collector(collector)
+    try:
+        yield counter
+    finally:
+        counter.stop()
+        for collector in (counter, *collectors):
+            remove_collector(collector)
+
+
+class _CommandTrace:
+    __slots__ = ("args", "started", "processes", "bytes_read", "records")
+
+    def __init__(self, args: Sequence[str], processes: int):
+        self.args = args
+        self.started = time.perf_counter()
+        self.processes = processes
+        self.bytes_read = 0
+        self.records = 0
+
+    def finish(self):
+        _emit(
+            GitCommandEvent(
+                _subcommand(self.args),
+                list(self.args),
+                time.perf_counter() - self.started,
+                self.processes,
+                self.bytes_read,
+                self.records,
+            )
+        )
+
+
+def trace_command(args: Sequence[str], processes: int = 1) -> _CommandTrace | None:
+    """A trace to fill in and ``finish``, or None when nothing is collected."""
+    if not _collectors:
+        return None
+    return _CommandTrace(args, processes)
+
+
+def record_segmentation(document_name: str, started: float, lines: int, segments: int):
+    _emit(
+        SegmentationEvent(document_name, time.perf_counter() - started, lines, segments)
+    )
+
+
+def _emit(event: GitCommandEvent | SegmentationEvent):
+    for collector in _collectors:
+        collector.record(event)
+
+
+def _subcommand(args: Sequence[str]) -> str:
+    # skip "git" and its global options, "-C <path>" and "-c <name=value>"
+    ai = 1
+    while ai < len(args):
+        arg = args[ai]
+        if arg in ("-C", "-c"):
+            ai += 2
+        elif arg.startswith("-"):
+            ai += 1
+        else:
+            return arg
+    return args[0] if args else ""
@@ -1 +1,3 @@
 from ._document import *
+from ._blob_lines import *
+from ._hunk import *
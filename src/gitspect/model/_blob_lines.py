@@ -0,0 +1,56 @@
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+__all__ = ["BlobLines"]
+
+
+class BlobLines(Sequence[str]):
+    """Lines of a blob's bytes, decoded only when they are read.
+
+    Lines are split on ``\\n`` and keep everything else, ``\\r`` included; a
+    final newline does not start another line. Random access builds an index
+    of line offsets on first use, while iterating decodes the whole buffer
+    at once, so ``encoding`` must be ASCII compatible.
+    """
+
+    def __init__(self, data: bytes, encoding: str = "utf-8", errors: str = "strict"):
+        self._data = data
+        self.encoding = encoding
+        self.errors = errors
+        self._starts: array | None = None
+        self._length = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+
+    @property
+    def data(self) -> bytes:
+        return self._data
+
+    def line_bytes(self, index: int) -> bytes:
+        starts = self._line_starts()
+        index = range(self._length)[index]
+        # the next line starts one byte past this line's newline
+        return self._data[starts[index] : starts[index + 1] - 1]
+
+    def text(self) -> str:
+        return "\n".join(self)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(self._length)[index]]
+        return self.line_bytes(index).decode(self.encoding, self.errors)
+
+    def __iter__(self):
+        text = self._data.decode(self.encoding, self.errors)
+        lines = text.split("\n")
+        if len(lines) > 1 and not lines[-1]:
+            lines.pop()
+        return iter(lines)
+
+    def _line_starts(self) -> array:
+        if self._starts is None:
+            lengths = (len(line) + 1 for line in self._data.split(b"\n"))
+            self._starts = array("q", accumulate(lengths, initial=0))
+        return self._starts
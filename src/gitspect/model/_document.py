@@ -1,10 +1,11 @@
-from collections.abc import Sequence
+from array import array
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 
-__all__ = ["Segment", "Document"]
+__all__ = ["Segment", "SegmentTable", "SegmentView", "Document"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Segment:
     start: int
     end: int
@@ -19,17 +20,133 @@ class Segment:
         )
 
 
+class SegmentTable(Sequence[Segment]):
+    # Offsets are signed: the segment closing a module may look back from
+    # the last line, which yields a negative start.
+    def __init__(
+        self, document_name: str, starts: Iterable[int] = (), ends: Iterable[int] = ()
+    ):
+        self.document_name = document_name
+        self._starts = array("i", starts)
+        self._ends = array("i", ends)
+        if len(self._starts) != len(self._ends):
+            raise ValueError(
+                "starts and ends differ in length, "
+                f"{len(self._starts)} != {len(self._ends)}"
+            )
+
+    @classmethod
+    def from_segments(
+        cls, document_name: str, segments: Iterable[Segment]
+    ) -> "SegmentTable":
+        table = cls(document_name)
+        for s in segments:
+            table.append(s.start, s.end)
+        return table
+
+    @property
+    def starts(self) -> array:
+        return self._starts
+
+    @property
+    def ends(self) -> array:
+        return self._ends
+
+    def append(self, start: int, end: int):
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def spans(self) -> Iterable[tuple[int, int]]:
+        return zip(self._starts, self._ends)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SegmentTable(
+                self.document_name, self._starts[index], self._ends[index]
+            )
+        return Segment(self._starts[index], self._ends[index], self.document_name)
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield Segment(start, end, self.document_name)
+
+    def __contains__(self, segment):
+        return (
+            isinstance(segment, Segment)
+            and segment.document_name == self.document_name
+            and any(
+                start == segment.start and end == segment.end
+                for start, end in self.spans()
+            )
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, SegmentTable):
+            return (
+                self.document_name == other.document_name
+                and self._starts == other._starts
+                and self._ends == other._ends
+            )
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.document_name}, {list(self.spans())})"
+
+    __repr__ = __str__
+
+
+class SegmentView(Sequence[str]):
+    """Lines of one segment, read from the document without copying them."""
+
+    def __init__(self, lines: Sequence[str], start: int, end: int):
+        self._lines = lines
+        self._indices = range(len(lines))[start:end]
+        self.start = start
+        self.end = end
+
+    def text(self) -> str:
+        return "\n".join(self)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._lines[i] for i in self._indices[index]]
+        return self._lines[self._indices[index]]
+
+    def __iter__(self):
+        lines = self._lines
+        for i in self._indices:
+            yield lines[i]
+
+
 class Document:
     def __init__(
-        self, document_name: str, lines: Sequence[str], segments: Sequence[Segment]
+        self,
+        document_name: str,
+        lines: Sequence[str],
+        segments: Sequence[Segment] | SegmentTable,
     ):
         self.document_name = document_name
         self._lines = lines
+        if not isinstance(segments, SegmentTable):
+            segments = SegmentTable.from_segments(document_name, segments)
         self._segments = segments
 
-    def segments(self) -> Sequence[Segment]:
+    def lines(self) -> Sequence[str]:
+        return self._lines
+
+    def segments(self) -> SegmentTable:
         return self._segments
 
+    def views(self) -> Iterable[SegmentView]:
+        for start, end in self._segments.spans():
+            yield SegmentView(self._lines, start, end)
+
     def __iter__(self):
         for s in self._segments:
             yield self._lines[s.start : s.end]
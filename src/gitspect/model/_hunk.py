@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+
+__all__ = ["Hunk"]
+
+
+@dataclass
+class Hunk:
+    """A changed range of lines, as in a unified diff's ``@@`` header.
+
+    Starts are 1-based; a range of length 0 starts at the line before it.
+    ``added`` and ``removed`` hold the numbers of the changed lines.
+    """
+
+    old_start: int
+    old_length: int
+    new_start: int
+    new_length: int
+    added: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
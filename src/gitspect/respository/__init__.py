@@ -1,3 +1,14 @@
 from ._git_repository import *
 from ._git_commit import *
+from ._git_file import *
+from ._git_diff import *
+from ._trees import *
+from ._commit_graph import *
+from ._object_id import *
+from ._commit_batch import *
 from ._abc import *
+from ._diff import *
+from ._indexed_repository import *
+from ._async_git_repository import *
+from ._object_store import *
+from ._pack_repository import *
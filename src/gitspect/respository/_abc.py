@@ -1,14 +1,28 @@
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections import namedtuple
+from collections.abc import Iterable, Sequence
+from datetime import datetime
 from pathlib import Path
 
-__all__ = ["CommitId", "BlobId", "Commit", "RepositoryFile", "Repository"]
+__all__ = [
+    "CommitId",
+    "BlobId",
+    "Signature",
+    "Commit",
+    "RepositoryFile",
+    "Diff",
+    "Repository",
+]
 
 CommitId = str
 BlobId = str
 
+Signature = namedtuple("Signature", "name, email, time")
+
 
 class Commit(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def commit_id(self) -> CommitId:
@@ -19,15 +33,39 @@ class Commit(ABC):
     def message(self) -> str:
         pass
 
+    @property
+    @abstractmethod
+    def parents(self) -> Sequence[CommitId]:
+        pass
+
+    @property
+    @abstractmethod
+    def author(self) -> Signature | None:
+        pass
+
+    @property
+    @abstractmethod
+    def committer(self) -> Signature | None:
+        pass
+
 
 class RepositoryFile(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def path(self) -> Path:
         pass
 
+    @property
+    def posix_path(self) -> str:
+        """``path`` as git writes it, without building a ``Path``."""
+        return self.path.as_posix()
+
 
 class Diff(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def before_file(self) -> RepositoryFile:
@@ -47,7 +85,16 @@ class Repository(ABC):
 
     @abstractmethod
     def commits(
-        self, start: int = 0, end: int = None, reverse: bool = False
+        self,
+        start: int = 0,
+        end: int = None,
+        reverse: bool = False,
+        *,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        author: str = None,
+        paths: Sequence[Path | str] = (),
+        first_parent: bool = False,
     ) -> Iterable[Commit]:
         pass
 
@@ -59,6 +106,18 @@ class Repository(ABC):
     def list_diff_files(self, commit_id: CommitId) -> Iterable[RepositoryFile]:
         pass
 
+    @abstractmethod
+    def files_at(self, commit_id: CommitId) -> Iterable[RepositoryFile]:
+        pass
+
+    @abstractmethod
+    def diff_between(self, old: CommitId, new: CommitId) -> Iterable[Diff]:
+        pass
+
     @abstractmethod
     def read_blob(self, blob_id: BlobId) -> str:
         pass
+
+    @abstractmethod
+    def read_blob_bytes(self, blob_id: BlobId) -> bytes:
+        pass
@@ -0,0 +1,324 @@
+import os
+from collections.abc import AsyncIterable, Callable, Iterable, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple
+
+from gitspect.instrumentation import trace_command
+
+from ._abc import BlobId, Commit, CommitId, Diff, Repository, RepositoryFile
+from ._git_blob_reader import _validate_blob_id
+from ._git_file import GitRepositoryFile
+from ._git_repository import (
+    CommitRecordParser,
+    _blob_text,
+    _commit_filter_args,
+    _commit_path_args,
+    _commits_format,
+    _git_diffs,
+    _parse_diff_entries,
+    _record_separator,
+    _validate_window,
+    _window_args,
+)
+from ._trees import TreeCache, TreeWalk, walk_diff, walk_files
+
+if TYPE_CHECKING:
+    import asyncio
+
+__all__ = ["AsyncGitRepository"]
+
+_default_max_processes = 4
+_chunk_size = 64 * 1024
+
+
+class AsyncGitRepository(Repository):
+    """``Repository`` whose git calls run as asyncio subprocesses.
+
+    At most ``max_processes`` git processes are alive per repository; further
+    calls wait for a slot. Streaming calls hold their slot until the iterator
+    is exhausted or closed.
+    """
+
+    def __init__(self, path: Path, max_processes: int = _default_max_processes):
+        # asyncio is imported on use, it would double the package import time
+        import asyncio
+
+        self._path = path
+        self._processes = asyncio.Semaphore(max_processes)
+        self._trees = TreeCache()
+
+    @classmethod
+    async def open(
+        cls, path: Path, max_processes: int = _default_max_processes
+    ) -> "AsyncGitRepository":
+        repo = cls(path, max_processes)
+        try:
+            output = await repo._run("rev-parse", "--is-inside-work-tree")
+        except ValueError:
+            output = b""
+        if output.decode().strip() != "true":
+            raise ValueError("Not a git repository path")
+        return repo
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    async def commits(
+        self,
+        start: int = 0,
+        end: int = None,
+        reverse: bool = False,
+        *,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        author: str = None,
+        paths: Sequence[Path | str] = (),
+        first_parent: bool = False,
+    ) -> AsyncIterable[Commit]:
+        _validate_window(start, end)
+        filter_args = _commit_filter_args(since, until, author, first_parent)
+        path_args = _commit_path_args(paths)
+        total = None
+        if reverse:
+            output = await self._run(
+                "rev-list", "--all", "--count", *filter_args, *path_args
+            )
+            total = int(output)
+        window_args = _window_args(start, end, reverse, total)
+        if window_args is None:
+            return
+        parser = CommitRecordParser(self)
+        async for record in self._stream_records(
+            _record_separator,
+            "rev-list",
+            "--all",
+            "--no-commit-header",
+            f"--format={_commits_format}",
+            *filter_args,
+            *window_args,
+            *path_args,
+        ):
+            if record:
+                yield parser.parse_record(record)
+
+    async def commits_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> AsyncIterable[Commit]:
+        parser = CommitRecordParser(self)
+        async for record in self._stream_records(
+            _record_separator,
+            "rev-list",
+            "--no-commit-header",
+            f"--format={_commits_format}",
+            f"{start}..{end or ''}",
+        ):
+            if record:
+                yield parser.parse_record(record)
+
+    async def list_diff_files(self, commit_id: CommitId) -> list[RepositoryFile]:
+        output = await self._run(
+            "diff-tree", "--no-commit-id", "--no-renames", "-r", "-z", commit_id
+        )
+        return list(_parse_diff_entries(self, output.split(b"\x00")[:-1]))
+
+    async def files_at(self, commit_id: CommitId) -> list[RepositoryFile]:
+        files = await self._walk_trees(
+            [commit_id], lambda tree: walk_files(self._trees, tree)
+        )
+        return [
+            GitRepositoryFile(self, os.fsdecode(path), blob_id)
+            for path, _, blob_id in files
+        ]
+
+    async def diff_between(self, old: CommitId, new: CommitId) -> list[Diff]:
+        changes = await self._walk_trees(
+            [old, new],
+            lambda old_tree, new_tree: walk_diff(self._trees, old_tree, new_tree),
+        )
+        return _git_diffs(self, changes)
+
+    async def read_blob(self, blob_id: BlobId) -> str:
+        return _blob_text(await self.read_blob_bytes(blob_id))
+
+    async def read_blobs(
+        self, blob_ids: Iterable[BlobId]
+    ) -> AsyncIterable[Tuple[BlobId, str]]:
+        async for blob_id, content in self.read_blobs_bytes(blob_ids):
+            yield blob_id, _blob_text(content)
+
+    async def read_blob_bytes(self, blob_id: BlobId) -> bytes:
+        # exhaust the iterator so its process slot is released right away
+        (content,) = [c async for _, c in self.read_blobs_bytes([blob_id])]
+        return content
+
+    async def read_blobs_bytes(
+        self, blob_ids: Iterable[BlobId]
+    ) -> AsyncIterable[Tuple[BlobId, bytes]]:
+        blob_ids = [_validate_blob_id(blob_id) for blob_id in blob_ids]
+        if not blob_ids:
+            return
+        async with self._processes:
+            process = await self._spawn("cat-file", "--batch")
+            trace = trace_command(["git", "cat-file", "--batch"])
+            writer = _create_task(_write_lines(process, blob_ids))
+            try:
+                for blob_id in blob_ids:
+                    header = await process.stdout.readline()
+                    fields = header.split()
+                    if len(fields) != 3:
+                        raise ValueError(f"Blob {blob_id} could not be read")
+                    content = await process.stdout.readexactly(int(fields[2]))
+                    await process.stdout.readexactly(1)
+                    if trace is not None:
+                        trace.records += 1
+                        trace.bytes_read += len(content)
+                    yield blob_id, content
+                await writer
+            finally:
+                writer.cancel()
+                await _finish(process)
+                if trace is not None:
+                    trace.finish()
+
+    async def _walk_trees(
+        self, revisions: list[str], start: Callable[..., TreeWalk]
+    ) -> list:
+        # one cat-file process answers every round of tree reads
+        async with self._processes:
+            process = await self._spawn("cat-file", "--batch")
+            try:
+                roots = []
+                revisions = [f"{revision}^{{tree}}" for revision in revisions]
+                for _, tree_id, _, content in await _read_objects(process, revisions):
+                    if self._trees.get(tree_id) is None:
+                        self._trees.add(tree_id, content)
+                    roots.append(tree_id)
+                walk = start(*roots)
+                try:
+                    tree_ids = next(walk)
+                    while True:
+                        objects = await _read_objects(process, tree_ids)
+                        tree_ids = walk.send(
+                            {
+                                tree_id: _tree(tree_id, *rest)
+                                for _, tree_id, *rest in objects
+                            }
+                        )
+                except StopIteration as done:
+                    return done.value
+            finally:
+                await _finish(process)
+
+    async def _run(self, *args: str) -> bytes:
+        async with self._processes:
+            trace = trace_command(["git", *args])
+            process = await self._spawn(*args)
+            stdout, stderr = await process.communicate()
+        if trace is not None:
+            trace.bytes_read = len(stdout)
+            trace.finish()
+        if process.returncode != 0 or stderr:
+            raise ValueError(stderr.decode().strip())
+        return stdout
+
+    async def _stream_records(
+        self, separator: bytes, *args: str
+    ) -> AsyncIterable[bytes]:
+        async with self._processes:
+            trace = trace_command(["git", *args])
+            process = await self._spawn(*args)
+            stderr = _create_task(process.stderr.read())
+            try:
+                pending = b""
+                while chunk := await process.stdout.read(_chunk_size):
+                    *records, pending = (pending + chunk).split(separator)
+                    if trace is not None:
+                        trace.bytes_read += len(chunk)
+                        trace.records += len(records)
+                    for record in records:
+                        yield record
+                if pending:
+                    if trace is not None:
+                        trace.records += 1
+                    yield pending
+                errors = await stderr
+                await process.wait()
+                if process.returncode != 0 or errors:
+                    raise ValueError(errors.decode().strip())
+            finally:
+                stderr.cancel()
+                await _finish(process)
+                if trace is not None:
+                    trace.finish()
+
+    async def _spawn(self, *args: str) -> "asyncio.subprocess.Process":
+        import asyncio
+
+        return await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            self._path.absolute().as_posix(),
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+
+def _create_task(coroutine) -> "asyncio.Task":
+    import asyncio
+
+    return asyncio.create_task(coroutine)
+
+
+async def _read_objects(
+    process: "asyncio.subprocess.Process", names: list[str]
+) -> list[Tuple[str, str, str, bytes]]:
+    names = [_validate_blob_id(name) for name in names]
+    process.stdin.write("".join(f"{name}\n" for name in names).encode())
+    # responses are read while the requests drain, so neither side blocks
+    drain = _create_task(process.stdin.drain())
+    try:
+        objects = []
+        for name in names:
+            fields = (await process.stdout.readline()).split()
+            if len(fields) != 3:
+                raise ValueError(f"Object {name} could not be read")
+            content = await process.stdout.readexactly(int(fields[2]))
+            await process.stdout.readexactly(1)
+            objects.append((name, fields[0].decode(), fields[1].decode(), content))
+        await drain
+    finally:
+        drain.cancel()
+    return objects
+
+
+def _tree(tree_id: str, type_name: str, content: bytes) -> bytes:
+    if type_name != "tree":
+        raise ValueError(f"Object {tree_id} is a {type_name}, not a tree")
+    return content
+
+
+async def _write_lines(process: "asyncio.subprocess.Process", lines: Iterable[str]):
+    try:
+        for line in lines:
+            process.stdin.write(f"{line}\n".encode())
+            await process.stdin.drain()
+        process.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+async def _finish(process: "asyncio.subprocess.Process"):
+    # an iterator closed early leaves git running; stop it before
+    # releasing its slot
+    if process.returncode is None:
+        if not process.stdin.is_closing():
+            process.stdin.close()
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            pass
+    await process.wait()
@@ -0,0 +1,128 @@
+from array import array
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from ._abc import Commit, CommitId, Repository, Signature
+from ._git_commit import GitCommit
+from ._object_id import ObjectId, ObjectIdArray
+
+__all__ = ["CommitBatch"]
+
+
+class CommitBatch(Sequence[Commit]):
+    """Commits stored column by column rather than as one object each.
+
+    Ids and parents are packed in ``ObjectIdArray``s, signature times in
+    arrays, and each distinct name and email is kept once per batch; a
+    commit takes a few dozen bytes plus its message. Indexing builds a
+    ``GitCommit``.
+    """
+
+    def __init__(self, repo: Repository):
+        self._repo = repo
+        self.commit_ids = ObjectIdArray()
+        self._parents = ObjectIdArray()
+        self._parent_ends = array("I")
+        self._messages: list[str] = []
+        # index 0 stands for a missing signature
+        self._idents: list[Tuple[str, str] | None] = [None]
+        self._ident_index: dict[Tuple[str, str], int] = {}
+        # two per commit, author then committer
+        self._signature_idents = array("I")
+        self._signature_times = array("q")
+        self._signature_offsets = array("i")
+
+    def append(
+        self,
+        commit_id: CommitId | ObjectId,
+        parents: Sequence[CommitId | ObjectId],
+        author: Signature | None,
+        committer: Signature | None,
+        message: str | None,
+    ):
+        self.commit_ids.append(commit_id)
+        self._parents.extend(parents)
+        self._parent_ends.append(len(self._parents))
+        self._messages.append(message)
+        for signature in (author, committer):
+            self._append_signature(signature)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CommitBatch index out of range")
+        start = self._parent_ends[index - 1] if index else 0
+        return GitCommit(
+            self._repo,
+            self.commit_ids[index],
+            self._messages[index],
+            parents=self._parents[start : self._parent_ends[index]],
+            author=self._signature(2 * index),
+            committer=self._signature(2 * index + 1),
+        )
+
+    def _append_signature(self, signature: Signature | None):
+        if signature is None:
+            self._signature_idents.append(0)
+            self._signature_times.append(0)
+            self._signature_offsets.append(0)
+            return
+        ident = (signature.name, signature.email)
+        ident_index = self._ident_index.get(ident)
+        if ident_index is None:
+            ident_index = self._ident_index[ident] = len(self._idents)
+            self._idents.append(ident)
+        offset = signature.time.utcoffset()
+        self._signature_idents.append(ident_index)
+        self._signature_times.append(int(signature.time.timestamp()))
+        self._signature_offsets.append(0 if offset is None else offset // _second)
+
+    def _signature(self, si: int) -> Signature | None:
+        ident = self._idents[self._signature_idents[si]]
+        if ident is None:
+            return None
+        offset = timezone(timedelta(seconds=self._signature_offsets[si]))
+        return Signature(
+            *ident, datetime.fromtimestamp(self._signature_times[si], offset)
+        )
+
+
+_second = timedelta(seconds=1)
+
+
+def _batch_commits(
+    repo: Repository, commits: Iterable[Commit], batch_size: int
+) -> Iterable[CommitBatch]:
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, batch_size={batch_size}")
+    batch = CommitBatch(repo)
+    for commit in commits:
+        if isinstance(commit, GitCommit):
+            # the binary ids, without rendering them as hex
+            batch.append(
+                commit._commit_id,
+                commit._parents,
+                commit._author,
+                commit._committer,
+                commit._message,
+            )
+        else:
+            batch.append(
+                commit.commit_id,
+                commit.parents,
+                commit.author,
+                commit.committer,
+                commit.message,
+            )
+        if len(batch) == batch_size:
+            yield batch
+            batch = CommitBatch(repo)
+    if len(batch):
+        yield batch
@@ -0,0 +1,359 @@
+import heapq
+import struct
+from array import array
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Tuple
+
+from ._abc import CommitId
+
+__all__ = ["CommitGraph"]
+
+# parent positions in a commit-graph file's CDAT chunk
+_no_parent = 0x70000000
+_extra_edges = 0x80000000
+_position_mask = 0x7FFFFFFF
+
+# flags of the generation-ordered walks
+_reached_end = 1
+_reached_start = 2
+_stale = 4
+
+
+class CommitGraph:
+    """Parents, commit times and generation numbers of commits, in memory.
+
+    Commits are numbered in load order and their parents are kept as arrays
+    of those numbers. A commit's generation is one more than the highest
+    generation among its parents, so every ancestor of a commit has a lower
+    generation; walks are done highest generation first and stop as soon as
+    the commits left cannot change the answer.
+    """
+
+    def __init__(
+        self,
+        commit_ids: Sequence[CommitId],
+        parents: Sequence[Sequence[int]],
+        times: Sequence[int],
+        generations: Sequence[int] = None,
+    ):
+        self._commit_ids = list(commit_ids)
+        self._index = {commit_id: ci for ci, commit_id in enumerate(self._commit_ids)}
+        if len(self._index) != len(self._commit_ids):
+            raise ValueError("Duplicate commit ids")
+        offsets = array("I", [0])
+        edges = array("I")
+        for commit_parents in parents:
+            edges.extend(commit_parents)
+            offsets.append(len(edges))
+        self._offsets = offsets
+        self._edges = edges
+        self._times = array("q", times)
+        # zero marks a generation still to be computed
+        self._generations = array(
+            "I", bytes(4 * len(offsets) - 4) if generations is None else generations
+        )
+        _fill_generations(offsets, edges, self._generations)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Tuple[CommitId, Sequence[CommitId], int]],
+        base: "CommitGraph" = None,
+    ) -> "CommitGraph":
+        """A graph of ``(commit_id, parent_ids, commit_time)`` records.
+
+        With ``base`` the records are added to its commits, and records of
+        commits already in ``base`` are ignored. Every parent must be in
+        ``base`` or among the records.
+        """
+        commit_ids = [] if base is None else list(base._commit_ids)
+        index = {} if base is None else dict(base._index)
+        added = []
+        for commit_id, parent_ids, time in records:
+            if commit_id not in index:
+                index[commit_id] = len(commit_ids)
+                commit_ids.append(commit_id)
+                added.append((parent_ids, time))
+        if base is not None and not added:
+            return base
+        parents = (
+            []
+            if base is None
+            else [base._parent_indexes(ci) for ci in range(len(base))]
+        )
+        times = [] if base is None else base._times.tolist()
+        try:
+            parents.extend([index[p] for p in parent_ids] for parent_ids, _ in added)
+        except KeyError as e:
+            raise ValueError(f"Parent {e.args[0]} is not in the graph") from None
+        times.extend(time for _, time in added)
+        generations = None
+        if base is not None:
+            generations = base._generations + array("I", bytes(4 * len(added)))
+        return cls(commit_ids, parents, times, generations)
+
+    @classmethod
+    def from_file(cls, objects_dir: Path, hash_len: int = 20) -> "CommitGraph | None":
+        """The commits of ``objects_dir``'s commit-graph file, or None without one.
+
+        Both a single ``info/commit-graph`` file and a split
+        ``info/commit-graphs`` chain are read; commits written after the file
+        are not in it.
+        """
+        info_dir = objects_dir / "info"
+        paths = [info_dir / "commit-graph"]
+        chain = info_dir / "commit-graphs" / "commit-graph-chain"
+        if not paths[0].is_file():
+            if not chain.is_file():
+                return None
+            paths = [
+                info_dir / "commit-graphs" / f"graph-{layer}.graph"
+                for layer in chain.read_text().split()
+            ]
+        commit_ids = []
+        parents = []
+        times = array("q")
+        generations = array("I")
+        for path in paths:
+            # positions in a layer count the commits of the layers below it
+            _read_graph_file(
+                path.read_bytes(), hash_len, commit_ids, parents, times, generations
+            )
+        return cls(commit_ids, parents, times, generations)
+
+    def __len__(self) -> int:
+        return len(self._commit_ids)
+
+    def __contains__(self, commit_id: CommitId) -> bool:
+        return commit_id in self._index
+
+    def commit_ids(self) -> list[CommitId]:
+        return list(self._commit_ids)
+
+    def index(self, commit_id: CommitId) -> int:
+        try:
+            return self._index[commit_id]
+        except KeyError:
+            raise ValueError(f"Unknown commit {commit_id}") from None
+
+    def parents(self, commit_id: CommitId) -> Tuple[CommitId, ...]:
+        commit_ids = self._commit_ids
+        return tuple(commit_ids[p] for p in self._parent_indexes(self.index(commit_id)))
+
+    def generation(self, commit_id: CommitId) -> int:
+        return self._generations[self.index(commit_id)]
+
+    def commit_time(self, commit_id: CommitId) -> int:
+        return self._times[self.index(commit_id)]
+
+    def is_ancestor(self, ancestor: CommitId, descendant: CommitId) -> bool:
+        """Whether ``ancestor`` is reachable from ``descendant``, or is it."""
+        target = self.index(ancestor)
+        start = self.index(descendant)
+        if target == start:
+            return True
+        generations = self._generations
+        floor = generations[target]
+        if generations[start] <= floor:
+            return False
+        offsets = self._offsets
+        edges = self._edges
+        seen = {start}
+        stack = [start]
+        while stack:
+            ci = stack.pop()
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                if parent == target:
+                    return True
+                # a commit no higher than the target cannot reach it
+                if generations[parent] > floor and parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def merge_bases(self, a: CommitId, b: CommitId) -> list[CommitId]:
+        """Common ancestors of ``a`` and ``b`` that no other one descends from.
+
+        Newest commit time first, like ``git merge-base --all``.
+        """
+        start = self.index(a)
+        end = self.index(b)
+        if start == end:
+            return [a]
+        generations = self._generations
+        offsets = self._offsets
+        edges = self._edges
+        flags = {start: _reached_start, end: _reached_end}
+        queue = [(-generations[start], start), (-generations[end], end)]
+        heapq.heapify(queue)
+        active = 2
+        bases = []
+        while active:
+            _, ci = heapq.heappop(queue)
+            flag = flags[ci]
+            if not flag & _stale:
+                active -= 1
+                if flag == _reached_start | _reached_end:
+                    # every ancestor of a merge base is a redundant candidate
+                    bases.append(ci)
+                    flag |= _stale
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                old = flags.get(parent, 0)
+                new = old | flag
+                if new == old:
+                    continue
+                flags[parent] = new
+                # parents have lower generations, so they are still queued
+                if not old:
+                    heapq.heappush(queue, (-generations[parent], parent))
+                    if not new & _stale:
+                        active += 1
+                elif new & _stale and not old & _stale:
+                    active -= 1
+        times = self._times
+        bases.sort(key=lambda ci: -times[ci])
+        return [self._commit_ids[ci] for ci in bases]
+
+    def merge_base(self, a: CommitId, b: CommitId) -> CommitId | None:
+        bases = self.merge_bases(a, b)
+        return bases[0] if bases else None
+
+    def commits_between(self, start: CommitId | None, end: CommitId) -> list[CommitId]:
+        """Commits reachable from ``end`` but not from ``start``.
+
+        Like ``git rev-list --date-order start..end``: no commit before all
+        its children, otherwise newest commit time first. With ``start``
+        None every ancestor of ``end`` is listed.
+        """
+        generations = self._generations
+        offsets = self._offsets
+        edges = self._edges
+        flags = {self.index(end): _reached_end}
+        if start is not None:
+            ci = self.index(start)
+            flags[ci] = flags.get(ci, 0) | _reached_start
+        queue = [(-generations[ci], ci) for ci in flags]
+        heapq.heapify(queue)
+        active = sum(1 for flag in flags.values() if flag == _reached_end)
+        selected = []
+        while active:
+            _, ci = heapq.heappop(queue)
+            flag = flags[ci]
+            if flag == _reached_end:
+                active -= 1
+                selected.append(ci)
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                old = flags.get(parent, 0)
+                new = old | flag
+                if new == old:
+                    continue
+                flags[parent] = new
+                if not old:
+                    heapq.heappush(queue, (-generations[parent], parent))
+                    if new == _reached_end:
+                        active += 1
+                elif old == _reached_end:
+                    active -= 1
+        commit_ids = self._commit_ids
+        return [commit_ids[ci] for ci in self._date_order(selected)]
+
+    def _parent_indexes(self, ci: int) -> array:
+        return self._edges[self._offsets[ci] : self._offsets[ci + 1]]
+
+    def _date_order(self, selected: list[int]) -> list[int]:
+        offsets = self._offsets
+        edges = self._edges
+        times = self._times
+        children = dict.fromkeys(selected, 0)
+        for ci in selected:
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                if parent in children:
+                    children[parent] += 1
+        queue = [(-times[ci], ci) for ci, count in children.items() if not count]
+        heapq.heapify(queue)
+        ordered = []
+        while queue:
+            _, ci = heapq.heappop(queue)
+            ordered.append(ci)
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                if parent in children:
+                    children[parent] -= 1
+                    if not children[parent]:
+                        heapq.heappush(queue, (-times[parent], parent))
+        return ordered
+
+
+def _fill_generations(offsets: array, edges: array, generations: array):
+    # Parents mostly follow their children in load order, so a walk from the
+    # oldest commit rarely has to descend.
+    for root in reversed(range(len(generations))):
+        if generations[root]:
+            continue
+        stack = [root]
+        while stack:
+            ci = stack[-1]
+            if generations[ci]:
+                stack.pop()
+                continue
+            highest = 0
+            ready = True
+            for parent in edges[offsets[ci] : offsets[ci + 1]]:
+                generation = generations[parent]
+                if not generation:
+                    ready = False
+                    stack.append(parent)
+                elif generation > highest:
+                    highest = generation
+            if ready:
+                generations[ci] = highest + 1
+                stack.pop()
+
+
+def _read_graph_file(
+    data: bytes,
+    hash_len: int,
+    commit_ids: list[CommitId],
+    parents: list[Sequence[int]],
+    times: array,
+    generations: array,
+):
+    if data[:5] != b"CGPH\x01":
+        raise ValueError("Not a version 1 commit-graph file")
+    if data[5] != (1 if hash_len == 20 else 2):
+        raise ValueError("The commit-graph file uses another object format")
+    chunks = {}
+    for ci in range(data[6]):
+        chunk_id, offset = struct.unpack_from(">4sQ", data, 8 + 12 * ci)
+        chunks[chunk_id] = offset
+    (count,) = struct.unpack_from(">I", data, chunks[b"OIDF"] + 255 * 4)
+    oids = chunks[b"OIDL"]
+    commit_ids.extend(
+        data[oids + ci * hash_len : oids + (ci + 1) * hash_len].hex()
+        for ci in range(count)
+    )
+    edges = chunks.get(b"EDGE")
+    cdat = chunks[b"CDAT"]
+    rows = memoryview(data)[cdat : cdat + count * (hash_len + 16)]
+    for first, second, high, low in struct.iter_unpack(f">{hash_len}xIIII", rows):
+        if first == _no_parent:
+            parents.append(())
+        elif second == _no_parent:
+            parents.append((first,))
+        elif second & _extra_edges:
+            # octopus merges list their other parents in the EDGE chunk
+            commit_parents = [first]
+            offset = edges + 4 * (second & _position_mask)
+            while True:
+                (edge,) = struct.unpack_from(">I", data, offset)
+                commit_parents.append(edge & _position_mask)
+                if edge & _extra_edges:
+                    break
+                offset += 4
+            parents.append(commit_parents)
+        else:
+            parents.append((first, second))
+        # the top 30 bits are the topological level, which older git may
+        # leave zero; the low two bits are the top of the commit time
+        generations.append(high >> 2)
+        times.append((high & 3) << 32 | low)
@@ -1,12 +1,193 @@
-def parse_diff(diff):
-    for line in diff.splitlines():
-        if line.startswith("diff --git"):
-            pass
-        elif line.startswith("---"):
-            pass
-        elif line.startswith("+++"):
-            pass
-        elif line.startswith("@@"):
-            pass
-        elif line.startswith("index"):
-            pass
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from gitspect.model import Hunk
+
+from ._abc import CommitId, BlobId
+
+# Hunk lives in gitspect.model and is still exported from here
+__all__ = ["Hunk", "FileDiff", "parse_diff"]
+
+_hunk_header = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_index_line = re.compile(r"^index ([0-9a-f]+)\.\.([0-9a-f]+)(?: (\d+))?")
+_commit_line = re.compile(r"^(?:commit )?([0-9a-f]{40}|[0-9a-f]{64})(?: |$)")
+
+
+@dataclass
+class FileDiff:
+    old_path: str | None
+    new_path: str | None
+    commit_id: CommitId | None = None
+    old_blob_id: BlobId | None = None
+    new_blob_id: BlobId | None = None
+    old_mode: str | None = None
+    new_mode: str | None = None
+    status: str = "modified"
+    similarity: int | None = None
+    binary: bool = False
+    hunks: list[Hunk] = field(default_factory=list)
+
+
+def parse_diff(diff: str | Iterable[str | bytes]) -> Iterable[FileDiff]:
+    """Parse unified diff output of ``git diff``/``git log -p``/``git diff-tree -p``.
+
+    ``diff`` is either the whole text or an iterable of lines (``str`` or
+    ``bytes``), so patches can be streamed straight from a git process. File
+    diffs are yielded as soon as the next file (or commit) starts.
+    """
+    if isinstance(diff, str):
+        diff = diff.splitlines()
+    commit_id = None
+    current: FileDiff | None = None
+    hunk: Hunk | None = None
+    old_line = new_line = old_remaining = new_remaining = 0
+    in_binary_patch = False
+    for line in diff:
+        if isinstance(line, bytes):
+            line = line.decode(errors="replace")
+        line = line.rstrip("\r\n")
+        if hunk is not None and (old_remaining > 0 or new_remaining > 0):
+            marker = line[:1]
+            if marker == "+":
+                hunk.added.append(new_line)
+                new_line += 1
+                new_remaining -= 1
+            elif marker == "-":
+                hunk.removed.append(old_line)
+                old_line += 1
+                old_remaining -= 1
+            elif marker == "\\":
+                pass
+            else:
+                # context line; an empty line is a context line whose
+                # leading space was stripped along the way
+                old_line += 1
+                new_line += 1
+                old_remaining -= 1
+                new_remaining -= 1
+            continue
+        if in_binary_patch:
+            in_binary_patch = bool(line)
+            continue
+        if line.startswith("diff --git "):
+            if current is not None:
+                yield current
+            old_path, new_path = _split_git_paths(line[len("diff --git ") :])
+            current = FileDiff(old_path, new_path, commit_id=commit_id)
+            hunk = None
+        elif current is not None and line.startswith("@@ "):
+            match = _hunk_header.match(line)
+            if match is None:
+                continue
+            old_start, old_length, new_start, new_length = match.groups()
+            hunk = Hunk(
+                int(old_start),
+                1 if old_length is None else int(old_length),
+                int(new_start),
+                1 if new_length is None else int(new_length),
+            )
+            current.hunks.append(hunk)
+            old_line, new_line = hunk.old_start, hunk.new_start
+            old_remaining, new_remaining = hunk.old_length, hunk.new_length
+        elif match := _commit_line.match(line):
+            if current is not None:
+                yield current
+                current = None
+            hunk = None
+            commit_id = match.group(1)
+        elif current is not None and not current.hunks:
+            in_binary_patch = _parse_header_line(current, line)
+    if current is not None:
+        yield current
+
+
+def _parse_header_line(current: FileDiff, line: str) -> bool:
+    if line.startswith("--- "):
+        # git appends a tab to names containing spaces
+        current.old_path = _strip_prefix(line[4:].rstrip("\t"), "a/")
+    elif line.startswith("+++ "):
+        current.new_path = _strip_prefix(line[4:].rstrip("\t"), "b/")
+    elif line.startswith("index "):
+        match = _index_line.match(line)
+        if match:
+            current.old_blob_id, current.new_blob_id, mode = match.groups()
+            if mode:
+                current.old_mode = current.new_mode = mode
+    elif line.startswith("new file mode "):
+        current.status = "added"
+        current.old_path = None
+        current.new_mode = line[len("new file mode ") :]
+    elif line.startswith("deleted file mode "):
+        current.status = "deleted"
+        current.new_path = None
+        current.old_mode = line[len("deleted file mode ") :]
+    elif line.startswith("old mode "):
+        current.old_mode = line[len("old mode ") :]
+    elif line.startswith("new mode "):
+        current.new_mode = line[len("new mode ") :]
+    elif line.startswith("rename from "):
+        current.status = "renamed"
+        current.old_path = _unquote(line[len("rename from ") :])
+    elif line.startswith("rename to "):
+        current.new_path = _unquote(line[len("rename to ") :])
+    elif line.startswith("copy from "):
+        current.status = "copied"
+        current.old_path = _unquote(line[len("copy from ") :])
+    elif line.startswith("copy to "):
+        current.new_path = _unquote(line[len("copy to ") :])
+    elif line.startswith("similarity index "):
+        current.similarity = int(line[len("similarity index ") :].rstrip("%"))
+    elif line.startswith("Binary files "):
+        current.binary = True
+    elif line == "GIT binary patch":
+        current.binary = True
+        return True
+    return False
+
+
+def _split_git_paths(paths: str) -> tuple[str, str]:
+    if paths.startswith('"'):
+        old_path, rest = _split_quoted(paths)
+        new_path = rest.lstrip(" ")
+    else:
+        # "a/<path> b/<path>" is ambiguous when the path contains " b/";
+        # identical halves (the common case) are resolved exactly, and the
+        # ---/+++ or rename lines that follow take precedence anyway.
+        half = (len(paths) - 1) // 2
+        if paths[half : half + 3] == " b/" and paths[2:half] == paths[half + 3 :]:
+            old_path, new_path = paths[:half], paths[half + 1 :]
+        elif paths.endswith('"'):
+            quote_start = paths.rindex(' "')
+            old_path, new_path = paths[:quote_start], paths[quote_start + 1 :]
+        else:
+            old_path, _, new_path = paths.partition(" b/")
+            new_path = "b/" + new_path
+    return _strip_prefix(old_path, "a/"), _strip_prefix(new_path, "b/")
+
+
+def _split_quoted(text: str) -> tuple[str, str]:
+    escaped = False
+    for i, c in enumerate(text[1:], 1):
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c == '"':
+            return text[: i + 1], text[i + 1 :]
+    return text, ""
+
+
+def _strip_prefix(path: str, prefix: str) -> str | None:
+    path = _unquote(path)
+    if path == "/dev/null":
+        return None
+    return path[len(prefix) :] if path.startswith(prefix) else path
+
+
+def _unquote(path: str) -> str:
+    if not (len(path) >= 2 and path.startswith('"') and path.endswith('"')):
+        return path
+    # git quotes paths C-style with octal escapes for non-ASCII bytes
+    raw = path[1:-1].encode("latin-1", errors="backslashreplace")
+    return raw.decode("unicode_escape").encode("latin-1").decode(errors="replace")
@@ -0,0 +1,111 @@
+__all__ = ["BlobReader"]
+
+import subprocess
+from collections.abc import Iterable, Sequence
+from typing import Tuple
+
+from gitspect.instrumentation import trace_command
+
+from ._abc import BlobId
+
+# Number of requests written ahead of the responses being read. Keeping the
+# pending input well below the pipe buffer means neither side can block the
+# other while a batch is in flight.
+_request_window = 256
+
+
+class BlobReader:
+    def __init__(self, cmd_prefix: Sequence[str]):
+        self._cmd = [*cmd_prefix, "cat-file", "--batch"]
+        self._process: subprocess.Popen | None = None
+
+    def read(self, blob_id: BlobId) -> bytes:
+        for _, content in self.read_many([blob_id]):
+            return content
+
+    def read_many(self, blob_ids: Iterable[BlobId]) -> Iterable[Tuple[BlobId, bytes]]:
+        for blob_id, _, _, content in self.read_objects(blob_ids):
+            yield blob_id, content
+
+    def read_objects(
+        self, names: Iterable[str]
+    ) -> Iterable[Tuple[str, str, str, bytes]]:
+        """``(name, object id, type, content)`` of objects given by id or by a
+        revision such as ``HEAD^{tree}``."""
+        started = self._process is None or self._process.poll() is not None
+        process = self._ensure_started()
+        trace = trace_command(self._cmd, processes=int(started))
+        try:
+            pending = []
+            for name in names:
+                pending.append(_validate_blob_id(name))
+                if len(pending) == _request_window:
+                    yield from self._request(process, pending, trace)
+                    pending = []
+            if pending:
+                yield from self._request(process, pending, trace)
+        finally:
+            if trace is not None:
+                trace.finish()
+
+    def close(self):
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        process.stdin.close()
+        process.stdout.close()
+        process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                self._cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._process
+
+    def _request(
+        self, process: subprocess.Popen, blob_ids: list[BlobId], trace=None
+    ) -> Iterable[Tuple[str, str, str, bytes]]:
+        process.stdin.write("".join(f"{b}\n" for b in blob_ids).encode())
+        process.stdin.flush()
+        # All responses are read before yielding so an abandoned generator
+        # cannot leave unread output in the pipe for the next request.
+        responses = [(blob_id, self._read_response(process)) for blob_id in blob_ids]
+        if trace is not None:
+            trace.records += len(responses)
+            trace.bytes_read += sum(len(r[2]) for _, r in responses if r is not None)
+        for blob_id, response in responses:
+            if response is None:
+                raise ValueError(f"Blob {blob_id} could not be read")
+            yield blob_id, *response
+
+    def _read_response(
+        self, process: subprocess.Popen
+    ) -> Tuple[str, str, bytes] | None:
+        header = process.stdout.readline()
+        if not header:
+            self.close()
+            raise ValueError("git cat-file exited unexpectedly")
+        fields = header.split()
+        if len(fields) != 3:
+            # "<object> missing" or "<object> ambiguous"
+            return None
+        size = int(fields[2])
+        content = process.stdout.read(size)
+        process.stdout.read(1)
+        return fields[0].decode(), fields[1].decode(), content
+
+
+def _validate_blob_id(blob_id: BlobId) -> BlobId:
+    if not blob_id or any(c.isspace() for c in blob_id):
+        raise ValueError(f"Invalid blob id: {blob_id!r}")
+    return blob_id
@@ -1,17 +1,48 @@
-from ._abc import Commit, Repository
+from collections.abc import Sequence
+
+from ._abc import Commit, CommitId, Repository, Signature
+from ._object_id import ObjectId
 
 __all__ = ["GitCommit"]
 
 
 class GitCommit(Commit):
-    def __init__(self, repo: Repository, commit_id: str, message: str = None):
+    # ids may be kept as ObjectId and are rendered as hex when read
+    __slots__ = (
+        "_repo",
+        "_commit_id",
+        "_message",
+        "_parents",
+        "_author",
+        "_committer",
+    )
+
+    def __init__(
+        self,
+        repo: Repository,
+        commit_id: CommitId | ObjectId,
+        message: str = None,
+        parents: Sequence[CommitId | ObjectId] = (),
+        author: Signature = None,
+        committer: Signature = None,
+    ):
         self._repo = repo
         self._commit_id = commit_id
         self._message = message
+        self._parents = tuple(parents)
+        self._author = author
+        self._committer = committer
 
     @property
-    def commit_id(self) -> str:
-        return self._commit_id
+    def commit_id(self) -> CommitId:
+        return str(self._commit_id)
+
+    @property
+    def object_id(self) -> ObjectId:
+        commit_id = self._commit_id
+        if isinstance(commit_id, ObjectId):
+            return commit_id
+        return ObjectId.from_hex(commit_id)
 
     @property
     def message(self) -> str:
@@ -19,23 +50,35 @@ class GitCommit(Commit):
             "Null message will be supported, but not now"
         )
 
+    @property
+    def parents(self) -> Sequence[CommitId]:
+        return tuple(str(parent) for parent in self._parents)
+
+    @property
+    def author(self) -> Signature | None:
+        return self._author
+
+    @property
+    def committer(self) -> Signature | None:
+        return self._committer
+
     def __eq__(self, other):
         return (
             isinstance(other, GitCommit)
             and self._repo == other._repo
-            and self._commit_id == other._commit_id,
+            and self.commit_id == other.commit_id
         )
 
     def __hash__(self):
         return hash(
             (
                 self._repo,
-                self._commit_id,
+                self.commit_id,
             )
         )
 
     def __str__(self) -> str:
-        display_items = [self._commit_id]
+        display_items = [self.commit_id]
         if self._message:
             display_items.append(self._message)
         return f"{self.__class__.__name__}({", ".join(display_items)})"
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from ._abc import Diff, RepositoryFile
+
+__all__ = ["GitDiff"]
+
+
+class GitDiff(Diff):
+    """A file changed between two trees; one side is None if it was added or
+    deleted."""
+
+    __slots__ = ("_before_file", "_after_file")
+
+    def __init__(
+        self, before_file: RepositoryFile | None, after_file: RepositoryFile | None
+    ):
+        self._before_file = before_file
+        self._after_file = after_file
+
+    @property
+    def before_file(self) -> RepositoryFile | None:
+        return self._before_file
+
+    @property
+    def after_file(self) -> RepositoryFile | None:
+        return self._after_file
+
+    @property
+    def path(self) -> Path:
+        return (self._after_file or self._before_file).path
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, GitDiff)
+            and self._before_file == other._before_file
+            and self._after_file == other._after_file
+        )
@@ -1,24 +1,44 @@
-from pathlib import Path
+from pathlib import Path, PurePath
 
 from ._abc import Repository, RepositoryFile, BlobId
+from ._object_id import ObjectId
 
 __all__ = ["GitRepositoryFile"]
 
 
 class GitRepositoryFile(RepositoryFile):
-    def __init__(self, repo: Repository, path: Path, blob_id: BlobId):
+    # The path is kept as the str git printed and the Path is built on first
+    # access; the blob id may be kept as an ObjectId and is rendered as hex.
+    __slots__ = ("_repo", "_posix_path", "_path", "_blob_id")
+
+    def __init__(self, repo: Repository, path: Path | str, blob_id: BlobId | ObjectId):
         self._repo = repo
-        self._path = path
+        if isinstance(path, PurePath):
+            self._posix_path = path.as_posix()
+            self._path = Path(path)
+        else:
+            self._posix_path = path
+            self._path = None
         self._blob_id = blob_id
 
     @property
     def path(self) -> Path:
+        if self._path is None:
+            self._path = Path(self._posix_path)
         return self._path
 
+    @property
+    def posix_path(self) -> str:
+        return self._posix_path
+
+    @property
+    def blob_id(self) -> BlobId:
+        return str(self._blob_id)
+
     def __eq__(self, other):
         return (
             isinstance(other, GitRepositoryFile)
             and self._repo == other._repo
-            and self._blob_id == other._blob_id
-            and self._path == other._path
+            and self.blob_id == other.blob_id
+            and self._posix_path == other._posix_path
         )
@@ -1,50 +1,123 @@
-from collections.abc import Iterable
+import os
+from collections import deque
+from collections.abc import Iterable, Sequence
+from datetime import datetime
 from pathlib import Path
-from typing import Callable, Tuple
+from typing import Tuple
 
-from ._abc import Commit, Repository, CommitId, RepositoryFile, BlobId
+from ._abc import (
+    Commit,
+    Diff,
+    Repository,
+    CommitId,
+    RepositoryFile,
+    BlobId,
+    Signature,
+)
+from ._commit_batch import CommitBatch, _batch_commits
+from ._commit_graph import CommitGraph
+from ._diff import FileDiff, parse_diff
 from ._git_commit import GitCommit
+from ._git_blob_reader import BlobReader
+from ._git_diff import GitDiff
 from ._git_file import GitRepositoryFile
 from ._git_runner import RunGit, is_repo
+from ._object_id import ObjectId, ObjectIdPool
+from ._trees import TreeCache, run_walk, walk_diff, walk_files
 
 __all__ = ["GitRepository"]
 
-_commits_format = "%s%n%H"
+_field_separator = "\x1f"
+# rev-list terminates every formatted record with a newline, so records end
+# with NUL + newline, which cannot appear inside any of the fields.
+_record_separator = b"\x00\n"
+_commits_format = (
+    "%x1f".join(["%H", "%P", "%an", "%ae", "%aI", "%cn", "%ce", "%cI", "%s"]) + "%x00"
+)
+
+
+# Resolved paths that git confirmed to be inside a work tree. Constructing
+# another repository for one of them skips the rev-parse process.
+_known_repositories: set[Path] = set()
 
 
 class GitRepository(Repository):
-    def __init__(self, path: Path):
-        if not is_repo(path):
+    """A ``Repository`` that runs git for every query.
+
+    The path must be a directory inside a git work tree. Only the directory
+    check happens on construction with ``lazy=True``; asking git is deferred
+    to the first command, and its answer is cached per path either way.
+    """
+
+    def __init__(self, path: Path, lazy: bool = False):
+        if not path.is_dir():
             raise ValueError("Not a git repository path")
         self._path = path
+        self._validated = False
+        self._blob_reader: BlobReader | None = None
+        self._git_dir: Path | None = None
+        self._trees = TreeCache()
+        self._commit_graph: CommitGraph | None = None
+        if not lazy:
+            self._validate()
 
     @property
     def path(self) -> Path:
         return self._path
 
+    @property
+    def git_dir(self) -> Path:
+        if self._git_dir is None:
+            cmd = ["git", *self._path_args(), "rev-parse", "--absolute-git-dir"]
+            with RunGit(cmd) as git:
+                output = "".join(line for ci, line in git.iter_lines())
+                if git.errors():
+                    raise ValueError(git.errors())
+            self._git_dir = Path(output.strip())
+        return self._git_dir
+
     def commits(
-        self, start: int = 0, end: int = None, reverse: bool = False
+        self,
+        start: int = 0,
+        end: int = None,
+        reverse: bool = False,
+        *,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        author: str = None,
+        paths: Sequence[Path | str] = (),
+        first_parent: bool = False,
     ) -> Iterable[Commit]:
-        if start < 0:
-            raise ValueError(f"start must be non-negative, start={start}")
-        if end < start:
-            raise ValueError(
-                f"end must be greater than or equal to start, start={start}, end={end}"
-            )
+        _validate_window(start, end)
+        filter_args = _commit_filter_args(since, until, author, first_parent)
+        path_args = _commit_path_args(paths)
+        total = self._count_commits(filter_args, path_args) if reverse else None
+        window_args = _window_args(start, end, reverse, total)
+        if window_args is None:
+            return
         cmd = [
             "git",
             *self._path_args(),
             "rev-list",
             "--all",
+            "--no-commit-header",
             f"--format={_commits_format}",
+            *filter_args,
+            *window_args,
+            *path_args,
         ]
-        if reverse:
-            cmd.append("--reverse")
-        end = float("inf") if end is None else end
         with RunGit(cmd) as git:
-            yield from CommitsParser(
-                self, lambda index, builder: start <= index < end
-            ).parse(git.iter_lines())
+            yield from CommitRecordParser(self).parse(
+                git.iter_records(_record_separator)
+            )
+            if git.errors():
+                raise ValueError(git.errors())
+
+    def commit_batches(
+        self, batch_size: int = 65536, **filters
+    ) -> Iterable[CommitBatch]:
+        """``commits(**filters)`` as ``CommitBatch``es of ``batch_size`` commits."""
+        return _batch_commits(self, self.commits(**filters), batch_size)
 
     def commits_between(
         self, start: CommitId, end: CommitId = None
@@ -53,13 +126,13 @@ class GitRepository(Repository):
             "git",
             *self._path_args(),
             "rev-list",
+            "--no-commit-header",
             f"--format={_commits_format}",
             f"{start}..{end or ""}",
         ]
-        print(" ".join(cmd))
         with RunGit(cmd) as git:
-            yield from CommitsParser(self, lambda index, builder: True).parse(
-                git.iter_lines()
+            yield from CommitRecordParser(self).parse(
+                git.iter_records(_record_separator)
             )
             if git.errors():
                 raise ValueError(git.errors())
@@ -70,70 +143,418 @@ class GitRepository(Repository):
             *self._path_args(),
             "diff-tree",
             "--no-commit-id",
+            "--no-renames",
             "-r",
+            "-z",
             commit_id,
         ]
-        files = []
         with RunGit(cmd) as git:
-            for ci, line in git.iter_lines():
-                split_line = line.rstrip().split()
-                files.append(
-                    GitRepositoryFile(self, Path(split_line[5]), blob_id=split_line[3])
-                )
+            files = list(_parse_diff_entries(self, git.iter_records(b"\x00")))
             if git.errors():
                 raise ValueError(git.errors())
         return files
 
+    def diff_files(
+        self, commit_ids: Iterable[CommitId], root: bool = False
+    ) -> Iterable[Tuple[CommitId, list[RepositoryFile]]]:
+        requested = deque()
+
+        def requests():
+            for commit_id in commit_ids:
+                if not _is_object_id(commit_id):
+                    raise ValueError(f"Not a full commit id: {commit_id}")
+                requested.append(commit_id)
+                yield commit_id
+
+        cmd = [
+            "git",
+            *self._path_args(),
+            "diff-tree",
+            "--stdin",
+            "--always",
+            "--no-renames",
+            "-r",
+            "-z",
+        ]
+        if root:
+            # list the files of root commits as added instead of nothing
+            cmd.append("--root")
+        with RunGit(cmd, input_lines=requests()) as git:
+            for commit_id, files in _parse_diff_tree(self, git.iter_records(b"\x00")):
+                # diff-tree silently skips unknown objects, so every header
+                # is matched against the next requested commit.
+                expected = requested.popleft()
+                if commit_id != expected:
+                    raise ValueError(f"Commit {expected} could not be diffed")
+                yield commit_id, files
+            if requested:
+                raise ValueError(f"Commit {requested[0]} could not be diffed")
+            if git.errors():
+                raise ValueError(git.errors())
+
+    def diff_files_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> Iterable[Tuple[CommitId, list[RepositoryFile]]]:
+        yield from self.diff_files(
+            c.commit_id for c in self.commits_between(start, end)
+        )
+
+    def diffs(
+        self, commit_ids: Iterable[CommitId], context_lines: int = 3
+    ) -> Iterable[FileDiff]:
+        def requests():
+            for commit_id in commit_ids:
+                if not _is_object_id(commit_id):
+                    raise ValueError(f"Not a full commit id: {commit_id}")
+                yield commit_id
+
+        cmd = [
+            "git",
+            *self._path_args(),
+            "diff-tree",
+            "--stdin",
+            "-p",
+            "-M",
+            "-r",
+            f"--unified={context_lines}",
+            "--no-color",
+            "--no-ext-diff",
+        ]
+        with RunGit(cmd, input_lines=requests()) as git:
+            yield from parse_diff(git.iter_records(b"\n"))
+            if git.errors():
+                raise ValueError(git.errors())
+
+    def diffs_between(
+        self, start: CommitId, end: CommitId = None, context_lines: int = 3
+    ) -> Iterable[FileDiff]:
+        yield from self.diffs(
+            (c.commit_id for c in self.commits_between(start, end)), context_lines
+        )
+
+    def files_at(self, commit_id: CommitId) -> list[RepositoryFile]:
+        """Every file in the tree of ``commit_id``, sorted by path.
+
+        Trees are read through ``cat-file --batch`` one level at a time and
+        cached by tree id, so subtrees shared with commits listed before are
+        not read again.
+        """
+        walk = walk_files(self._trees, self._root_tree(commit_id))
+        return [
+            GitRepositoryFile(self, os.fsdecode(path), blob_id)
+            for path, _, blob_id in run_walk(walk, self._read_trees)
+        ]
+
+    def diff_between(self, old: CommitId, new: CommitId) -> list[Diff]:
+        """Files that differ between the trees of two commits, sorted by path.
+
+        Renames are not detected. Subtrees with the same id in both commits
+        are skipped without being read, so the cost follows the size of the
+        change rather than of the trees.
+        """
+        walk = walk_diff(self._trees, self._root_tree(old), self._root_tree(new))
+        return _git_diffs(self, run_walk(walk, self._read_trees))
+
+    def commit_graph(self, refresh: bool = False) -> CommitGraph:
+        """The ancestry of every commit reachable from a ref or HEAD.
+
+        Loaded once, from the repository's commit-graph file when it has one
+        and a ``rev-list --parents`` of the commits the file is missing, or
+        else from a ``rev-list --parents`` of the whole history. ``refresh``
+        adds the commits that became reachable since.
+        """
+        if self._commit_graph is None or refresh:
+            self._commit_graph = self._load_commit_graph(self._commit_graph)
+        return self._commit_graph
+
     def read_blob(self, blob_id: BlobId) -> str:
-        cmd = ["git", *self._path_args(), "cat-file", "-p", blob_id]
-        lines = []
+        return _blob_text(self._reader().read(blob_id))
+
+    def read_blobs(self, blob_ids: Iterable[BlobId]) -> Iterable[Tuple[BlobId, str]]:
+        for blob_id, content in self._reader().read_many(blob_ids):
+            yield blob_id, _blob_text(content)
+
+    def read_blob_bytes(self, blob_id: BlobId) -> bytes:
+        return self._reader().read(blob_id)
+
+    def read_blobs_bytes(
+        self, blob_ids: Iterable[BlobId]
+    ) -> Iterable[Tuple[BlobId, bytes]]:
+        yield from self._reader().read_many(blob_ids)
+
+    def close(self):
+        if self._blob_reader is not None:
+            self._blob_reader.close()
+            self._blob_reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _reader(self) -> BlobReader:
+        if self._blob_reader is None:
+            self._blob_reader = BlobReader(["git", *self._path_args()])
+        return self._blob_reader
+
+    def _count_commits(self, filter_args: list[str], path_args: list[str]) -> int:
+        cmd = [
+            "git",
+            *self._path_args(),
+            "rev-list",
+            "--all",
+            "--count",
+            *filter_args,
+            *path_args,
+        ]
+        with RunGit(cmd) as git:
+            output = "".join(line for ci, line in git.iter_lines())
+            if git.errors():
+                raise ValueError(git.errors())
+        return int(output)
+
+    def _load_commit_graph(self, graph: CommitGraph | None) -> CommitGraph:
+        if graph is None:
+            cmd = [
+                "git",
+                *self._path_args(),
+                "rev-parse",
+                "--show-object-format",
+                "--is-shallow-repository",
+                "--git-path",
+                "objects",
+            ]
+            with RunGit(cmd) as git:
+                object_format, shallow, objects_dir = (
+                    line.strip() for _, line in git.iter_lines()
+                )
+                if git.errors():
+                    raise ValueError(git.errors())
+            # rev-list sees the boundary of a shallow clone as root commits
+            if shallow == "false":
+                graph = CommitGraph.from_file(
+                    self._path / objects_dir, 32 if object_format == "sha256" else 20
+                )
+        cmd = ["git", *self._path_args(), "rev-list", "--parents", "--timestamp"]
+        revisions = None
+        if graph is None:
+            cmd.append("--all")
+        else:
+            tips = self._tips()
+            missing = [tip for tip in tips if tip not in graph]
+            if not missing:
+                return graph
+            cmd.append("--stdin")
+            revisions = missing + [f"^{tip}" for tip in tips if tip in graph]
+        with RunGit(cmd, input_lines=revisions) as git:
+            graph = CommitGraph.from_records(
+                (
+                    (fields[1], fields[2:], int(fields[0]))
+                    for fields in (line.split() for _, line in git.iter_lines())
+                ),
+                graph,
+            )
+            if git.errors():
+                raise ValueError(git.errors())
+        return graph
+
+    def _tips(self) -> list[CommitId]:
+        cmd = ["git", *self._path_args(), "rev-list", "--no-walk", "--all"]
         with RunGit(cmd) as git:
-            for ci, line in git.iter_lines():
-                lines.append(line.rstrip())
+            tips = [line.strip() for _, line in git.iter_lines()]
             if git.errors():
                 raise ValueError(git.errors())
-        return "\n".join(lines)
+        return tips
+
+    def _root_tree(self, revision: str) -> str:
+        ((_, tree_id, _, content),) = self._reader().read_objects(
+            [f"{revision}^{{tree}}"]
+        )
+        if self._trees.get(tree_id) is None:
+            self._trees.add(tree_id, content)
+        return tree_id
+
+    def _read_trees(self, tree_ids: list[str]) -> dict[str, bytes]:
+        trees = {}
+        for tree_id, _, type_name, content in self._reader().read_objects(tree_ids):
+            if type_name != "tree":
+                raise ValueError(f"Object {tree_id} is a {type_name}, not a tree")
+            trees[tree_id] = content
+        return trees
 
     def _path_args(self):
+        if not self._validated:
+            self._validate()
         return "-C", self._path.absolute().as_posix()
 
+    def _validate(self):
+        key = self._path.resolve()
+        if key not in _known_repositories:
+            if not is_repo(self._path):
+                raise ValueError("Not a git repository path")
+            _known_repositories.add(key)
+        self._validated = True
 
-class CommitParser:
-    def __init__(self, repo: Repository):
-        self._repo = repo
-        self._lines = []
-        self._commit_id: CommitId | None = None
 
-    def add_line(self, line: str):
-        if not self._commit_id:
-            self._commit_id = line[line.index(" ") + 1 :]
+def _commit_filter_args(
+    since: datetime | str | None,
+    until: datetime | str | None,
+    author: str | None,
+    first_parent: bool,
+) -> list[str]:
+    args = []
+    if since is not None:
+        args.append(f"--since={_date_arg(since)}")
+    if until is not None:
+        args.append(f"--until={_date_arg(until)}")
+    if author is not None:
+        args.append(f"--author={author}")
+    if first_parent:
+        args.append("--first-parent")
+    return args
+
+
+def _commit_path_args(paths: Sequence[Path | str]) -> list[str]:
+    return ["--", *(Path(p).as_posix() for p in paths)] if paths else []
+
+
+def _validate_window(start: int, end: int | None):
+    if start < 0:
+        raise ValueError(f"start must be non-negative, start={start}")
+    if end is not None and end < start:
+        raise ValueError(
+            f"end must be greater than or equal to start, start={start}, end={end}"
+        )
+
+
+def _window_args(
+    start: int, end: int | None, reverse: bool, total: int | None
+) -> list[str] | None:
+    """rev-list arguments selecting ``[start, end)``, or None for an empty window."""
+    if reverse:
+        # git applies --skip/--max-count before --reverse, so the window is
+        # translated into newest-first positions using the total count.
+        skip = max(total - end, 0) if end is not None else 0
+        max_count = total - start - skip
+    else:
+        skip = start
+        max_count = None if end is None else end - start
+    if max_count is not None and max_count <= 0:
+        return None
+    args = []
+    if skip:
+        args.append(f"--skip={skip}")
+    if max_count is not None:
+        args.append(f"--max-count={max_count}")
+    if reverse:
+        args.append("--reverse")
+    return args
+
+
+def _date_arg(date: datetime | str) -> str:
+    return date.isoformat() if isinstance(date, datetime) else date
+
+
+def _is_object_id(value: str) -> bool:
+    return len(value) in (40, 64) and all(c in "0123456789abcdef" for c in value)
+
+
+def _parse_diff_tree(
+    repo: Repository, tokens: Iterable[bytes]
+) -> Iterable[Tuple[CommitId, list[RepositoryFile]]]:
+    commit_id = None
+    files = []
+    tokens = iter(tokens)
+    for token in tokens:
+        if token.startswith(b":"):
+            files.append(_diff_entry(repo, token, next(tokens)))
         else:
-            self._lines.append(line)
+            if commit_id is not None:
+                yield commit_id, files
+            commit_id, files = token.decode(), []
+    if commit_id is not None:
+        yield commit_id, files
+
+
+def _parse_diff_entries(
+    repo: Repository, tokens: Iterable[bytes]
+) -> Iterable[RepositoryFile]:
+    tokens = iter(tokens)
+    for token in tokens:
+        yield _diff_entry(repo, token, next(tokens))
 
-    def is_complete(self) -> bool:
-        return self._lines and self._lines[-1] == self._commit_id
 
-    def build(self) -> Commit:
-        return GitCommit(self._repo, self._commit_id, "\n".join(self._lines[:-1]))
+def _diff_entry(repo: Repository, meta: bytes, path: bytes) -> RepositoryFile:
+    # :<old mode> <new mode> <old blob> <new blob> <status>
+    return GitRepositoryFile(
+        repo, os.fsdecode(path), blob_id=ObjectId.from_hex(meta.split()[3])
+    )
+
+
+def _git_diffs(
+    repo: Repository,
+    changes: Iterable[Tuple[bytes, Tuple[bytes, str] | None, Tuple[bytes, str] | None]],
+) -> list[Diff]:
+    diffs = []
+    for path, old, new in changes:
+        path = os.fsdecode(path)
+        diffs.append(
+            GitDiff(
+                None if old is None else GitRepositoryFile(repo, path, old[1]),
+                None if new is None else GitRepositoryFile(repo, path, new[1]),
+            )
+        )
+    return diffs
 
-    def __str__(self):
-        return f"{self.is_complete()} :: {self._lines}"
 
+def _blob_text(content: bytes) -> str:
+    lines = content.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    return "\n".join(line.decode().rstrip() for line in lines)
 
-class CommitsParser:
-    def __init__(
-        self, repo: GitRepository, accept: Callable[[int, CommitParser], bool]
-    ):
+
+class CommitRecordParser:
+    def __init__(self, repo: Repository):
         self._repo = repo
-        self._accept = accept
-        self._commit_index = 0
-        self._builder = CommitParser(self._repo)
-
-    def parse(self, lines: Iterable[Tuple[int, str]]):
-        for ci, line in lines:
-            self._builder.add_line(line.strip())
-            if self._builder.is_complete():
-                if self._accept(self._commit_index, self._builder):
-                    yield self._builder.build()
-                self._builder = CommitParser(self._repo)
-                self._commit_index += 1
+        # rev-list lists children first, so a commit's id is interned when
+        # it is first seen as a parent and released with its own record
+        self._object_ids = ObjectIdPool()
+        self._names: dict[str, str] = {}
+
+    def parse(self, records: Iterable[bytes]) -> Iterable[Commit]:
+        for record in records:
+            if record:
+                yield self.parse_record(record)
+
+    def parse_record(self, record: bytes) -> Commit:
+        (
+            commit_id,
+            parents,
+            author_name,
+            author_email,
+            author_time,
+            committer_name,
+            committer_email,
+            committer_time,
+            message,
+        ) = record.decode().split(_field_separator, 8)
+        object_ids = self._object_ids
+        names = self._names
+        return GitCommit(
+            self._repo,
+            object_ids.pop(commit_id),
+            message,
+            parents=tuple(object_ids.intern(p) for p in parents.split()),
+            author=Signature(
+                names.setdefault(author_name, author_name),
+                names.setdefault(author_email, author_email),
+                datetime.fromisoformat(author_time),
+            ),
+            committer=Signature(
+                names.setdefault(committer_name, committer_name),
+                names.setdefault(committer_email, committer_email),
+                datetime.fromisoformat(committer_time),
+            ),
+        )
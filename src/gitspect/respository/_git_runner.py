@@ -1,30 +1,107 @@
 __all__ = ["RunGit", "GitError", "is_repo"]
 
 import subprocess
+import threading
 from collections.abc import Iterable, Sequence
 from pathlib import Path
 from typing import Tuple
 
+from gitspect.instrumentation import trace_command
+
+_default_buffer_size = 64 * 1024
+
 
 class RunGit:
-    def __init__(self, cmd: Sequence[str], errors_acceptable: bool = False):
+    def __init__(
+        self,
+        cmd: Sequence[str],
+        errors_acceptable: bool = False,
+        buffer_size: int = _default_buffer_size,
+        input_lines: Iterable[str] | None = None,
+    ):
         self._cmd = cmd
         self._errors_acceptable = errors_acceptable
+        self._buffer_size = buffer_size
+        self._trace = trace_command(cmd)
         self._process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            cmd,
+            stdin=subprocess.DEVNULL if input_lines is None else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=buffer_size,
         )
+        self._exhausted = False
         self._errors = []
+        self._input_error: Exception | None = None
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        self._stdin_thread = None
+        if input_lines is not None:
+            self._stdin_thread = threading.Thread(
+                target=self._write_stdin, args=(input_lines,), daemon=True
+            )
+            self._stdin_thread.start()
 
     def iter_lines(self) -> Iterable[Tuple[int, str]]:
-        for ci, commit_line in enumerate(self._process.stdout.readlines()):
-            if self.errors():
-                raise GitError(self.errors())
-            yield ci, commit_line.decode()
+        for ci, line in enumerate(self.iter_records(b"\n", keep_separator=True)):
+            yield ci, line.decode()
+
+    def iter_records(
+        self, separator: bytes = b"\n", keep_separator: bool = False
+    ) -> Iterable[bytes]:
+        separator_len = len(separator)
+        tail = separator_len if keep_separator else 0
+        trace = self._trace
+        # the start of a record spanning chunks, appended to in place
+        pending = bytearray()
+        for chunk in self.iter_chunks():
+            start = 0
+            if pending:
+                # a separator can only start in the last bytes already searched
+                resume = max(len(pending) - separator_len + 1, 0)
+                pending += chunk
+                end = pending.find(separator, resume)
+                if end == -1:
+                    continue
+                yield bytes(pending[: end + tail])
+                if trace is not None:
+                    trace.records += 1
+                start = end + separator_len - (len(pending) - len(chunk))
+                pending = bytearray()
+            end = chunk.find(separator, start)
+            while end != -1:
+                yield chunk[start : end + tail]
+                if trace is not None:
+                    trace.records += 1
+                start = end + separator_len
+                end = chunk.find(separator, start)
+            pending += chunk[start:]
+        if pending:
+            yield bytes(pending)
+            if trace is not None:
+                trace.records += 1
+
+    def iter_chunks(self) -> Iterable[bytes]:
+        stdout = self._process.stdout
+        trace = self._trace
+        produced_output = False
+        while chunk := stdout.read1(self._buffer_size):
+            produced_output = True
+            if trace is not None:
+                trace.bytes_read += len(chunk)
+            yield chunk
+        self._exhausted = True
+        if self._stdin_thread is not None:
+            self._stdin_thread.join()
+            if self._input_error is not None:
+                raise self._input_error
+        if produced_output and self.errors() and not self._errors_acceptable:
+            raise GitError(self.errors())
 
     def errors(self) -> str:
-        self._errors.extend(
-            [line.decode().strip() for line in self._process.stderr.readlines()]
-        )
+        if self._exhausted:
+            self._process.wait()
+            self._stderr_thread.join()
         return "\n".join(self._errors)
 
     def __enter__(self):
@@ -32,8 +109,34 @@ class RunGit:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self._exhausted and self._process.poll() is None:
+            self._process.terminate()
         self._process.stdout.close()
+        self._stderr_thread.join()
+        if self._stdin_thread is not None:
+            self._stdin_thread.join()
         self._process.__exit__(exc_type, exc_val, exc_tb)
+        if self._trace is not None:
+            self._trace.finish()
+
+    def _write_stdin(self, input_lines: Iterable[str]):
+        stdin = self._process.stdin
+        try:
+            for line in input_lines:
+                stdin.write(f"{line}\n".encode())
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            self._input_error = e
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _drain_stderr(self):
+        for line in self._process.stderr:
+            self._errors.append(line.decode().strip())
 
 
 def is_repo(path: Path) -> bool:
@@ -0,0 +1,407 @@
+import json
+import sqlite3
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from pathlib import Path
+
+from ._abc import Commit, CommitId, RepositoryFile, Signature
+from ._git_commit import GitCommit
+from ._git_file import GitRepositoryFile
+from ._git_repository import (
+    GitRepository,
+    _commits_format,
+    _field_separator,
+    _is_object_id,
+    _record_separator,
+)
+from ._git_runner import RunGit
+
+__all__ = ["IndexedGitRepository"]
+
+_index_file = Path("gitspect") / "commits.sqlite"
+
+_schema = """
+CREATE TABLE IF NOT EXISTS commits (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_id TEXT NOT NULL UNIQUE,
+    parents TEXT NOT NULL,
+    author_name TEXT NOT NULL,
+    author_email TEXT NOT NULL,
+    author_time TEXT NOT NULL,
+    committer_name TEXT NOT NULL,
+    committer_email TEXT NOT NULL,
+    committer_time TEXT NOT NULL,
+    message TEXT NOT NULL,
+    committed_at REAL NOT NULL,
+    sort_time REAL NOT NULL,
+    sort_depth INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_order
+    ON commits (sort_time DESC, sort_depth DESC, seq);
+CREATE TABLE IF NOT EXISTS parents (
+    child INTEGER NOT NULL,
+    parent INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parents_child ON parents (child);
+CREATE TABLE IF NOT EXISTS files (
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    blob_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_seq ON files (seq);
+CREATE TABLE IF NOT EXISTS refs (name TEXT PRIMARY KEY, commit_id TEXT NOT NULL);
+"""
+# bumped whenever _schema changes; an index of an older version is rebuilt
+_schema_version = 1
+_drop_tables = """
+DROP TABLE IF EXISTS commits;
+DROP TABLE IF EXISTS parents;
+DROP TABLE IF EXISTS files;
+DROP TABLE IF EXISTS refs;
+"""
+
+_commit_columns = (
+    "commit_id, parents, author_name, author_email, author_time,"
+    " committer_name, committer_email, committer_time, message"
+)
+# children sort before their parents, see _sort_keys
+_commit_order = "sort_time DESC, sort_depth DESC, seq"
+# commits reachable from a JSON list of commit ids, following parent edges
+_reachable = """
+reachable(seq) AS (
+    SELECT seq FROM commits WHERE commit_id IN (SELECT value FROM json_each(?))
+    UNION
+    SELECT parents.parent FROM parents JOIN reachable ON parents.child = reachable.seq
+)
+"""
+
+
+class IndexedGitRepository(GitRepository):
+    """A ``GitRepository`` that answers history queries from an on-disk index.
+
+    ``refresh()`` records the commits that became reachable since the last
+    refresh, with their parents and changed files. Commits are immutable, so
+    queries about known commit ids are always served from the index; queries
+    over all refs are served from it only while the ref tips are unchanged,
+    and fall back to git otherwise.
+    """
+
+    def __init__(self, path: Path, index_path: Path = None, lazy: bool = False):
+        super().__init__(path, lazy)
+        index_path = index_path or self.git_dir / _index_file
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(index_path)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != _schema_version:
+            self._db.executescript(_drop_tables)
+            self._db.execute(f"PRAGMA user_version = {_schema_version}")
+        self._db.executescript(_schema)
+
+    def refresh(self) -> int:
+        tips = self._ref_tips()
+        known = dict(self._db.execute("SELECT name, commit_id FROM refs"))
+        if tips == known:
+            return 0
+        # everything reachable from the previous tips is indexed already
+        revs = [*set(tips.values()), *(f"^{c}" for c in set(known.values()))]
+        cmd = [
+            "git",
+            *self._path_args(),
+            "rev-list",
+            "--stdin",
+            "--ignore-missing",
+            "--no-commit-header",
+            f"--format={_commits_format}",
+        ]
+        with RunGit(cmd, input_lines=revs) as git:
+            records = [
+                record.decode().split(_field_separator, 8)
+                for record in git.iter_records(_record_separator)
+                if record
+            ]
+            if git.errors():
+                raise ValueError(git.errors())
+        sort_keys = self._sort_keys(records)
+        self._db.executemany(
+            f"INSERT OR IGNORE INTO commits"
+            f" ({_commit_columns}, committed_at, sort_time, sort_depth)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    *fields,
+                    datetime.fromisoformat(fields[7]).timestamp(),
+                    *sort_keys[fields[0]],
+                )
+                for fields in records
+            ),
+        )
+        new_ids = [fields[0] for fields in records]
+        self._insert_parents(records)
+        self._insert_files(new_ids)
+        if any(
+            tips.get(name) != commit_id
+            and (name not in tips or not self._descends(tips[name], commit_id))
+            for name, commit_id in known.items()
+        ):
+            # a ref was deleted or rewound, which may strand indexed commits
+            self._prune(tips.values())
+        self._db.execute("DELETE FROM refs")
+        self._db.executemany("INSERT INTO refs VALUES (?, ?)", tips.items())
+        self._db.commit()
+        return len(new_ids)
+
+    def is_fresh(self) -> bool:
+        return self._ref_tips() == dict(
+            self._db.execute("SELECT name, commit_id FROM refs")
+        )
+
+    def commits(
+        self,
+        start: int = 0,
+        end: int = None,
+        reverse: bool = False,
+        *,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        author: str = None,
+        paths: Sequence[Path | str] = (),
+        first_parent: bool = False,
+    ) -> Iterable[Commit]:
+        filtered = (
+            since is not None
+            or until is not None
+            or author is not None
+            or paths
+            or first_parent
+        )
+        if filtered or start < 0 or (end is not None and end < start):
+            yield from super().commits(
+                start,
+                end,
+                reverse,
+                since=since,
+                until=until,
+                author=author,
+                paths=paths,
+                first_parent=first_parent,
+            )
+        elif not self.is_fresh():
+            yield from super().commits(start, end, reverse)
+        else:
+            # same window semantics as rev-list: slice newest first, then reverse
+            if reverse:
+                total = self._db.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+                skip = max(total - end, 0) if end is not None else 0
+                limit = max(total - start - skip, 0)
+            else:
+                skip = start
+                limit = -1 if end is None else end - start
+            rows = self._db.execute(
+                f"SELECT {_commit_columns} FROM commits"
+                f" ORDER BY {_commit_order} LIMIT ? OFFSET ?",
+                (limit, skip),
+            )
+            commits = [self._commit(row) for row in rows]
+            yield from reversed(commits) if reverse else commits
+
+    def commits_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> Iterable[Commit]:
+        start_id = self._indexed_id(start)
+        end_id = self._indexed_id(end or "HEAD")
+        if start_id is None or end_id is None:
+            yield from super().commits_between(start, end)
+            return
+        rows = self._db.execute(
+            "WITH RECURSIVE"
+            + _reachable
+            + ", included(seq) AS (SELECT seq FROM commits WHERE commit_id = ?"
+            " UNION SELECT parents.parent FROM parents"
+            " JOIN included ON parents.child = included.seq"
+            " WHERE parents.parent NOT IN reachable)"
+            f" SELECT {_commit_columns} FROM commits JOIN included USING (seq)"
+            f" WHERE seq NOT IN reachable ORDER BY {_commit_order}",
+            (json.dumps([start_id]), end_id),
+        )
+        yield from (self._commit(row) for row in rows.fetchall())
+
+    def list_diff_files(self, commit_id: CommitId) -> Iterable[RepositoryFile]:
+        row = self._db.execute(
+            "SELECT seq FROM commits WHERE commit_id = ?", (commit_id,)
+        ).fetchone()
+        if row is None:
+            return super().list_diff_files(commit_id)
+        return [
+            GitRepositoryFile(self, path, blob_id)
+            for path, blob_id in self._db.execute(
+                "SELECT path, blob_id FROM files WHERE seq = ? ORDER BY rowid", row
+            )
+        ]
+
+    def close(self):
+        super().close()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _ref_tips(self) -> dict[str, CommitId]:
+        cmd = ["git", *self._path_args(), "show-ref", "--head", "--dereference"]
+        tips = {}
+        # show-ref exits with an error and no output when there are no refs
+        with RunGit(cmd, errors_acceptable=True) as git:
+            for _, line in git.iter_lines():
+                object_id, name = line.rstrip("\n").split(" ", 1)
+                # annotated tags are followed by the commit they point at
+                tips[name.removesuffix("^{}")] = object_id
+        return tips
+
+    def _indexed_id(self, revision: str) -> CommitId | None:
+        if _is_object_id(revision):
+            row = self._db.execute(
+                "SELECT commit_id FROM commits WHERE commit_id = ?", (revision,)
+            ).fetchone()
+            return None if row is None else row[0]
+        if not self.is_fresh():
+            return None
+        for name in (revision, f"refs/heads/{revision}", f"refs/tags/{revision}"):
+            row = self._db.execute(
+                "SELECT commit_id FROM refs WHERE name = ?", (name,)
+            ).fetchone()
+            if row is not None:
+                return self._indexed_id(row[0])
+        return None
+
+    def _sort_keys(self, records: list[list[str]]) -> dict[CommitId, tuple[float, int]]:
+        # A commit's key is (commit time, 0), unless a parent's key is as
+        # late: then it is one step past its latest parent's, so keys order
+        # commits by time but never a parent before its child, whatever the
+        # clocks said. Without skew this is rev-list's order, up to ties
+        # between unrelated commits.
+        pending = {fields[0]: fields[1].split() for fields in records}
+        times = {
+            fields[0]: datetime.fromisoformat(fields[7]).timestamp()
+            for fields in records
+        }
+        parent_ids = {p for parents in pending.values() for p in parents}
+        keys = {
+            commit_id: (time, depth)
+            for commit_id, time, depth in self._db.execute(
+                "SELECT commit_id, sort_time, sort_depth FROM commits"
+                " WHERE commit_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(parent_ids)),),
+            )
+        }
+        # rev-list may list a parent before one of its children under skew
+        for commit_id in pending:
+            stack = [commit_id]
+            while stack:
+                ci = stack[-1]
+                if ci in keys:
+                    stack.pop()
+                    continue
+                missing = [p for p in pending[ci] if p in pending and p not in keys]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                key = (times[ci], 0)
+                for parent in pending[ci]:
+                    # parents beyond a shallow boundary have no key
+                    if parent in keys:
+                        time, depth = keys[parent]
+                        key = max(key, (time, depth + 1))
+                keys[ci] = key
+                stack.pop()
+        return keys
+
+    def _descends(self, commit_id: CommitId, ancestor: CommitId) -> bool:
+        # every commit on a path down to the ancestor sorts before it
+        row = self._db.execute(
+            "WITH RECURSIVE"
+            " bound(time, depth) AS (SELECT sort_time, sort_depth FROM commits"
+            " WHERE commit_id = ?),"
+            " walk(seq) AS (SELECT seq FROM commits WHERE commit_id = ?"
+            " UNION SELECT parents.parent FROM walk"
+            " JOIN parents ON parents.child = walk.seq"
+            " JOIN commits ON commits.seq = parents.parent, bound"
+            " WHERE (commits.sort_time, commits.sort_depth)"
+            " >= (bound.time, bound.depth))"
+            " SELECT 1 FROM walk JOIN commits USING (seq) WHERE commit_id = ?",
+            (ancestor, commit_id, ancestor),
+        ).fetchone()
+        return row is not None
+
+    def _insert_parents(self, records: list[list[str]]):
+        parent_ids = [parent for fields in records for parent in fields[1].split()]
+        seqs = self._seqs([*(fields[0] for fields in records), *parent_ids])
+        self._db.executemany(
+            "INSERT INTO parents VALUES (?, ?)",
+            (
+                (seqs[fields[0]], seqs[parent])
+                for fields in records
+                for parent in fields[1].split()
+                # parents beyond a shallow boundary are not indexed
+                if parent in seqs
+            ),
+        )
+
+    def _insert_files(self, commit_ids: list[CommitId]):
+        seqs = self._seqs(commit_ids)
+        for commit_id, files in self.diff_files(commit_ids):
+            self._db.executemany(
+                "INSERT INTO files VALUES (?, ?, ?)",
+                ((seqs[commit_id], f.posix_path, f.blob_id) for f in files),
+            )
+
+    def _seqs(self, commit_ids: Sequence[CommitId]) -> dict[CommitId, int]:
+        return dict(
+            self._db.execute(
+                "SELECT commit_id, seq FROM commits"
+                " WHERE commit_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(commit_ids),),
+            )
+        )
+
+    def _prune(self, tips: Iterable[CommitId]):
+        self._db.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS stale (seq INTEGER PRIMARY KEY)"
+        )
+        self._db.execute("DELETE FROM stale")
+        self._db.execute(
+            "INSERT INTO stale WITH RECURSIVE"
+            + _reachable
+            + " SELECT seq FROM commits WHERE seq NOT IN reachable",
+            (json.dumps(sorted(set(tips))),),
+        )
+        for table, column in (
+            ("commits", "seq"),
+            ("files", "seq"),
+            ("parents", "child"),
+            ("parents", "parent"),
+        ):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE {column} IN (SELECT seq FROM stale)"
+            )
+
+    def _commit(self, row: Sequence[str]) -> Commit:
+        (
+            commit_id,
+            parents,
+            author_name,
+            author_email,
+            author_time,
+            committer_name,
+            committer_email,
+            committer_time,
+            message,
+        ) = row
+        return GitCommit(
+            self,
+            commit_id,
+            message,
+            parents=tuple(parents.split()),
+            author=Signature(
+                author_name, author_email, datetime.fromisoformat(author_time)
+            ),
+            committer=Signature(
+                committer_name, committer_email, datetime.fromisoformat(committer_time)
+            ),
+        )
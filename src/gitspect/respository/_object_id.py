@@ -0,0 +1,125 @@
+import binascii
+from collections.abc import Iterable, Sequence
+
+__all__ = ["ObjectId", "ObjectIdPool", "ObjectIdArray"]
+
+
+class ObjectId(bytes):
+    """A binary git object id, 20 bytes for SHA-1 and 32 for SHA-256.
+
+    Hashes and compares as ``bytes``; ``str()`` renders it as hex.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_hex(cls, value: str | bytes) -> "ObjectId":
+        try:
+            return cls(binascii.unhexlify(value))
+        except (binascii.Error, ValueError):
+            raise ValueError(f"Not an object id: {value!r}") from None
+
+    def __str__(self) -> str:
+        return self.hex()
+
+    def __repr__(self) -> str:
+        return f"ObjectId('{self.hex()}')"
+
+
+class ObjectIdPool:
+    """Interns object ids: equal ids taken from one pool are one object.
+
+    The pool holds an id from its first ``intern`` until ``pop``, which hands
+    out the shared object one last time.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self):
+        self._ids: dict[ObjectId, ObjectId] = {}
+
+    def intern(self, value: str | bytes) -> ObjectId:
+        object_id = ObjectId.from_hex(value)
+        return self._ids.setdefault(object_id, object_id)
+
+    def pop(self, value: str | bytes) -> ObjectId:
+        object_id = ObjectId.from_hex(value)
+        return self._ids.pop(object_id, object_id)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class ObjectIdArray(Sequence[ObjectId]):
+    """Object ids packed back to back in one buffer.
+
+    Without ``hash_len`` the first id appended sets the id length.
+    """
+
+    __slots__ = ("_data", "_size")
+
+    def __init__(self, object_ids: Iterable[ObjectId | str] = (), hash_len: int = None):
+        self._data = bytearray()
+        self._size = hash_len
+        self.extend(object_ids)
+
+    def append(self, object_id: ObjectId | str):
+        if isinstance(object_id, str):
+            object_id = ObjectId.from_hex(object_id)
+        if self._size is None:
+            self._size = len(object_id)
+        if len(object_id) != self._size:
+            raise ValueError(f"Not a {self._size} byte object id: {object_id}")
+        self._data += object_id
+
+    def extend(self, object_ids: Iterable[ObjectId | str]):
+        for object_id in object_ids:
+            self.append(object_id)
+
+    def hex(self, index: int) -> str:
+        return self[index].hex()
+
+    def __len__(self) -> int:
+        return len(self._data) // self._size if self._size else 0
+
+    def __getitem__(self, index):
+        size = self._size
+        if isinstance(index, slice):
+            ids = ObjectIdArray(hash_len=size)
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                ids._data = self._data[start * size : stop * size]
+            else:
+                ids.extend(self[i] for i in range(start, stop, step))
+            return ids
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ObjectIdArray index out of range")
+        return ObjectId(self._data[index * size : (index + 1) * size])
+
+    def __contains__(self, object_id) -> bool:
+        return self._find(object_id) != -1
+
+    def index(self, object_id, start: int = 0, stop: int = None) -> int:
+        position = self._find(object_id, start, stop)
+        if position == -1:
+            raise ValueError(f"{object_id} is not in the array")
+        return position
+
+    def _find(self, object_id, start: int = 0, stop: int = None) -> int:
+        if isinstance(object_id, str):
+            try:
+                object_id = ObjectId.from_hex(object_id)
+            except ValueError:
+                return -1
+        size = self._size
+        if not isinstance(object_id, bytes) or len(object_id) != size:
+            # also covers an empty array without a size
+            return -1
+        end = len(self._data) if stop is None else min(stop, len(self)) * size
+        offset = self._data.find(object_id, start * size, end)
+        # a match may straddle two ids
+        while offset != -1 and offset % size:
+            offset = self._data.find(object_id, offset + 1, end)
+        return -1 if offset == -1 else offset // size
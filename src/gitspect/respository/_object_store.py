@@ -0,0 +1,296 @@
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Tuple
+
+__all__ = ["ObjectStore"]
+
+_object_types = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+_ofs_delta = 6
+_ref_delta = 7
+_idx_magic = b"\xfftOc"
+_default_delta_cache_bytes = 32 * 1024 * 1024
+
+
+class ObjectStore:
+    """Reads git objects straight from ``objects/``: loose files and packs.
+
+    Pack and index files are memory-mapped and objects are inflated only
+    when read. Delta chains are resolved against a byte-bounded LRU cache
+    of base objects, keyed by pack offset.
+    """
+
+    def __init__(
+        self,
+        objects_dir: Path,
+        hash_len: int = 20,
+        delta_cache_bytes: int = _default_delta_cache_bytes,
+    ):
+        self._objects_dir = objects_dir
+        self._hash_len = hash_len
+        self._delta_cache = _DeltaBaseCache(delta_cache_bytes)
+        self._packs: dict[Path, _Pack] = {}
+        self._scan_packs()
+
+    def read(self, object_id: str) -> Tuple[str, bytes]:
+        """The type name and content of ``object_id``."""
+        if len(object_id) != 2 * self._hash_len:
+            raise ValueError(f"Not a full object id: {object_id}")
+        try:
+            raw_id = bytes.fromhex(object_id)
+        except ValueError:
+            raise ValueError(f"Not a full object id: {object_id}") from None
+        found = self._read_packed(raw_id)
+        if found is None:
+            found = self._read_loose(object_id)
+        if found is None and self._scan_packs():
+            # a repack may have moved the object since the packs were listed
+            found = self._read_packed(raw_id)
+        if found is None:
+            raise ValueError(f"Object {object_id} not found")
+        return found
+
+    def close(self):
+        for pack in self._packs.values():
+            pack.close()
+        self._packs = {}
+        self._delta_cache.clear()
+
+    def _read_packed(self, raw_id: bytes) -> Tuple[str, bytes] | None:
+        for pack in self._packs.values():
+            offset = pack.find(raw_id)
+            if offset is not None:
+                return self._read_pack_object(pack, offset)
+        return None
+
+    def _read_loose(self, object_id: str) -> Tuple[str, bytes] | None:
+        path = self._objects_dir / object_id[:2] / object_id[2:]
+        try:
+            data = zlib.decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        header, _, content = data.partition(b"\x00")
+        type_name, _, size = header.decode().partition(" ")
+        if int(size) != len(content):
+            raise ValueError(f"Object {object_id} is corrupt")
+        return type_name, content
+
+    def _read_pack_object(self, pack: "_Pack", offset: int) -> Tuple[str, bytes]:
+        # walk down the delta chain, then apply the deltas on the way back
+        deltas = []
+        while True:
+            cached = self._delta_cache.get(pack, offset)
+            if cached is not None:
+                type_name, content = cached
+                break
+            kind, size, data_offset = pack.object_header(offset)
+            if kind == _ofs_delta:
+                base_offset, data_offset = pack.ofs_delta_base(offset, data_offset)
+                deltas.append((offset, pack.inflate(data_offset, size)))
+                offset = base_offset
+            elif kind == _ref_delta:
+                raw_base_id = pack.read_bytes(data_offset, self._hash_len)
+                data_offset += self._hash_len
+                deltas.append((offset, pack.inflate(data_offset, size)))
+                base_offset = pack.find(raw_base_id)
+                if base_offset is None:
+                    type_name, content = self.read(raw_base_id.hex())
+                    break
+                offset = base_offset
+            elif kind in _object_types:
+                type_name = _object_types[kind]
+                content = pack.inflate(data_offset, size)
+                if deltas:
+                    self._delta_cache.put(pack, offset, (type_name, content))
+                break
+            else:
+                raise ValueError(f"Unknown object type {kind} in {pack.path}")
+        for delta_offset, delta in reversed(deltas):
+            content = _apply_delta(content, delta)
+            self._delta_cache.put(pack, delta_offset, (type_name, content))
+        return type_name, content
+
+    def _scan_packs(self) -> bool:
+        pack_dir = self._objects_dir / "pack"
+        paths = set(pack_dir.glob("pack-*.idx")) if pack_dir.is_dir() else set()
+        paths = {p for p in paths if p.with_suffix(".pack").exists()}
+        if paths == set(self._packs):
+            return False
+        for path in set(self._packs) - paths:
+            self._packs.pop(path).close()
+        for path in sorted(paths - set(self._packs)):
+            self._packs[path] = _Pack(path, self._hash_len)
+        return True
+
+
+class _Pack:
+    def __init__(self, idx_path: Path, hash_len: int):
+        self.path = idx_path.with_suffix(".pack")
+        self._hash_len = hash_len
+        self._idx = _map(idx_path)
+        self._pack = _map(self.path)
+        if self._idx[:4] != _idx_magic or struct.unpack(">I", self._idx[4:8])[0] != 2:
+            raise ValueError(f"Unsupported pack index {idx_path}")
+        if self._pack[:4] != b"PACK":
+            raise ValueError(f"Not a pack file {self.path}")
+        self._fanout = struct.unpack(">256I", self._idx[8 : 8 + 256 * 4])
+        self._count = self._fanout[255]
+        self._ids_offset = 8 + 256 * 4
+        self._offsets_offset = self._ids_offset + self._count * (hash_len + 4)
+        self._large_offsets_offset = self._offsets_offset + self._count * 4
+
+    def find(self, raw_id: bytes) -> int | None:
+        first = raw_id[0]
+        lo = self._fanout[first - 1] if first else 0
+        hi = self._fanout[first]
+        hash_len = self._hash_len
+        idx = self._idx
+        base = self._ids_offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * hash_len
+            candidate = idx[start : start + hash_len]
+            if candidate < raw_id:
+                lo = mid + 1
+            elif candidate > raw_id:
+                hi = mid
+            else:
+                return self._offset(mid)
+        return None
+
+    def object_header(self, offset: int) -> Tuple[int, int, int]:
+        pack = self._pack
+        byte = pack[offset]
+        kind = (byte >> 4) & 7
+        size = byte & 15
+        shift = 4
+        offset += 1
+        while byte & 0x80:
+            byte = pack[offset]
+            size |= (byte & 0x7F) << shift
+            shift += 7
+            offset += 1
+        return kind, size, offset
+
+    def ofs_delta_base(self, offset: int, data_offset: int) -> Tuple[int, int]:
+        pack = self._pack
+        byte = pack[data_offset]
+        distance = byte & 0x7F
+        data_offset += 1
+        while byte & 0x80:
+            byte = pack[data_offset]
+            distance = ((distance + 1) << 7) | (byte & 0x7F)
+            data_offset += 1
+        return offset - distance, data_offset
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        return self._pack[offset : offset + length]
+
+    def inflate(self, offset: int, size: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        view = memoryview(self._pack)
+        chunk = max(size, 4096) + 64
+        parts = []
+        try:
+            while not decompressor.eof and offset < len(view):
+                parts.append(decompressor.decompress(view[offset : offset + chunk]))
+                offset += chunk
+        finally:
+            view.release()
+        content = b"".join(parts)
+        if len(content) != size:
+            raise ValueError(f"Corrupt object in {self.path}")
+        return content
+
+    def close(self):
+        self._idx.close()
+        self._pack.close()
+
+    def _offset(self, index: int) -> int:
+        start = self._offsets_offset + index * 4
+        (offset,) = struct.unpack(">I", self._idx[start : start + 4])
+        if offset & 0x80000000:
+            start = self._large_offsets_offset + (offset & 0x7FFFFFFF) * 8
+            (offset,) = struct.unpack(">Q", self._idx[start : start + 8])
+        return offset
+
+
+class _DeltaBaseCache:
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._entries: OrderedDict[Tuple[Path, int], Tuple[str, bytes]] = OrderedDict()
+
+    def get(self, pack: _Pack, offset: int) -> Tuple[str, bytes] | None:
+        key = (pack.path, offset)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, pack: _Pack, offset: int, entry: Tuple[str, bytes]):
+        if len(entry[1]) > self._max_bytes:
+            return
+        key = (pack.path, offset)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[1])
+        self._entries[key] = entry
+        self._bytes += len(entry[1])
+        while self._bytes > self._max_bytes:
+            _, (_, content) = self._entries.popitem(last=False)
+            self._bytes -= len(content)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+
+def _map(path: Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    base_size, pos = _delta_size(delta, 0)
+    if base_size != len(base):
+        raise ValueError("Delta does not apply to its base object")
+    result_size, pos = _delta_size(delta, pos)
+    result = bytearray()
+    end = len(delta)
+    while pos < end:
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:
+            # copy from the base: offset and size bytes present per flag bit
+            copy_offset = copy_size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    copy_offset |= delta[pos] << (8 * bit)
+                    pos += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    copy_size |= delta[pos] << (8 * bit)
+                    pos += 1
+            result += base[copy_offset : copy_offset + (copy_size or 0x10000)]
+        elif opcode:
+            result += delta[pos : pos + opcode]
+            pos += opcode
+        else:
+            raise ValueError("Invalid delta opcode 0")
+    if len(result) != result_size:
+        raise ValueError("Delta produced an object of the wrong size")
+    return bytes(result)
+
+
+def _delta_size(delta: bytes, pos: int) -> Tuple[int, int]:
+    size = shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
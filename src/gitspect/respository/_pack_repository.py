@@ -0,0 +1,546 @@
+import heapq
+import os
+import re
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+from ._abc import (
+    BlobId,
+    Commit,
+    CommitId,
+    Diff,
+    Repository,
+    RepositoryFile,
+    Signature,
+)
+from ._commit_batch import CommitBatch, _batch_commits
+from ._commit_graph import CommitGraph
+from ._git_commit import GitCommit
+from ._git_file import GitRepositoryFile
+from ._git_repository import _blob_text, _git_diffs, _validate_window
+from ._object_store import ObjectStore
+from ._trees import TreeCache, TreeEntries, run_walk, walk_diff, walk_files
+
+__all__ = ["PackRepository"]
+
+_tree_mode = b"40000"
+# top-level refs such as HEAD and ORIG_HEAD
+_pseudo_ref = re.compile(r"[A-Z_]+")
+
+
+class _CommitData(NamedTuple):
+    tree: str
+    parents: Tuple[CommitId, ...]
+    author: bytes
+    committer: bytes
+    encoding: str
+    message: bytes
+    date: int
+
+
+class PackRepository(Repository):
+    """``Repository`` reading objects and refs from disk, without running git.
+
+    Commit listings follow ``rev-list``'s default date order and history
+    simplification. Revisions are full object ids or ref names, and dates are
+    ISO 8601; git's revision and approxidate syntax are not understood.
+    """
+
+    def __init__(self, path: Path):
+        git_dir = _find_git_dir(path)
+        if git_dir is None:
+            raise ValueError("Not a git repository path")
+        self._path = path
+        self._git_dir = git_dir
+        commondir = git_dir / "commondir"
+        self._common_dir = (
+            (git_dir / commondir.read_text().strip()).resolve()
+            if commondir.exists()
+            else git_dir
+        )
+        self._hash_len = 32 if _object_format(self._common_dir) == "sha256" else 20
+        self._store = ObjectStore(self._common_dir / "objects", self._hash_len)
+        self._commit_cache: dict[CommitId, _CommitData] = {}
+        self._trees = TreeCache()
+        self._commit_graph: CommitGraph | None = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def git_dir(self) -> Path:
+        return self._git_dir
+
+    def commits(
+        self,
+        start: int = 0,
+        end: int = None,
+        reverse: bool = False,
+        *,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        author: str = None,
+        paths: Sequence[Path | str] = (),
+        first_parent: bool = False,
+    ) -> Iterable[Commit]:
+        _validate_window(start, end)
+        # rev-list --all: every ref, then HEAD
+        tips = [commit_id for _, commit_id in self._refs()]
+        head = self._resolve_ref("HEAD")
+        if head is not None:
+            tips.append(head)
+        commit_ids = self._walk(
+            [t for t in tips if self._peel(t) is not None],
+            since=None if since is None else _timestamp(since),
+            until=None if until is None else _timestamp(until),
+            author=None if author is None else re.compile(author),
+            paths=[Path(p).as_posix().strip("/").split("/") for p in paths],
+            first_parent=first_parent,
+        )
+        window = list(islice(commit_ids, start, end))
+        for commit_id in reversed(window) if reverse else window:
+            yield self._commit(commit_id)
+
+    def commit_batches(
+        self, batch_size: int = 65536, **filters
+    ) -> Iterable[CommitBatch]:
+        """``commits(**filters)`` as ``CommitBatch``es of ``batch_size`` commits."""
+        return _batch_commits(self, self.commits(**filters), batch_size)
+
+    def commits_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> Iterable[Commit]:
+        start_id = self._resolve_revision(start)
+        end_id = self._resolve_revision(end or "HEAD")
+        excluded = set(self._walk([start_id]))
+        for commit_id in self._walk([end_id], excluded=excluded):
+            yield self._commit(commit_id)
+
+    def list_diff_files(self, commit_id: CommitId) -> Iterable[RepositoryFile]:
+        ((_, files),) = self.diff_files([commit_id])
+        return files
+
+    def diff_files(
+        self, commit_ids: Iterable[CommitId], root: bool = False
+    ) -> Iterable[Tuple[CommitId, list[RepositoryFile]]]:
+        for commit_id in commit_ids:
+            data = self._commit_data(commit_id)
+            if len(data.parents) > 1 or (not data.parents and not root):
+                # diff-tree shows nothing for merges without -m/-c
+                yield commit_id, []
+                continue
+            old_tree = self._commit_data(data.parents[0]).tree if data.parents else None
+            yield commit_id, [
+                GitRepositoryFile(self, os.fsdecode(path), blob_id)
+                for path, blob_id in self._diff_trees(old_tree, data.tree, b"")
+            ]
+
+    def diff_files_between(
+        self, start: CommitId, end: CommitId = None
+    ) -> Iterable[Tuple[CommitId, list[RepositoryFile]]]:
+        yield from self.diff_files(
+            c.commit_id for c in self.commits_between(start, end)
+        )
+
+    def files_at(self, commit_id: CommitId) -> list[RepositoryFile]:
+        tree = self._commit_data(self._resolve_revision(commit_id)).tree
+        return [
+            GitRepositoryFile(self, os.fsdecode(path), blob_id)
+            for path, _, blob_id in run_walk(
+                walk_files(self._trees, tree), self._read_trees
+            )
+        ]
+
+    def diff_between(self, old: CommitId, new: CommitId) -> list[Diff]:
+        old_tree = self._commit_data(self._resolve_revision(old)).tree
+        new_tree = self._commit_data(self._resolve_revision(new)).tree
+        walk = walk_diff(self._trees, old_tree, new_tree)
+        return _git_diffs(self, run_walk(walk, self._read_trees))
+
+    def read_blob(self, blob_id: BlobId) -> str:
+        return _blob_text(self._read_object(blob_id, "blob"))
+
+    def read_blobs(self, blob_ids: Iterable[BlobId]) -> Iterable[Tuple[BlobId, str]]:
+        for blob_id in blob_ids:
+            yield blob_id, self.read_blob(blob_id)
+
+    def read_blob_bytes(self, blob_id: BlobId) -> bytes:
+        return self._read_object(blob_id, "blob")
+
+    def read_blobs_bytes(
+        self, blob_ids: Iterable[BlobId]
+    ) -> Iterable[Tuple[BlobId, bytes]]:
+        for blob_id in blob_ids:
+            yield blob_id, self.read_blob_bytes(blob_id)
+
+    def commit_graph(self, refresh: bool = False) -> CommitGraph:
+        """The ancestry of every commit reachable from a ref or HEAD.
+
+        Loaded once, from the repository's commit-graph file and the commits
+        the file is missing, or from the commit objects alone without a file.
+        ``refresh`` adds the commits that became reachable since.
+        """
+        if self._commit_graph is None or refresh:
+            graph = self._commit_graph
+            if graph is None and not (self._common_dir / "shallow").exists():
+                graph = CommitGraph.from_file(
+                    self._common_dir / "objects", self._hash_len
+                )
+            self._commit_graph = CommitGraph.from_records(
+                self._missing_commits(graph), graph
+            )
+        return self._commit_graph
+
+    def close(self):
+        self._store.close()
+        self._commit_cache.clear()
+        self._trees.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _walk(
+        self,
+        tips: Iterable[CommitId],
+        excluded: set[CommitId] = frozenset(),
+        since: float = None,
+        until: float = None,
+        author: re.Pattern = None,
+        paths: list[list[str]] = (),
+        first_parent: bool = False,
+    ) -> Iterable[CommitId]:
+        # rev-list's default order: newest committer date first, ties in
+        # the order commits were queued
+        queue = []
+        seen = set(excluded)
+        counter = 0
+
+        def push(commit_id: CommitId):
+            nonlocal counter
+            if commit_id not in seen:
+                seen.add(commit_id)
+                heapq.heappush(
+                    queue, (-self._commit_data(commit_id).date, counter, commit_id)
+                )
+                counter += 1
+
+        for tip in tips:
+            push(self._peel(tip))
+        while queue:
+            _, _, commit_id = heapq.heappop(queue)
+            data = self._commit_data(commit_id)
+            if since is not None and data.date < since:
+                # git does not walk past commits older than --since
+                continue
+            parents = data.parents[:1] if first_parent else data.parents
+            show = True
+            if paths:
+                parents, show = self._simplify(data, parents, paths)
+            for parent in parents:
+                push(parent)
+            if not show:
+                continue
+            if until is not None and data.date > until:
+                continue
+            if author is not None and not author.search(
+                _ident(data.author, data.encoding)
+            ):
+                continue
+            yield commit_id
+
+    def _missing_commits(
+        self, graph: CommitGraph | None
+    ) -> Iterable[Tuple[CommitId, Tuple[CommitId, ...], int]]:
+        tips = [commit_id for _, commit_id in self._refs()]
+        head = self._resolve_ref("HEAD")
+        if head is not None:
+            tips.append(head)
+        stack = [tip for tip in map(self._peel, tips) if tip is not None]
+        seen = set()
+        while stack:
+            commit_id = stack.pop()
+            if commit_id in seen or (graph is not None and commit_id in graph):
+                continue
+            seen.add(commit_id)
+            data = self._commit_data(commit_id)
+            yield commit_id, data.parents, data.date
+            stack.extend(data.parents)
+
+    def _simplify(
+        self, data: _CommitData, parents: Sequence[CommitId], paths: list[list[str]]
+    ) -> Tuple[Sequence[CommitId], bool]:
+        """Parents to follow and whether the commit changes ``paths``."""
+        entries = self._path_entries(data.tree, paths)
+        if not parents:
+            return parents, any(e is not None for e in entries)
+        for parent in parents:
+            parent_tree = self._commit_data(parent).tree
+            if self._path_entries(parent_tree, paths) == entries:
+                # same as one parent for these paths: follow only that one
+                return (parent,), False
+        return parents, True
+
+    def _path_entries(self, tree: str, paths: list[list[str]]) -> list:
+        entries = []
+        for parts in paths:
+            entry = (_tree_mode, tree)
+            for part in parts:
+                if entry is None or entry[0] != _tree_mode:
+                    entry = None
+                    break
+                entry = self._tree_entries(entry[1]).get(part.encode())
+            entries.append(entry)
+        return entries
+
+    def _diff_trees(
+        self, old_tree: str | None, new_tree: str | None, prefix: bytes
+    ) -> Iterable[Tuple[bytes, BlobId]]:
+        old = self._sorted_tree(old_tree)
+        new = self._sorted_tree(new_tree)
+        oi = ni = 0
+        while oi < len(old) or ni < len(new):
+            old_key = old[oi][0] if oi < len(old) else None
+            new_key = new[ni][0] if ni < len(new) else None
+            if new_key is None or (old_key is not None and old_key < new_key):
+                yield from self._side(old[oi], prefix, deleted=True)
+                oi += 1
+            elif old_key is None or new_key < old_key:
+                yield from self._side(new[ni], prefix, deleted=False)
+                ni += 1
+            else:
+                _, name, old_mode, old_id = old[oi]
+                _, _, new_mode, new_id = new[ni]
+                oi += 1
+                ni += 1
+                if old_id == new_id and old_mode == new_mode:
+                    continue
+                if old_mode == _tree_mode:
+                    yield from self._diff_trees(old_id, new_id, prefix + name + b"/")
+                else:
+                    yield prefix + name, new_id
+
+    def _side(
+        self, entry, prefix: bytes, deleted: bool
+    ) -> Iterable[Tuple[bytes, BlobId]]:
+        _, name, mode, object_id = entry
+        if mode == _tree_mode:
+            trees = (object_id, None) if deleted else (None, object_id)
+            yield from self._diff_trees(*trees, prefix + name + b"/")
+        else:
+            yield prefix + name, "0" * (2 * self._hash_len) if deleted else object_id
+
+    def _sorted_tree(self, tree: str | None) -> list[Tuple[bytes, bytes, bytes, str]]:
+        if tree is None:
+            return []
+        # git orders tree entries as if directory names ended in "/"
+        return [
+            (name + b"/" if mode == _tree_mode else name, name, mode, object_id)
+            for name, (mode, object_id) in self._tree_entries(tree).items()
+        ]
+
+    def _tree_entries(self, tree: str) -> TreeEntries:
+        entries = self._trees.get(tree)
+        if entries is None:
+            entries = self._trees.add(tree, self._read_object(tree, "tree"))
+        return entries
+
+    def _read_trees(self, tree_ids: list[str]) -> dict[str, bytes]:
+        return {tree_id: self._read_object(tree_id, "tree") for tree_id in tree_ids}
+
+    def _commit(self, commit_id: CommitId) -> Commit:
+        data = self._commit_data(commit_id)
+        return GitCommit(
+            self,
+            commit_id,
+            _subject(data.message, data.encoding),
+            parents=data.parents,
+            author=_signature(data.author, data.encoding),
+            committer=_signature(data.committer, data.encoding),
+        )
+
+    def _commit_data(self, commit_id: CommitId) -> _CommitData:
+        data = self._commit_cache.get(commit_id)
+        if data is None:
+            data = _parse_commit(self._read_object(commit_id, "commit"))
+            self._commit_cache[commit_id] = data
+        return data
+
+    def _read_object(self, object_id: str, expected_type: str) -> bytes:
+        type_name, content = self._store.read(object_id)
+        if type_name != expected_type:
+            raise ValueError(
+                f"Object {object_id} is a {type_name}, not a {expected_type}"
+            )
+        return content
+
+    def _peel(self, object_id: str) -> CommitId | None:
+        while True:
+            type_name, content = self._store.read(object_id)
+            if type_name == "commit":
+                return object_id
+            if type_name != "tag":
+                return None
+            # "object <id>" is the first header of a tag
+            object_id = content[7 : 7 + 2 * self._hash_len].decode()
+
+    def _resolve_revision(self, revision: str) -> CommitId:
+        if re.fullmatch(f"[0-9a-f]{{{2 * self._hash_len}}}", revision):
+            object_id = revision
+        else:
+            object_id = None
+            for name in (
+                revision,
+                f"refs/{revision}",
+                f"refs/tags/{revision}",
+                f"refs/heads/{revision}",
+                f"refs/remotes/{revision}",
+                f"refs/remotes/{revision}/HEAD",
+            ):
+                object_id = self._resolve_ref(name)
+                if object_id is not None:
+                    break
+        commit_id = None
+        if object_id is not None:
+            try:
+                commit_id = self._peel(object_id)
+            except ValueError:
+                pass
+        if commit_id is None:
+            raise ValueError(f"Unknown revision {revision}")
+        return commit_id
+
+    def _resolve_ref(self, name: str, depth: int = 0) -> str | None:
+        if depth > 5:
+            raise ValueError(f"Symbolic ref loop at {name}")
+        if "/" in name:
+            ref_file = self._common_dir / name
+        elif _pseudo_ref.fullmatch(name):
+            ref_file = self._git_dir / name
+        else:
+            return None
+        if ref_file.is_file():
+            value = ref_file.read_text().strip()
+            if value.startswith("ref: "):
+                return self._resolve_ref(value[5:], depth + 1)
+            return value
+        return self._packed_refs().get(name)
+
+    def _refs(self) -> list[Tuple[str, str]]:
+        refs = self._packed_refs()
+        refs_dir = self._common_dir / "refs"
+        for dir_path, _, file_names in os.walk(refs_dir):
+            for file_name in file_names:
+                if file_name.endswith(".lock"):
+                    continue
+                name = (Path(dir_path) / file_name).relative_to(self._common_dir)
+                object_id = self._resolve_ref(name.as_posix())
+                if object_id is not None:
+                    refs[name.as_posix()] = object_id
+        return sorted(refs.items())
+
+    def _packed_refs(self) -> dict[str, str]:
+        refs = {}
+        path = self._common_dir / "packed-refs"
+        if path.exists():
+            for line in path.read_text().splitlines():
+                if line and line[0] not in "#^":
+                    object_id, name = line.split(" ", 1)
+                    refs[name] = object_id
+        return refs
+
+
+def _find_git_dir(path: Path) -> Path | None:
+    for directory in [path.absolute(), *path.absolute().parents]:
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            # worktrees and submodules point at their git directory
+            target = dot_git.read_text().strip().removeprefix("gitdir: ")
+            return (directory / target).resolve()
+    return None
+
+
+def _object_format(git_dir: Path) -> str:
+    config = git_dir / "config"
+    if config.exists():
+        match = re.search(
+            r"^\s*objectformat\s*=\s*(\w+)", config.read_text(), re.M | re.I
+        )
+        if match:
+            return match.group(1).lower()
+    return "sha1"
+
+
+def _parse_commit(content: bytes) -> _CommitData:
+    header, _, message = content.partition(b"\n\n")
+    fields = {}
+    parents = []
+    for line in header.split(b"\n"):
+        if line.startswith(b" "):
+            # continuation of a multi-line header such as gpgsig
+            continue
+        key, _, value = line.partition(b" ")
+        if key == b"parent":
+            parents.append(value.decode())
+        else:
+            fields.setdefault(key, value)
+    committer = fields[b"committer"]
+    return _CommitData(
+        tree=fields[b"tree"].decode(),
+        parents=tuple(parents),
+        author=fields.get(b"author", b""),
+        committer=committer,
+        encoding=fields.get(b"encoding", b"utf-8").decode(),
+        message=message,
+        date=int(committer.rsplit(b" ", 2)[1]),
+    )
+
+
+def _ident(value: bytes, encoding: str) -> str:
+    # "Name <email> <timestamp> <offset>"
+    return value.rsplit(b" ", 2)[0].decode(encoding, errors="replace")
+
+
+def _signature(value: bytes, encoding: str) -> Signature:
+    ident, timestamp, offset = value.rsplit(b" ", 2)
+    ident = ident.decode(encoding, errors="replace")
+    name, _, email = ident.partition("<")
+    sign = -1 if offset.startswith(b"-") else 1
+    minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    tz = timezone(sign * timedelta(minutes=minutes))
+    return Signature(
+        name.strip(),
+        email.rstrip(">").strip(),
+        datetime.fromtimestamp(int(timestamp), tz),
+    )
+
+
+def _subject(message: bytes, encoding: str) -> str:
+    # %s: the first paragraph, lines joined by spaces
+    lines = message.decode(encoding, errors="replace").split("\n")
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    subject = []
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            break
+        subject.append(line)
+    return " ".join(subject)
+
+
+def _timestamp(date: datetime | str) -> float:
+    if isinstance(date, str):
+        try:
+            date = datetime.fromisoformat(date)
+        except ValueError:
+            raise ValueError(f"Not an ISO 8601 date: {date}") from None
+    return date.timestamp()
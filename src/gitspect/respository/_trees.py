@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from collections.abc import Callable, Generator, Iterable
+from typing import Tuple
+
+__all__ = ["TreeCache"]
+
+# name -> (mode, object id) of every entry in one tree
+TreeEntries = dict[bytes, Tuple[bytes, str]]
+# the ids of trees to read are sent out, their contents come back
+TreeWalk = Generator[list[str], dict[str, bytes], list]
+
+_tree_mode = b"40000"
+_gitlink_mode = b"160000"
+_default_max_trees = 64 * 1024
+
+
+class TreeCache:
+    """Parsed trees by tree id, the least recently used dropped first.
+
+    Trees are immutable, so a cached tree stays valid for as long as its
+    repository exists, across commits and refs.
+    """
+
+    def __init__(self, max_trees: int = _default_max_trees):
+        self._max_trees = max_trees
+        self._trees: OrderedDict[str, TreeEntries] = OrderedDict()
+
+    def get(self, tree_id: str) -> TreeEntries | None:
+        entries = self._trees.get(tree_id)
+        if entries is not None:
+            self._trees.move_to_end(tree_id)
+        return entries
+
+    def put(self, tree_id: str, entries: TreeEntries):
+        self._trees[tree_id] = entries
+        self._trees.move_to_end(tree_id)
+        while len(self._trees) > self._max_trees:
+            self._trees.popitem(last=False)
+
+    def add(self, tree_id: str, content: bytes) -> TreeEntries:
+        entries = parse_tree(content, len(tree_id) // 2)
+        self.put(tree_id, entries)
+        return entries
+
+    def clear(self):
+        self._trees.clear()
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+
+def parse_tree(content: bytes, hash_len: int) -> TreeEntries:
+    entries = {}
+    pos = 0
+    while pos < len(content):
+        space = content.index(b" ", pos)
+        nul = content.index(b"\x00", space)
+        entries[content[space + 1 : nul]] = (
+            content[pos:space],
+            content[nul + 1 : nul + 1 + hash_len].hex(),
+        )
+        pos = nul + 1 + hash_len
+    return entries
+
+
+def walk_files(cache: TreeCache, tree_id: str) -> TreeWalk:
+    """Walk to ``(path, mode, blob id)`` of every file below ``tree_id``,
+    sorted by path like ``ls-tree -r``. Submodules are left out."""
+    files = []
+    level = [(b"", tree_id)]
+    # one level at a time, so every level needs a single round of reads
+    while level:
+        trees = yield from _load(cache, [tree for _, tree in level])
+        next_level = []
+        for prefix, tree in level:
+            for name, (mode, object_id) in trees[tree].items():
+                if mode == _tree_mode:
+                    next_level.append((prefix + name + b"/", object_id))
+                elif mode != _gitlink_mode:
+                    files.append((prefix + name, mode, object_id))
+        level = next_level
+    files.sort()
+    return files
+
+
+def walk_diff(cache: TreeCache, old_tree: str, new_tree: str) -> TreeWalk:
+    """Walk to ``(path, old entry, new entry)`` of every file that differs
+    between the trees, sorted by path; an added or deleted file has None for
+    its missing side. Subtrees with the same id on both sides are skipped
+    without being read."""
+    changes = []
+    level = [] if old_tree == new_tree else [(b"", old_tree, new_tree)]
+    while level:
+        tree_ids = [tree for _, old, new in level for tree in (old, new) if tree]
+        trees = yield from _load(cache, tree_ids)
+        next_level = []
+        for prefix, old, new in level:
+            old_entries = trees[old] if old else {}
+            new_entries = trees[new] if new else {}
+            for name in old_entries.keys() | new_entries.keys():
+                old_entry = old_entries.get(name)
+                new_entry = new_entries.get(name)
+                if old_entry == new_entry:
+                    continue
+                path = prefix + name
+                old_subtree = _subtree(old_entry)
+                new_subtree = _subtree(new_entry)
+                if old_subtree or new_subtree:
+                    next_level.append((path + b"/", old_subtree, new_subtree))
+                old_file = _file(old_entry)
+                new_file = _file(new_entry)
+                if old_file or new_file:
+                    changes.append((path, old_file, new_file))
+        level = next_level
+    changes.sort(key=lambda change: change[0])
+    return changes
+
+
+def run_walk(walk: TreeWalk, read_trees: Callable[[list[str]], dict[str, bytes]]):
+    try:
+        tree_ids = next(walk)
+        while True:
+            tree_ids = walk.send(read_trees(tree_ids))
+    except StopIteration as done:
+        return done.value
+
+
+def _load(cache: TreeCache, tree_ids: Iterable[str]) -> TreeWalk:
+    trees = {}
+    missing = []
+    for tree_id in tree_ids:
+        if tree_id not in trees:
+            entries = cache.get(tree_id)
+            if entries is None:
+                missing.append(tree_id)
+            trees[tree_id] = entries
+    if missing:
+        contents = yield missing
+        for tree_id in missing:
+            trees[tree_id] = cache.add(tree_id, contents[tree_id])
+    return trees
+
+
+def _subtree(entry: Tuple[bytes, str] | None) -> str | None:
+    return entry[1] if entry is not None and entry[0] == _tree_mode else None
+
+
+def _file(entry: Tuple[bytes, str] | None) -> Tuple[bytes, str] | None:
+    if entry is None or entry[0] in (_tree_mode, _gitlink_mode):
+        return None
+    return entry
@@ -0,0 +1,2 @@
+from ._segmenter import *
+from ._registry import *
@@ -0,0 +1,46 @@
+import posixpath
+from collections.abc import Mapping
+from pathlib import PurePath
+
+from ._segmenter import Segmenter
+from .python_segmentation import PythonSegmenter
+
+__all__ = ["SegmenterRegistry", "default_registry"]
+
+
+class SegmenterRegistry:
+    """Chooses the segmenter for a file by its suffix.
+
+    Files without a registered suffix have no segmenter, so scans can skip
+    them before reading their content.
+    """
+
+    def __init__(self, segmenters: Mapping[str, type[Segmenter]] = None):
+        self._segmenters: dict[str, type[Segmenter]] = {}
+        for suffix, segmenter in (segmenters or {}).items():
+            self.register(suffix, segmenter)
+
+    def register(self, suffix: str, segmenter: type[Segmenter]):
+        if not suffix.startswith("."):
+            raise ValueError(f"Suffix must start with a dot: {suffix!r}")
+        self._segmenters[suffix] = segmenter
+
+    def segmenter_for(self, path: PurePath | str) -> type[Segmenter] | None:
+        if isinstance(path, PurePath):
+            suffix = path.suffix
+        else:
+            suffix = posixpath.splitext(path)[1]
+        return self._segmenters.get(suffix)
+
+    def supports(self, path: PurePath | str) -> bool:
+        return self.segmenter_for(path) is not None
+
+    @property
+    def suffixes(self) -> tuple[str, ...]:
+        return tuple(self._segmenters)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._segmenters})"
+
+
+default_registry = SegmenterRegistry({".py": PythonSegmenter, ".pyi": PythonSegmenter})
@@ -0,0 +1,120 @@
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Tuple
+
+from gitspect.instrumentation import enabled, record_segmentation
+from gitspect.model import BlobLines, Document, Segment, SegmentTable
+
+__all__ = ["Segmenter", "iter_blob_lines", "iter_file_lines"]
+
+
+class Segmenter(ABC):
+    """Splits a document into segments in one forward pass over its lines.
+
+    ``iter_segments`` keeps only the blocks still open in memory and yields
+    each segment as soon as its block closes, so ``lines`` may be a one-shot
+    iterator. ``segment`` keeps the lines as well to build a ``Document``.
+    """
+
+    # Bump whenever the produced segments change, this invalidates caches.
+    version = 0
+
+    def __init__(self, document_name: str, lines: Iterable[str]):
+        self._document_name = document_name
+        self._lines = lines
+
+    @classmethod
+    def from_path(cls, file_path: Path):
+        return cls(str(file_path), iter_file_lines(file_path))
+
+    @classmethod
+    def from_bytes(
+        cls,
+        document_name: str,
+        data: bytes,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+    ):
+        return cls(document_name, BlobLines(data, encoding, errors))
+
+    def iter_segments(self) -> Iterator[Segment]:
+        lines = self._lines
+        if isinstance(lines, BlobLines):
+            # iterating BlobLines would decode the whole buffer up front
+            lines = iter_blob_lines(lines.data, lines.encoding, lines.errors)
+        document_name = self._document_name
+        if not enabled():
+            for start, end in self._iter_spans(lines):
+                yield Segment(start, end, document_name)
+            return
+        started = time.perf_counter()
+        counted = _CountingLines(lines)
+        segments = 0
+        for start, end in self._iter_spans(counted):
+            segments += 1
+            yield Segment(start, end, document_name)
+        record_segmentation(document_name, started, counted.count, segments)
+
+    def segment(self) -> Document:
+        if not enabled():
+            return self._segment()
+        started = time.perf_counter()
+        document = self._segment()
+        _record(document, started)
+        return document
+
+    def _segment(self) -> Document:
+        lines = self._lines
+        if not isinstance(lines, Sequence):
+            lines = list(lines)
+        segments = SegmentTable(self._document_name)
+        for start, end in self._iter_spans(lines):
+            segments.append(start, end)
+        return Document(self._document_name, lines, segments)
+
+    @abstractmethod
+    def _iter_spans(self, lines: Iterable[str]) -> Iterator[Tuple[int, int]]:
+        pass
+
+
+class _CountingLines:
+    def __init__(self, lines: Iterable[str]):
+        self._lines = lines
+        self.count = 0
+
+    def __iter__(self):
+        for line in self._lines:
+            self.count += 1
+            yield line
+
+
+def _record(document: Document, started: float):
+    record_segmentation(
+        document.document_name, started, len(document.lines()), len(document.segments())
+    )
+
+
+def iter_blob_lines(
+    data: bytes, encoding: str = "utf-8", errors: str = "strict"
+) -> Iterator[str]:
+    """The lines of ``BlobLines(data)``, decoded one at a time."""
+    start = 0
+    end = data.find(b"\n")
+    while end != -1:
+        yield data[start:end].decode(encoding, errors)
+        start = end + 1
+        end = data.find(b"\n", start)
+    if start < len(data) or not data:
+        yield data[start:].decode(encoding, errors)
+
+
+def iter_file_lines(file_path: Path) -> Iterator[str]:
+    """The lines of ``file_path.read_text().split("\\n")``, read one at a time."""
+    line = ""
+    with file_path.open() as f:
+        for line in f:
+            yield line.removesuffix("\n")
+    if line.endswith("\n") or not line:
+        yield ""
@@ -1,6 +1,7 @@
 from collections import namedtuple
+from collections.abc import Sequence
 
-__all__ = ["LineIndent", "indent_len"]
+__all__ = ["LineIndent", "indent_len", "line_indents", "lookback_indices"]
 
 LineIndent = namedtuple("LineIndent", "li, indent")
 
@@ -12,3 +13,31 @@ def indent_len(line: str, tab_len: int = 4) -> int:
         if spaced_indent.isspace()
         else len(spaced_indent) - len(spaced_indent.lstrip())
     )
+
+
+def line_indents(lines: Sequence[str], tab_len: int = 4) -> list[int]:
+    """Indent of every line in one pass, -1 for blank lines."""
+    indents = []
+    for line in lines:
+        spaced_line = line.expandtabs(tab_len)
+        content = spaced_line.lstrip()
+        indents.append(len(spaced_line) - len(content) if content else -1)
+    return indents
+
+
+def lookback_indices(indents: Sequence[int]) -> list[int]:
+    """For every line, the first index of the run of non-blank lines before it
+    that are indented at least as deep as the line itself.
+
+    This is the nearest previous line that is blank or shallower, plus one,
+    found with a monotonic stack so the whole table costs linear time.
+    """
+    lookbacks = []
+    shallower = []
+    for li, indent in enumerate(indents):
+        query = max(indent, 0)
+        while shallower and indents[shallower[-1]] >= query:
+            shallower.pop()
+        lookbacks.append(shallower[-1] + 1 if shallower else 0)
+        shallower.append(li)
+    return lookbacks
@@ -1,88 +1,257 @@
 from collections.abc import Sequence, Iterable
-from pathlib import Path
+from typing import Tuple
 import logging
-from ._utils import LineIndent, indent_len
-from gitspect.model import Document, Segment
+import time
+from gitspect.instrumentation import enabled
+from ._segmenter import Segmenter, _record
+from ._utils import LineIndent, indent_len, line_indents, lookback_indices
+from gitspect.model import Document, Hunk, Segment, SegmentTable
 
 __all__ = ["PythonSegmenter"]
 
 
-logging.basicConfig(encoding="utf-8", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class PythonSegmenter:
-    def __init__(self, document_name: str, lines: Iterable[str]):
-        self._document_name = document_name
-        self._lines = lines
+class PythonSegmenter(Segmenter):
+    version = 1
 
-    @classmethod
-    def from_path(cls, file_path: Path):
-        return cls(str(file_path), file_path.read_text().split("\n"))
+    def segment_incremental(
+        self, previous: Document, hunks: Sequence[Hunk]
+    ) -> Document:
+        """Segment the new lines re-using the segments of ``previous``.
 
-    def segment(self) -> Document:
+        ``hunks`` describe the change from the previous lines to the new ones.
+        Only the blocks touched by a hunk are segmented again; every other
+        segment is shifted. The result equals ``segment()``.
+        """
+        if not enabled():
+            return self._segment_incremental(previous, hunks)
+        started = time.perf_counter()
+        document = self._segment_incremental(previous, hunks)
+        _record(document, started)
+        return document
+
+    def _iter_spans(self, lines: Iterable[str]) -> Iterable[Tuple[int, int]]:
+        return _python_spans(lines)
+
+    def _segment_incremental(
+        self, previous: Document, hunks: Sequence[Hunk]
+    ) -> Document:
         lines = list(self._lines)
-        non_empty_li = 0
-        indents = []
-        segments = []
-
-        if not lines:
-            return Document(self._document_name, [], [])
-
-        line_indent = indent_len(lines[0])
-        logger.debug("Indent %d at %d", line_indent, 0)
-        indents.append(LineIndent(0, line_indent))
-
-        for li, line in enumerate(lines[1:], 1):
-            if not line.strip():
-                continue
-            line_indent = indent_len(line)
-            if line_indent > indents[-1].indent:
-                logger.debug("Indent %d at %d", line_indent, li)
-                indents.append(LineIndent(li, line_indent))
-            else:
-                while line_indent < indents[-1].indent and not _closing_function_def(
-                    line
-                ):
-                    segment = _create_segment(
-                        self._document_name, lines, indents.pop(), non_empty_li
-                    )
-                    if segment:
-                        logger.debug("Creating segment: %s", segment)
-                        segments.append(segment)
-            non_empty_li = li
-
-        while indents:
-            segment = _create_segment(
-                self._document_name, lines, indents.pop(), non_empty_li
+        old_lines = previous.lines()
+        if (
+            not lines
+            or not old_lines
+            or indent_len(lines[0]) != 0
+            or indent_len(old_lines[0]) != 0
+        ):
+            return self._segment()
+        hunks = sorted(hunks, key=lambda h: h.new_start)
+        length_change = sum(h.new_length - h.old_length for h in hunks)
+        if length_change != len(lines) - len(old_lines):
+            raise ValueError("Hunks do not describe the change between the documents")
+
+        old_segments = previous.segments()
+        tail_length = 2 if _valid_segment_start(old_lines[-1]) else 1
+        old_starts = old_segments.starts[: len(old_segments) - tail_length]
+        old_ends = old_segments.ends[: len(old_segments) - tail_length]
+
+        segments = SegmentTable(self._document_name)
+        old_li = 0
+        delta = 0
+        for lo, hi, window_delta in _changed_windows(lines, hunks):
+            old_lo = lo - delta
+            while old_li < len(old_starts) and old_starts[old_li] < old_lo:
+                segments.append(old_starts[old_li] + delta, old_ends[old_li] + delta)
+                old_li += 1
+            delta += window_delta
+            old_hi = hi - delta
+            while old_li < len(old_starts) and old_starts[old_li] < old_hi:
+                old_li += 1
+            _segment_window(
+                self._document_name, lines, lo, hi, [LineIndent(0, 0)], 1, segments
             )
-            if segment:
-                logger.debug("Creating segment: %s", segment)
-                segments.append(segment)
-        segments.append(
-            Segment(start=0, end=non_empty_li, document_name=self._document_name)
+        for li in range(old_li, len(old_starts)):
+            segments.append(old_starts[li] + delta, old_ends[li] + delta)
+
+        non_empty_li = next(
+            (li for li in range(len(lines) - 1, 0, -1) if lines[li].strip()), 0
         )
+        if _valid_segment_start(lines[-1]):
+            segments.append(_lookback_index(lines, -1), non_empty_li + 1)
+        segments.append(0, non_empty_li)
         return Document(
             document_name=self._document_name, lines=lines, segments=segments
         )
 
 
+def _python_spans(lines: Iterable[str], tab_len: int = 4) -> Iterable[Tuple[int, int]]:
+    # One pass computing what _segment_window computes over the whole
+    # document. ``blocks`` holds the open blocks as (indent, header line,
+    # header lookback); the first one is the module, whose header is the
+    # last line. ``shallower`` is the lookback stack of lookback_indices,
+    # cut back at blank lines since nothing below one is ever consulted.
+    line_iter = iter(lines)
+    first = next(line_iter, None)
+    if first is None:
+        return
+    blocks = [(indent_len(first, tab_len), None, 0)]
+    first_indent = line_indents([first], tab_len)[0]
+    shallower = [(0, first_indent)]
+    previous, previous_lookback = first, 0
+    non_empty_li = li = 0
+    for li, line in enumerate(line_iter, 1):
+        spaced_line = line.expandtabs(tab_len)
+        content = spaced_line.lstrip()
+        if not content:
+            while shallower and shallower[-1][1] >= 0:
+                shallower.pop()
+            lookback = shallower[-1][0] + 1 if shallower else 0
+            shallower = [(li, -1)]
+            previous, previous_lookback = line, lookback
+            continue
+        line_indent = len(spaced_line) - len(content)
+        while shallower and shallower[-1][1] >= line_indent:
+            shallower.pop()
+        lookback = shallower[-1][0] + 1 if shallower else 0
+        shallower.append((li, line_indent))
+        if line_indent > blocks[-1][0]:
+            logger.debug("Indent %d at %d", line_indent, li)
+            blocks.append((line_indent, previous, previous_lookback))
+        elif line_indent < blocks[-1][0] and not _closing_function_def(line):
+            while line_indent < blocks[-1][0]:
+                _, header, header_lookback = blocks.pop()
+                if _valid_segment_start(header):
+                    yield header_lookback, non_empty_li + 1
+                else:
+                    logger.debug("Skipping segment starting with: '%s'", header)
+        non_empty_li = li
+        previous, previous_lookback = line, lookback
+    while blocks:
+        _, header, header_lookback = blocks.pop()
+        if header is None:
+            # the module block looks back from the last line
+            header, header_lookback = previous, previous_lookback - (li + 1)
+        if _valid_segment_start(header):
+            yield header_lookback, non_empty_li + 1
+        else:
+            logger.debug("Skipping segment starting with: '%s'", header)
+    yield 0, non_empty_li
+
+
+def _segment_window(
+    document_name: str,
+    lines: list[str],
+    lo: int,
+    hi: int,
+    indents: list[LineIndent],
+    keep: int,
+    segments: SegmentTable,
+) -> int:
+    # Line ``lo`` is either the first line or a line at indent 0, which has
+    # been accounted for by the caller. Blocks still open at ``hi`` are closed
+    # down to the first ``keep`` indents.
+    window_indents = line_indents(lines[lo:hi])
+    lookbacks = [lo + li for li in lookback_indices(window_indents)]
+    non_empty_li = lo
+    for li in range(lo + 1, hi):
+        line_indent = window_indents[li - lo]
+        if line_indent < 0:
+            continue
+        if line_indent > indents[-1].indent:
+            logger.debug("Indent %d at %d", line_indent, li)
+            indents.append(LineIndent(li, line_indent))
+        elif line_indent < indents[-1].indent and not _closing_function_def(lines[li]):
+            while line_indent < indents[-1].indent:
+                segment = _create_segment(
+                    document_name, lines, lo, lookbacks, indents.pop(), non_empty_li
+                )
+                if segment:
+                    logger.debug("Creating segment: %s", segment)
+                    segments.append(segment.start, segment.end)
+        non_empty_li = li
+    while len(indents) > keep:
+        segment = _create_segment(
+            document_name, lines, lo, lookbacks, indents.pop(), non_empty_li
+        )
+        if segment:
+            logger.debug("Creating segment: %s", segment)
+            segments.append(segment.start, segment.end)
+    return non_empty_li
+
+
+def _changed_windows(
+    lines: list[str], hunks: Sequence[Hunk]
+) -> Iterable[tuple[int, int, int]]:
+    """Line windows of the new lines that must be segmented again, with the
+    change in length each window contains.
+
+    A window starts and ends at lines where the segmenter is back at module
+    level: an unchanged, unindented line after an unchanged blank line.
+    Lookbacks stop at blank lines, so nothing outside a window depends on
+    lines inside it.
+    """
+    window = None
+    for hunk in hunks:
+        changed_start = hunk.new_start - 1 if hunk.new_length else hunk.new_start
+        changed_end = changed_start + hunk.new_length
+        lo = changed_start - 1
+        while lo > 0 and not _module_level_line(lines, lo):
+            lo -= 1
+        lo = max(lo, 0)
+        hi = changed_end + 1
+        while hi < len(lines) and not _module_level_line(lines, hi):
+            hi += 1
+        hi = min(hi, len(lines))
+        hunk_delta = hunk.new_length - hunk.old_length
+        if window is not None and lo <= window[1]:
+            window = (window[0], max(hi, window[1]), window[2] + hunk_delta)
+        else:
+            if window is not None:
+                yield window
+            window = (lo, hi, hunk_delta)
+    if window is not None:
+        yield window
+
+
+def _module_level_line(lines: list[str], li: int) -> bool:
+    line = lines[li]
+    return (
+        not lines[li - 1].strip()
+        and line.strip() != ""
+        and indent_len(line) == 0
+        and not _closing_function_def(line)
+    )
+
+
 def _closing_function_def(line):
     # This assumes BLACK formatting
     return line.strip().startswith(")") and line.strip().endswith(":")
 
 
 def _create_segment(
-    document_name: str, lines: list[str], start: LineIndent, non_empty_li: int
+    document_name: str,
+    lines: list[str],
+    lo: int,
+    lookbacks: list[int],
+    start: LineIndent,
+    non_empty_li: int,
 ) -> Segment | None:
-    if _valid_segment_start(lines[start.li - 1]):
+    header_li = start.li - 1
+    if _valid_segment_start(lines[header_li]):
+        if header_li < lo:
+            # the closing module level block looks back from the last line
+            lookback = _lookback_index(lines, header_li)
+        else:
+            lookback = lookbacks[header_li - lo]
         return Segment(
-            start=_lookback_index(lines, start.li - 1),
+            start=lookback,
             end=non_empty_li + 1,
             document_name=document_name,
         )
     else:
-        logger.debug("Skipping segment starting with: '%s'", lines[start.li - 1])
+        logger.debug("Skipping segment starting with: '%s'", lines[header_li])
         return None
 
 
@@ -91,10 +260,10 @@ def _valid_segment_start(line: str) -> bool:
 
 
 def _lookback_index(lines: Sequence[str], start_index: int) -> int:
+    if start_index < 0:
+        return _lookback_index(lines, start_index + len(lines)) - len(lines)
     start_indent = indent_len(lines[start_index])
-    for lookback_line in reversed(lines[:start_index]):
-        if lookback_line.strip() and indent_len(lookback_line) >= start_indent:
-            start_index -= 1
-        else:
-            break
-    return start_index
+    li = start_index - 1
+    while li >= 0 and lines[li].strip() and indent_len(lines[li]) >= start_indent:
+        li -= 1
+    return li + 1
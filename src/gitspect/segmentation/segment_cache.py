@@ -0,0 +1,135 @@
+import sqlite3
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Tuple
+
+from gitspect.model import SegmentTable
+from gitspect.respository import BlobId, GitRepository
+from ._segmenter import Segmenter
+from .python_segmentation import PythonSegmenter
+
+__all__ = ["SegmentCache", "BlobSegmenter"]
+
+Spans = Sequence[Tuple[int, int]]
+
+_default_max_entries = 4096
+_cache_file = Path("gitspect") / "segments.sqlite"
+
+
+class SegmentCache:
+    def __init__(self, max_entries: int = _default_max_entries, path: Path = None):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Tuple[BlobId, str], array] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " blob_id TEXT NOT NULL,"
+                " segmenter TEXT NOT NULL,"
+                " spans BLOB NOT NULL,"
+                " PRIMARY KEY (blob_id, segmenter)"
+                ") WITHOUT ROWID"
+            )
+
+    @classmethod
+    def for_repository(
+        cls, repo: GitRepository, max_entries: int = _default_max_entries
+    ) -> "SegmentCache":
+        return cls(max_entries, repo.git_dir / _cache_file)
+
+    def get(self, blob_id: BlobId, segmenter: str) -> Spans | None:
+        key = (blob_id, segmenter)
+        spans = self._entries.get(key)
+        if spans is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute(
+                "SELECT spans FROM segments WHERE blob_id = ? AND segmenter = ?", key
+            ).fetchone()
+            if row is not None:
+                spans = array("i")
+                spans.frombytes(row[0])
+                self._remember(key, spans)
+        return None if spans is None else _pairs(spans)
+
+    def put(self, blob_id: BlobId, segmenter: str, spans: Spans):
+        key = (blob_id, segmenter)
+        packed = array("i", (offset for span in spans for offset in span))
+        self._remember(key, packed)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?)",
+                (*key, packed.tobytes()),
+            )
+
+    def flush(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _remember(self, key: Tuple[BlobId, str], spans: array):
+        self._entries[key] = spans
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class BlobSegmenter:
+    def __init__(
+        self,
+        repo: GitRepository,
+        cache: SegmentCache,
+        segmenter: type[Segmenter] = PythonSegmenter,
+    ):
+        self._repo = repo
+        self._cache = cache
+        self._segmenter = segmenter
+        self._segmenter_key = (
+            f"{segmenter.__module__}.{segmenter.__qualname__}:{segmenter.version}"
+        )
+
+    def segments(self, blob_id: BlobId, document_name: str) -> SegmentTable:
+        ((_, segments),) = self.segments_many([(blob_id, document_name)])
+        return segments
+
+    def segments_many(
+        self, blobs: Iterable[Tuple[BlobId, str]]
+    ) -> Iterable[Tuple[BlobId, SegmentTable]]:
+        blobs = list(blobs)
+        spans = {}
+        missing = {}
+        for blob_id, document_name in blobs:
+            if blob_id not in spans:
+                spans[blob_id] = self._cache.get(blob_id, self._segmenter_key)
+                if spans[blob_id] is None:
+                    missing[blob_id] = document_name
+        for blob_id, data in self._repo.read_blobs_bytes(missing):
+            document = self._segmenter.from_bytes(missing[blob_id], data).segment()
+            spans[blob_id] = list(document.segments().spans())
+            self._cache.put(blob_id, self._segmenter_key, spans[blob_id])
+        self._cache.flush()
+        for blob_id, document_name in blobs:
+            yield blob_id, SegmentTable(
+                document_name,
+                (start for start, _ in spans[blob_id]),
+                (end for _, end in spans[blob_id]),
+            )
+
+
+def _pairs(spans: array) -> Spans:
+    return list(zip(spans[::2], spans[1::2]))
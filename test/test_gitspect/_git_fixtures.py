@@ -0,0 +1,52 @@
+import os
+import subprocess
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+_git_env = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Test Author",
+    "GIT_AUTHOR_EMAIL": "author@example.com",
+    "GIT_COMMITTER_NAME": "Test Committer",
+    "GIT_COMMITTER_EMAIL": "committer@example.com",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+def git(path: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(path), *args],
+        capture_output=True,
+        check=True,
+        env=_git_env,
+    ).stdout.decode()
+
+
+def make_repository(
+    path: Path, commits: Sequence[Mapping[str, str | None]]
+) -> list[str]:
+    """Create a repository at ``path`` with one commit per mapping.
+
+    Each mapping goes from file path to new content, or ``None`` to delete
+    the file. Returns the commit ids, oldest first.
+    """
+    git(path, "init", "-q", "-b", "main")
+    commit_ids = []
+    for ci, files in enumerate(commits):
+        for file_path, content in files.items():
+            target = path / file_path
+            if content is None:
+                git(path, "rm", "-q", file_path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text(content)
+                git(path, "add", file_path)
+        date = f"2024-01-01T00:00:{ci:02d}+00:00"
+        subprocess.run(
+            ["git", "-C", str(path), "commit", "-q", "-m", f"commit {ci}"],
+            check=True,
+            env={**_git_env, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+        )
+        commit_ids.append(git(path, "rev-parse", "HEAD").strip())
+    return commit_ids
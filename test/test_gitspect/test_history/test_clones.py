@@ -0,0 +1,169 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.history import CloneIndex, CloneSegment, CloneTracker
+from gitspect.history._clones import _normalized_tokens
+from gitspect.respository import GitRepository
+from test_gitspect._git_fixtures import make_repository
+
+_original = """def total_price(items, discount):
+    total = 0
+    for item in items:
+        if item.quantity > 0:
+            total += item.price * item.quantity
+    # discounts never make a price negative
+    return max(total - discount, 0)
+"""
+
+# names, literals and comments changed: the same normalized tokens
+_renamed = """def order_sum(lines, rebate):
+    acc = 0
+    for line in lines:
+        if line.count > 10:
+            acc += line.cost * line.count
+    return max(acc - rebate, 1)
+"""
+
+# one statement added
+_edited = """def total_price(items, discount):
+    total = 0
+    for item in items:
+        if item.quantity > 0:
+            total += item.price * item.quantity
+    total = round(total, 2)
+    return max(total - discount, 0)
+"""
+
+_unrelated = """class Reader:
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read().split()
+"""
+
+
+def _lines(text: str) -> list[str]:
+    return text.rstrip("\\n").split("\\n")
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    tokens = _normalized_tokens(text)
+    return {tuple(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class TestCloneIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CloneIndex()
+        self.original = self.index.add(_lines(_original), "a.py", 0, 7, "c0")
+        self.unrelated = self.index.add(_lines(_unrelated), "b.py", 0, 7, "c0")
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_normalized_copy_shares_fingerprint(self):
+        renamed = self.index.add(_lines(_renamed), "c.py", 3, 9, "c1")
+        self.assertEqual(renamed, self.original)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(
+            self.index.segments(self.original),
+            [CloneSegment("c0", "a.py", 0, 7), CloneSegment("c1", "c.py", 3, 9)],
+        )
+        # the first position of a path is kept
+        self.index.add(_lines(_renamed), "c.py", 20, 26, "c2")
+        self.assertEqual(len(self.index.segments(self.original)), 2)
+
+    def test_similar(self):
+        (match,) = self.index.similar(_lines(_edited), threshold=0.5)
+        self.assertEqual(match.fingerprint_id, self.original)
+        self.assertEqual(match.segments, [CloneSegment("c0", "a.py", 0, 7)])
+        a, b = _shingles(_original), _shingles(_edited)
+        self.assertAlmostEqual(match.similarity, len(a & b) / len(a | b), delta=0.15)
+        self.assertEqual(self.index.similar(_lines(_original))[0].similarity, 1.0)
+        self.assertEqual(self.index.similar(_lines(_edited), threshold=0.95), [])
+
+    def test_similar_to(self):
+        edited = self.index.add(_lines(_edited), "a.py", 0, 8, "c1")
+        matches = self.index.similar_to(self.original, threshold=0.5)
+        self.assertEqual([m.fingerprint_id for m in matches], [edited])
+        self.assertEqual(self.index.similar_to(self.unrelated, threshold=0.5), [])
+        with self.assertRaises(ValueError):
+            self.index.similar_to(-1)
+
+    def test_short_segments_are_skipped(self):
+        self.assertIsNone(self.index.add(["x = 1"], "d.py", 0, 1))
+        self.assertEqual(self.index.similar(["x = 1"]), [])
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "clones" / "index.sqlite"
+            with CloneIndex(path, num_perm=64, bands=16) as index:
+                fingerprint_id = index.add(_lines(_original), "a.py", 0, 7)
+            with CloneIndex(path, num_perm=64, bands=16) as index:
+                (match,) = index.similar(_lines(_edited), threshold=0.5)
+                self.assertEqual(match.fingerprint_id, fingerprint_id)
+            with self.assertRaises(ValueError):
+                CloneIndex(path, num_perm=128, bands=16)
+
+    def test_bands_must_divide_num_perm(self):
+        with self.assertRaises(ValueError):
+            CloneIndex(num_perm=128, bands=30)
+
+
+class TestCloneTracker(unittest.TestCase):
+    def test_track(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            commit_ids = make_repository(
+                path,
+                [
+                    {"shop/cart.py": _original + "\n\n" + _unrelated},
+                    {"billing.py": "import os\n\n\n" + _edited, "notes.txt": "x\n"},
+                    {"shop/cart.py": None},
+                ],
+            )
+            with GitRepository(path) as repo, CloneIndex() as index:
+                CloneTracker(repo, index).track(commit_ids)
+                self.assertEqual(index.last_commit, commit_ids[-1])
+                matches = index.similar(_lines(_original), threshold=0.5)
+                segments = [s for m in matches for s in m.segments]
+                self.assertIn(
+                    CloneSegment(commit_ids[0], "shop/cart.py", 0, 7), segments
+                )
+                self.assertIn(
+                    (commit_ids[1], "billing.py"),
+                    [(s.commit_id, s.path) for s in segments],
+                )
+                self.assertNotIn("notes.txt", [s.path for s in segments])
+
+    def test_copies_in_one_commit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            commit_ids = make_repository(path, [{"a.py": _original, "b.py": _original}])
+            with GitRepository(path) as repo, CloneIndex() as index:
+                CloneTracker(repo, index).track(commit_ids)
+                (match,) = index.similar(_lines(_original))
+                self.assertEqual(
+                    sorted(s.path for s in match.segments), ["a.py", "b.py"]
+                )
+
+    def test_track_between_resumes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            commit_ids = make_repository(
+                path, [{"a.py": _unrelated}, {"a.py": _original}, {"b.py": _edited}]
+            )
+            with GitRepository(path) as repo, CloneIndex() as index:
+                tracker = CloneTracker(repo, index)
+                with self.assertRaises(ValueError):
+                    tracker.track_between()
+                tracker.track(commit_ids[:1])
+                tracker.track_between(end="main")
+                self.assertEqual(index.last_commit, commit_ids[-1])
+                matches = index.similar(_lines(_original), threshold=0.5)
+                self.assertEqual(
+                    {(s.commit_id, s.path) for m in matches for s in m.segments},
+                    {(commit_ids[1], "a.py"), (commit_ids[2], "b.py")},
+                )
@@ -0,0 +1,183 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.history import LineageIndex, LineageTracker
+from gitspect.respository import GitRepository
+from gitspect.segmentation import default_registry
+from test_gitspect._git_fixtures import make_repository
+
+_v0 = """import os
+
+
+def area(width, height):
+    return width * height
+
+
+class Shape:
+    def describe(self):
+        return "shape"
+"""
+
+# area body edited, describe untouched
+_v1 = """import os
+
+
+def area(width, height):
+    result = width * height
+    return result
+
+
+class Shape:
+    def describe(self):
+        return "shape"
+"""
+
+# area renamed with the body kept, a new function added
+_v2 = """import os
+
+
+def surface(width, height):
+    result = width * height
+    return result
+
+
+def perimeter(width, height):
+    return 2 * (width + height)
+
+
+class Shape:
+    def describe(self):
+        return "shape"
+"""
+
+
+class TestLineageTracker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.repo_path = Path(cls._tmp.name) / "repo"
+        cls.repo_path.mkdir()
+        cls.commit_ids = make_repository(
+            cls.repo_path,
+            [{"shapes.py": _v0}, {"shapes.py": _v1}, {"shapes.py": _v2}],
+        )
+        cls.repo = GitRepository(cls.repo_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        self.index = LineageIndex()
+        LineageTracker(self.repo, self.index).track(self.commit_ids)
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_edits_extend_lineage(self):
+        (lineage_id,) = self.index.lineages("area")
+        versions = self.index.versions(lineage_id)
+        self.assertEqual(
+            [(v.commit_id, v.qualname) for v in versions],
+            [
+                (self.commit_ids[0], "area"),
+                (self.commit_ids[1], "area"),
+                (self.commit_ids[2], "surface"),
+            ],
+        )
+
+    def test_rename_keeps_lineage(self):
+        self.assertEqual(self.index.lineages("surface"), self.index.lineages("area"))
+        self.assertEqual(self.index.commits_touching("surface"), self.commit_ids)
+
+    def test_unchanged_segment_not_versioned(self):
+        self.assertEqual(
+            self.index.commits_touching("Shape.describe"), self.commit_ids[:1]
+        )
+        self.assertEqual(
+            self.index.lineages("describe"), self.index.lineages("Shape.describe")
+        )
+
+    def test_new_segment_starts_lineage(self):
+        self.assertEqual(self.index.commits_touching("perimeter"), self.commit_ids[2:])
+        self.assertNotEqual(
+            self.index.lineages("perimeter"), self.index.lineages("surface")
+        )
+
+    def test_track_between_resumes(self):
+        with LineageIndex() as index:
+            tracker = LineageTracker(self.repo, index)
+            with self.assertRaises(ValueError):
+                tracker.track_between()
+            tracker.track(self.commit_ids[:1])
+            self.assertEqual(index.last_commit, self.commit_ids[0])
+            tracker.track_between(end="main")
+            self.assertEqual(index.last_commit, self.commit_ids[-1])
+            self.assertEqual(
+                index.commits_touching("surface"),
+                self.index.commits_touching("surface"),
+            )
+            (lineage_id,) = index.lineages("perimeter")
+            self.assertEqual(
+                [(v.path, v.qualname) for v in index.versions(lineage_id)],
+                [("shapes.py", "perimeter")],
+            )
+            self.assertEqual(
+                {s.qualname for s in index.live_segments("shapes.py")},
+                {"surface", "perimeter", "Shape", "Shape.describe"},
+            )
+
+    def test_unknown_name(self):
+        self.assertEqual(self.index.commits_touching("missing"), [])
+
+    def test_persistent_index(self):
+        index_path = Path(self._tmp.name) / "lineage" / "index.sqlite"
+        with LineageIndex(index_path) as index:
+            LineageTracker(self.repo, index).track(self.commit_ids[:2])
+        with LineageIndex(index_path) as index:
+            self.assertEqual(index.last_commit, self.commit_ids[1])
+            LineageTracker(self.repo, index).track(self.commit_ids[2:])
+            self.assertEqual(
+                index.commits_touching("surface"),
+                self.index.commits_touching("surface"),
+            )
+
+
+class TestLineageTrackerCopies(unittest.TestCase):
+    def test_one_blob_under_two_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            commit_ids = make_repository(
+                path, [{"a.py": _v0, "b.py": _v0}, {"a.py": _v1}]
+            )
+            with GitRepository(path) as repo, LineageIndex() as index:
+                LineageTracker(repo, index).track(commit_ids)
+                lineage_ids = index.lineages("area")
+                self.assertEqual(len(lineage_ids), 2)
+                versions = [index.versions(i) for i in lineage_ids]
+                self.assertCountEqual(
+                    [[(v.commit_id, v.path) for v in vs] for vs in versions],
+                    [
+                        [(commit_ids[0], "a.py"), (commit_ids[1], "a.py")],
+                        [(commit_ids[0], "b.py")],
+                    ],
+                )
+
+    def test_registry_chooses_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            commit_ids = make_repository(path, [{"a.pyi": _v0, "a.txt": _v0}])
+            with GitRepository(path) as repo:
+                for registry, paths in ((None, []), (default_registry, ["a.pyi"])):
+                    with self.subTest(registry=registry), LineageIndex() as index:
+                        LineageTracker(repo, index, registry=registry).track(commit_ids)
+                        self.assertEqual(
+                            [
+                                v.path
+                                for i in index.lineages("area")
+                                for v in index.versions(i)
+                            ],
+                            paths,
+                        )
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.history import HistorySegmenter
+from gitspect.respository import GitRepository
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+from test_gitspect._git_fixtures import make_repository
+
+
+def _module(n: int) -> str:
+    return "".join(f"def f{i}():\n    return {i}\n\n\n" for i in range(n))
+
+
+class TestHistorySegmenter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.commit_ids = make_repository(
+            Path(cls._tmp.name),
+            [
+                {"a.py": _module(1), "notes.txt": "x\n"},
+                {"a.py": _module(2), "pkg/b.py": _module(3)},
+                {"a.py": _module(4), "notes.txt": "y\n"},
+                {"pkg/b.py": None, "c.py": _module(5)},
+            ],
+        )
+        cls.repo = GitRepository(Path(cls._tmp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls._tmp.cleanup()
+
+    def expected(self, commit_ids=None):
+        # the Python files each commit adds or modifies, in diff-tree order
+        changed = [
+            [("a.py", _module(1))],
+            [("a.py", _module(2)), ("pkg/b.py", _module(3))],
+            [("a.py", _module(4))],
+            [("c.py", _module(5))],
+        ]
+        expected = []
+        for commit_id, files in zip(self.commit_ids, changed):
+            if commit_ids is None or commit_id in commit_ids:
+                for path, content in files:
+                    document = PythonSegmenter(path, content.split("\n")).segment()
+                    expected.append((commit_id, Path(path), list(document.segments())))
+        return expected
+
+    def test_ordered(self):
+        segmenter = HistorySegmenter(
+            self.repo, max_workers=2, chunk_size=1, max_pending_chunks=2
+        )
+        results = [
+            (r.commit_id, r.path, list(r.document.segments()))
+            for r in segmenter.segment(self.commit_ids)
+        ]
+        self.assertEqual(results, self.expected())
+        self.assertEqual(segmenter.stats.files, len(results))
+        self.assertEqual(segmenter.stats.segments, sum(len(s) for _, _, s in results))
+
+    def test_unordered(self):
+        segmenter = HistorySegmenter(self.repo, max_workers=2, ordered=False)
+        results = [
+            (r.commit_id, r.path, list(r.document.segments()))
+            for r in segmenter.segment_between(self.commit_ids[0])
+        ]
+        self.assertCountEqual(results, self.expected(self.commit_ids[1:]))
@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.history import RepositoryScanner, ScanCheckpoint, ScanTarget
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+from test_gitspect._git_fixtures import make_repository
+
+
+def _module(n: int) -> str:
+    return "".join(f"def f{i}():\n    return {i}\n\n\n" for i in range(n))
+
+
+def _summary(documents):
+    return [(d.commit_id, d.path, list(d.document.segments())) for d in documents]
+
+
+class TestRepositoryScanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        root = Path(cls._tmp.name)
+        cls.paths = [root / "one", root / "two"]
+        cls.commit_ids = []
+        for pi, path in enumerate(cls.paths):
+            path.mkdir()
+            cls.commit_ids.append(
+                make_repository(
+                    path,
+                    [
+                        {"a.py": _module(1 + pi)},
+                        {"a.py": _module(2 + pi), "b.py": _module(3)},
+                        {"a.py": _module(4), "notes.txt": "x\n"},
+                    ],
+                )
+            )
+        cls.not_a_repo = root / "plain"
+        cls.not_a_repo.mkdir()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def expected(self, path: Path, since=None):
+        pi = self.paths.index(path)
+        commit_ids = self.commit_ids[pi]
+        # the Python files each commit adds or modifies
+        changed = [
+            [("a.py", _module(1 + pi))],
+            [("a.py", _module(2 + pi)), ("b.py", _module(3))],
+            [("a.py", _module(4))],
+        ]
+        first = 0 if since is None else commit_ids.index(since) + 1
+        expected = []
+        # scans list commits newest first
+        for ci in reversed(range(first, len(commit_ids))):
+            for file_path, content in changed[ci]:
+                lines = content.split("\n")
+                document = PythonSegmenter(file_path, lines).segment()
+                expected.append(
+                    (commit_ids[ci], Path(file_path), list(document.segments()))
+                )
+        return expected
+
+    def test_scan(self):
+        scanner = RepositoryScanner(max_workers=2, max_repositories=2, chunk_size=1)
+        documents = list(scanner.scan([*self.paths, self.not_a_repo]))
+        for path in self.paths:
+            with self.subTest(path=path.name):
+                found = [d for d in documents if d.repository == path]
+                self.assertEqual(_summary(found), self.expected(path))
+        scans = scanner.checkpoint.scans()
+        self.assertEqual(
+            {path.name: scan.status for path, scan in scans.items()},
+            {"one": "done", "two": "done", "plain": "failed"},
+        )
+        self.assertEqual(
+            scans[self.paths[0]].files,
+            len([d for d in documents if d.repository == self.paths[0]]),
+        )
+
+    def test_since(self):
+        target = ScanTarget(self.paths[1], since=self.commit_ids[1][1])
+        documents = list(RepositoryScanner(max_workers=1).scan([target]))
+        self.assertEqual({d.commit_id for d in documents}, {self.commit_ids[1][2]})
+        self.assertEqual(
+            _summary(documents), self.expected(self.paths[1], self.commit_ids[1][1])
+        )
+
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint_path = Path(tmp) / "scan.sqlite"
+            with ScanCheckpoint(checkpoint_path) as checkpoint:
+                scanner = RepositoryScanner(max_workers=1, checkpoint=checkpoint)
+                list(scanner.scan(self.paths[:1]))
+            with ScanCheckpoint(checkpoint_path) as checkpoint:
+                scanner = RepositoryScanner(max_workers=1, checkpoint=checkpoint)
+                documents = list(scanner.scan(self.paths))
+                self.assertEqual({d.repository for d in documents}, {self.paths[1]})
+                self.assertEqual(checkpoint.completed(), set(self.paths))
+
+    def test_timeout(self):
+        scanner = RepositoryScanner(max_workers=1, timeout=0)
+        self.assertEqual(list(scanner.scan(self.paths)), [])
+        scans = scanner.checkpoint.scans()
+        self.assertEqual([s.status for s in scans.values()], ["timeout", "timeout"])
+        self.assertEqual(scanner.checkpoint.completed(), set())
+
+    def test_closed_early(self):
+        scanner = RepositoryScanner(max_workers=1, chunk_size=1)
+        documents = scanner.scan(self.paths)
+        next(documents)
+        documents.close()
+        self.assertEqual(scanner.checkpoint.completed(), set())
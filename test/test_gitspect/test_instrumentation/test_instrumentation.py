@@ -0,0 +1,85 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.instrumentation import (
+    CallbackCollector,
+    GitCommandEvent,
+    JsonLinesCollector,
+    SegmentationEvent,
+    enabled,
+    instrumented,
+    trace_command,
+)
+from gitspect.respository import GitRepository
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+from test_gitspect._git_fixtures import make_repository
+
+_module = "import os\n\n\ndef f():\n    return 1\n\n\nclass A:\n    def g(self):\n        pass\n"
+
+
+class TestInstrumentation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        cls.commit_ids = make_repository(
+            cls.path, [{"a.py": _module}, {"a.py": _module + "\nx = 1\n"}]
+        )
+        cls.repo = GitRepository(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls._tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        self.assertFalse(enabled())
+        self.assertIsNone(trace_command(["git", "status"]))
+
+    def test_counts_git_commands(self):
+        with instrumented() as run:
+            self.assertTrue(enabled())
+            self.assertEqual(len(list(self.repo.commits())), 2)
+            files = self.repo.list_diff_files(self.commit_ids[1])
+            content = self.repo.read_blob_bytes(files[0].blob_id)
+        self.assertFalse(enabled())
+        rev_list = run.commands["rev-list"]
+        self.assertEqual((rev_list["calls"], rev_list["processes"]), (1, 1))
+        self.assertEqual(rev_list["records"], 2)
+        self.assertGreater(rev_list["bytes_read"], 0)
+        cat_file = run.commands["cat-file"]
+        self.assertEqual(cat_file["records"], 1)
+        self.assertEqual(cat_file["bytes_read"], len(content))
+        self.assertIn("diff-tree", run.commands)
+        self.assertIn("rev-list", run.summary())
+
+    def test_blob_reader_counts_one_process(self):
+        blob_id = self.repo.list_diff_files(self.commit_ids[1])[0].blob_id
+        with GitRepository(self.path) as repo, instrumented() as run:
+            repo.read_blob(blob_id)
+            repo.read_blob(blob_id)
+        self.assertEqual(run.commands["cat-file"]["calls"], 2)
+        self.assertEqual(run.commands["cat-file"]["processes"], 1)
+
+    def test_segmentation_events(self):
+        events = []
+        with instrumented(CallbackCollector(events.append)) as run:
+            document = PythonSegmenter("a.py", _module.split("\n")).segment()
+        self.assertEqual([type(e) for e in events], [SegmentationEvent])
+        self.assertEqual(events[0].document_name, "a.py")
+        self.assertEqual(events[0].lines, len(document.lines()))
+        self.assertEqual(events[0].segments, len(document.segments()))
+        self.assertEqual(run.segmentation["documents"], 1)
+
+    def test_json_lines_trace(self):
+        output = io.StringIO()
+        with instrumented(JsonLinesCollector(output)):
+            list(self.repo.commits())
+        (line,) = output.getvalue().splitlines()
+        event = json.loads(line)
+        self.assertEqual(event["event"], "GitCommandEvent")
+        self.assertEqual(event["command"], "rev-list")
+        self.assertEqual(set(event) - {"event"}, set(GitCommandEvent._fields))
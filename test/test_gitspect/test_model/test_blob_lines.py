@@ -0,0 +1,35 @@
+import unittest
+
+from gitspect.model import BlobLines
+
+
+class TestBlobLines(unittest.TestCase):
+    def test_lines(self):
+        lines = BlobLines("a = 1\r\n\n    b = 'ü'  \nlast".encode())
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(list(lines), ["a = 1\r", "", "    b = 'ü'  ", "last"])
+        self.assertEqual(lines[2], "    b = 'ü'  ")
+        self.assertEqual(lines[-1], "last")
+        self.assertEqual(lines[1:3], ["", "    b = 'ü'  "])
+        self.assertEqual(lines.line_bytes(0), b"a = 1\r")
+        with self.assertRaises(IndexError):
+            lines[4]
+
+    def test_final_newline(self):
+        for data, expected in [
+            (b"", [""]),
+            (b"\n", [""]),
+            (b"a\n", ["a"]),
+            (b"a\n\n", ["a", ""]),
+        ]:
+            with self.subTest(data=data):
+                lines = BlobLines(data)
+                self.assertEqual(list(lines), expected)
+                self.assertEqual([lines[i] for i in range(len(lines))], expected)
+
+    def test_encoding(self):
+        data = "naïve\n".encode("latin-1")
+        with self.assertRaises(UnicodeDecodeError):
+            list(BlobLines(data))
+        self.assertEqual(list(BlobLines(data, "latin-1")), ["naïve"])
+        self.assertEqual(BlobLines(data, errors="replace")[0], "na�ve")
@@ -0,0 +1,47 @@
+import unittest
+
+from gitspect.model import Document, Segment, SegmentTable
+
+lines = ["class A:", "    def f(self):", "        pass", "", "x = 1"]
+segments = [Segment(1, 3, "a.py"), Segment(0, 3, "a.py"), Segment(0, 4, "a.py")]
+
+
+class TestSegmentTable(unittest.TestCase):
+    table = SegmentTable.from_segments("a.py", segments)
+
+    def test_sequence_of_segments(self):
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table[1], segments[1])
+        self.assertEqual(self.table[-1], segments[-1])
+        self.assertEqual(list(self.table), segments)
+        self.assertEqual(self.table, segments)
+        self.assertEqual(
+            self.table[1:], SegmentTable.from_segments("a.py", segments[1:])
+        )
+
+    def test_contains(self):
+        self.assertIn(Segment(0, 3, "a.py"), self.table)
+        self.assertNotIn(Segment(0, 3, "b.py"), self.table)
+        self.assertNotIn(Segment(2, 3, "a.py"), self.table)
+
+    def test_columns(self):
+        self.assertEqual(list(self.table.starts), [1, 0, 0])
+        self.assertEqual(list(self.table.ends), [3, 3, 4])
+        with self.assertRaises(ValueError):
+            SegmentTable("a.py", [0], [])
+
+
+class TestDocument(unittest.TestCase):
+    document = Document("a.py", lines, segments)
+
+    def test_segments_compatible(self):
+        self.assertIsInstance(self.document.segments(), SegmentTable)
+        self.assertEqual(self.document.segments(), segments)
+
+    def test_views_match_slices(self):
+        document = Document("a.py", lines, segments + [Segment(-2, 2, "a.py")])
+        views = list(document.views())
+        self.assertEqual([list(v) for v in views], list(document))
+        self.assertEqual(views[0].text(), "    def f(self):\n        pass")
+        self.assertEqual(views[0][-1], "        pass")
+        self.assertEqual(len(views[-1]), 0)
@@ -0,0 +1,123 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from gitspect.respository import AsyncGitRepository, GitRepository
+from test_gitspect._git_fixtures import make_repository
+
+
+def _summary(commits):
+    return [(c.commit_id, c.parents, c.author, c.committer, c.message) for c in commits]
+
+
+class TestAsyncGitRepository(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        cls.commit_ids = make_repository(
+            cls.path,
+            [
+                {"a.py": "a = 1\n"},
+                {"a.py": "a = 2  \n\n", "b b.py": "b = 1\n"},
+                {"a.py": None, "pkg/c.py": "c = 1\n"},
+            ],
+        )
+        cls.git = GitRepository(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.git.close()
+        cls._tmp.cleanup()
+
+    async def asyncSetUp(self):
+        self.repo = await AsyncGitRepository.open(self.path, max_processes=2)
+
+    async def test_open_not_a_repo(self):
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(ValueError):
+                await AsyncGitRepository.open(Path(path))
+
+    async def test_commits_match_git(self):
+        for kwargs in [
+            {},
+            {"start": 1, "end": 3, "reverse": True},
+            {"paths": ["a.py"]},
+        ]:
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    _summary([c async for c in self.repo.commits(**kwargs)]),
+                    _summary(self.git.commits(**kwargs)),
+                )
+
+    async def test_commits_between(self):
+        commits = [c async for c in self.repo.commits_between(self.commit_ids[0])]
+        self.assertEqual([c.commit_id for c in commits], self.commit_ids[:0:-1])
+
+    async def test_commits_between_unknown_revision(self):
+        with self.assertRaises(ValueError):
+            [c async for c in self.repo.commits_between("no-such-revision")]
+
+    async def test_list_diff_files(self):
+        for commit_id in self.commit_ids:
+            with self.subTest(commit_id=commit_id):
+                files = await self.repo.list_diff_files(commit_id)
+                self.assertEqual(
+                    [(f.path, f.blob_id) for f in files],
+                    [(f.path, f.blob_id) for f in self.git.list_diff_files(commit_id)],
+                )
+
+    async def test_read_blobs_match_git(self):
+        blob_ids = [
+            f.blob_id
+            for f in self.git.list_diff_files(self.commit_ids[1])
+            if set(f.blob_id) != {"0"}
+        ]
+        self.assertEqual(
+            [b async for b in self.repo.read_blobs(blob_ids)],
+            list(self.git.read_blobs(blob_ids)),
+        )
+        self.assertEqual(
+            await self.repo.read_blob(blob_ids[0]), self.git.read_blob(blob_ids[0])
+        )
+        self.assertEqual(
+            await self.repo.read_blob_bytes(blob_ids[1]),
+            self.git.read_blob_bytes(blob_ids[1]),
+        )
+
+    async def test_read_blob_missing(self):
+        with self.assertRaises(ValueError):
+            await self.repo.read_blob("0" * 40)
+
+    async def test_process_limit(self):
+        live = set()
+        peak = 0
+        spawn = asyncio.create_subprocess_exec
+
+        async def counting_spawn(*args, **kwargs):
+            nonlocal peak
+            process = await spawn(*args, **kwargs)
+            live.add(process)
+            peak = max(peak, len(live))
+            wait = process.wait
+
+            async def wait_and_forget():
+                returncode = await wait()
+                live.discard(process)
+                return returncode
+
+            process.wait = wait_and_forget
+            return process
+
+        with mock.patch("asyncio.create_subprocess_exec", counting_spawn):
+            await asyncio.gather(
+                *(self.repo.list_diff_files(c) for c in self.commit_ids * 4),
+                *(self._consume(self.repo.commits()) for _ in range(4)),
+            )
+        self.assertEqual(peak, 2)
+        self.assertEqual(live, set())
+
+    async def _consume(self, commits):
+        return [c async for c in commits]
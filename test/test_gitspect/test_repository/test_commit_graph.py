@@ -0,0 +1,191 @@
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.respository import CommitGraph, GitRepository, PackRepository
+from test_gitspect._git_fixtures import _git_env, git, make_repository
+
+
+def _commit(path: Path, date: str, *args: str):
+    subprocess.run(
+        ["git", "-C", str(path), *args],
+        check=True,
+        capture_output=True,
+        env={**_git_env, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+    )
+
+
+def _build_history(path: Path):
+    make_repository(path, [{"a.py": f"a = {ci}\n"} for ci in range(3)])
+    for bi, branch in enumerate(["one", "two", "three"]):
+        git(path, "checkout", "-q", "-b", branch, "main~1")
+        (path / f"{branch}.py").write_text(f"{branch} = 1\n")
+        git(path, "add", f"{branch}.py")
+        _commit(path, f"2024-01-01T00:01:0{bi}+00:00", "commit", "-q", "-m", branch)
+    git(path, "checkout", "-q", "main")
+    # an octopus merge has its third parent in the commit-graph EDGE chunk
+    _commit(path, "2024-01-01T00:02:00+00:00", "merge", "-q", "-m", "m", "one", "two")
+    git(path, "checkout", "-q", "-b", "four", "three")
+    _commit(path, "2024-01-01T00:02:01+00:00", "merge", "-q", "-m", "m", "main")
+    git(path, "checkout", "-q", "main")
+    _commit(
+        path, "2024-01-01T00:02:02+00:00", "commit", "-q", "--allow-empty", "-m", "x"
+    )
+
+
+class TestCommitGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        _build_history(cls.path)
+        cls.commit_ids = git(cls.path, "rev-list", "--all").split()
+        cls.parents = {
+            line.split()[0]: tuple(line.split()[1:])
+            for line in git(cls.path, "rev-list", "--all", "--parents").splitlines()
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        info_dir = self.path / ".git" / "objects" / "info"
+        (info_dir / "commit-graph").unlink(missing_ok=True)
+        shutil.rmtree(info_dir / "commit-graphs", ignore_errors=True)
+
+    def check(self, graph: CommitGraph):
+        self.assertEqual(sorted(graph.commit_ids()), sorted(self.commit_ids))
+        for commit_id, parents in self.parents.items():
+            self.assertEqual(graph.parents(commit_id), parents)
+            self.assertEqual(
+                graph.generation(commit_id),
+                1 + max((graph.generation(p) for p in parents), default=0),
+            )
+        for a in self.commit_ids:
+            for b in self.commit_ids:
+                with self.subTest(a=a, b=b):
+                    is_ancestor = subprocess.run(
+                        [
+                            "git",
+                            "-C",
+                            str(self.path),
+                            "merge-base",
+                            "--is-ancestor",
+                            a,
+                            b,
+                        ]
+                    ).returncode
+                    self.assertEqual(graph.is_ancestor(a, b), is_ancestor == 0)
+                    bases = git(self.path, "merge-base", "--all", a, b).split()
+                    self.assertEqual(sorted(graph.merge_bases(a, b)), sorted(bases))
+                    self.assertEqual(
+                        graph.commits_between(a, b),
+                        git(self.path, "rev-list", "--date-order", f"{a}..{b}").split(),
+                    )
+        head = self.commit_ids[0]
+        self.assertEqual(
+            graph.commits_between(None, head),
+            git(self.path, "rev-list", "--date-order", head).split(),
+        )
+
+    def test_from_rev_list(self):
+        with GitRepository(self.path) as repo:
+            graph = repo.commit_graph()
+            self.check(graph)
+            self.assertIs(repo.commit_graph(), graph)
+
+    def test_from_file(self):
+        git(self.path, "commit-graph", "write", "--reachable")
+        graph = CommitGraph.from_file(self.path / ".git" / "objects")
+        self.assertEqual(sorted(graph.commit_ids()), sorted(self.commit_ids))
+        with GitRepository(self.path) as repo:
+            self.check(repo.commit_graph())
+
+    def test_from_split_file_missing_commits(self):
+        tip = self.commit_ids[0]
+        git(self.path, "commit-graph", "write", "--split", "--reachable")
+        git(self.path, "branch", "-q", "later", tip)
+        try:
+            git(self.path, "checkout", "-q", "later")
+            _commit(
+                self.path,
+                "2024-01-01T00:03:00+00:00",
+                "commit",
+                "-q",
+                "--allow-empty",
+                "-m",
+                "y",
+            )
+            git(self.path, "commit-graph", "write", "--split", "--reachable")
+            _commit(
+                self.path,
+                "2024-01-01T00:04:00+00:00",
+                "commit",
+                "-q",
+                "--allow-empty",
+                "-m",
+                "z",
+            )
+            later = git(self.path, "rev-parse", "later").strip()
+            self.assertEqual(
+                len(
+                    (self.path / ".git/objects/info/commit-graphs/commit-graph-chain")
+                    .read_text()
+                    .split()
+                ),
+                2,
+            )
+            for repo_type in [GitRepository, PackRepository]:
+                with self.subTest(repo_type=repo_type.__name__):
+                    with repo_type(self.path) as repo:
+                        graph = repo.commit_graph()
+                        self.assertEqual(len(graph), len(self.commit_ids) + 2)
+                        self.assertTrue(graph.is_ancestor(tip, later))
+                        self.assertEqual(graph.merge_base(later, tip), tip)
+                        self.assertEqual(len(graph.commits_between(tip, later)), 2)
+        finally:
+            git(self.path, "checkout", "-q", "main")
+            git(self.path, "branch", "-q", "-D", "later")
+            git(self.path, "gc", "-q", "--prune=now")
+
+    def test_refresh(self):
+        with GitRepository(self.path) as repo:
+            graph = repo.commit_graph()
+            self.assertIs(repo.commit_graph(refresh=True), graph)
+            git(self.path, "checkout", "-q", "-b", "later", self.commit_ids[0])
+            try:
+                _commit(
+                    self.path,
+                    "2024-01-01T00:03:00+00:00",
+                    "commit",
+                    "-q",
+                    "--allow-empty",
+                    "-m",
+                    "y",
+                )
+                refreshed = repo.commit_graph(refresh=True)
+                later = git(self.path, "rev-parse", "later").strip()
+                self.assertNotIn(later, graph)
+                self.assertEqual(refreshed.parents(later), (self.commit_ids[0],))
+                self.assertEqual(
+                    refreshed.generation(later),
+                    graph.generation(self.commit_ids[0]) + 1,
+                )
+            finally:
+                git(self.path, "checkout", "-q", "main")
+                git(self.path, "branch", "-q", "-D", "later")
+
+    def test_pack_repository(self):
+        with PackRepository(self.path) as repo:
+            self.check(repo.commit_graph())
+        git(self.path, "commit-graph", "write", "--reachable")
+        with PackRepository(self.path) as repo:
+            self.check(repo.commit_graph())
+
+    def test_unknown_commit(self):
+        with GitRepository(self.path) as repo:
+            with self.assertRaises(ValueError):
+                repo.commit_graph().is_ancestor("0" * 40, self.commit_ids[0])
@@ -1,6 +1,10 @@
+import tempfile
 import unittest
+from pathlib import Path
 
+from gitspect.respository import GitRepository
 from gitspect.respository._diff import parse_diff
+from test_gitspect._git_fixtures import git, make_repository
 
 raw_diff = """
 diff --git a/src/gitspect/respository/_abc.py b/src/gitspect/respository/_abc.py
@@ -40,5 +44,87 @@ index e78baae..6556f7f 100644
 
 
 class TestDiffParser(unittest.TestCase):
-    def test_something(self):
-        parse_diff(raw_diff)
+    def test_parse_text(self):
+        abc_diff, repository_diff = parse_diff(raw_diff)
+        self.assertEqual(abc_diff.old_path, "src/gitspect/respository/_abc.py")
+        self.assertEqual(abc_diff.new_path, "src/gitspect/respository/_abc.py")
+        self.assertEqual(
+            (abc_diff.old_blob_id, abc_diff.new_blob_id, abc_diff.new_mode),
+            ("9f68b00", "748a08a", "100644"),
+        )
+        (hunk,) = abc_diff.hunks
+        self.assertEqual(
+            (hunk.old_start, hunk.old_length, hunk.new_start, hunk.new_length),
+            (38, 8, 38, 14),
+        )
+        self.assertEqual(hunk.added, [41, 45, 46, 47, 48, 49, 50])
+        self.assertEqual(hunk.removed, [44])
+        (hunk,) = repository_diff.hunks
+        self.assertEqual((hunk.added, hunk.removed), ([62], [62]))
+
+    def test_parse_byte_lines(self):
+        lines = [line.encode() + b"\n" for line in raw_diff.splitlines()]
+        self.assertEqual(list(parse_diff(iter(lines))), list(parse_diff(raw_diff)))
+
+    def test_removed_line_that_looks_like_a_header(self):
+        diff = "\n".join(
+            [
+                "diff --git a/x b/x",
+                "--- a/x",
+                "+++ b/x",
+                "@@ -1,2 +1 @@",
+                "--- a/y",
+                " keep",
+                "\\ No newline at end of file",
+            ]
+        )
+        (file_diff,) = parse_diff(diff)
+        self.assertEqual(file_diff.hunks[0].removed, [1])
+        self.assertEqual(file_diff.hunks[0].added, [])
+
+
+class TestRepositoryDiffs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        path = Path(cls._tmp.name)
+        body = "".join(f"line {i}\n" for i in range(20))
+        cls.commit_ids = make_repository(
+            path,
+            [
+                {"old name.py": body, "run.sh": "echo\n", "data.bin": "\0\1"},
+                {"old name.py": None, "new name.py": body + "extra\n"},
+            ],
+        )
+        (path / "data.bin").write_bytes(b"\0\2")
+        (path / "run.sh").chmod(0o755)
+        git(path, "commit", "-q", "-a", "-m", "binary and mode")
+        cls.commit_ids.append(git(path, "rev-parse", "HEAD").strip())
+        cls.repo = GitRepository(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls._tmp.cleanup()
+
+    def test_rename(self):
+        (file_diff,) = self.repo.diffs([self.commit_ids[1]], context_lines=0)
+        self.assertEqual(file_diff.commit_id, self.commit_ids[1])
+        self.assertEqual(file_diff.status, "renamed")
+        self.assertEqual(
+            (file_diff.old_path, file_diff.new_path), ("old name.py", "new name.py")
+        )
+        self.assertEqual(file_diff.hunks[0].added, [21])
+
+    def test_binary_and_mode_change(self):
+        binary, mode = self.repo.diffs([self.commit_ids[2]])
+        self.assertEqual((binary.new_path, binary.binary), ("data.bin", True))
+        self.assertEqual(binary.hunks, [])
+        self.assertEqual(mode.new_path, "run.sh")
+        self.assertEqual((mode.old_mode, mode.new_mode), ("100644", "100755"))
+
+    def test_diffs_between(self):
+        self.assertEqual(
+            list(self.repo.diffs_between(self.commit_ids[0])),
+            list(self.repo.diffs(self.commit_ids[:0:-1])),
+        )
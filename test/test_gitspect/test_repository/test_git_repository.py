@@ -1,13 +1,17 @@
 import subprocess
+import tempfile
 import unittest
+from datetime import datetime
 from pathlib import Path
 
 from gitspect.respository import GitRepository, GitCommit
 from gitspect.respository._git_file import GitRepositoryFile
 from gitspect.respository._git_repository import (
-    CommitParser,
+    CommitRecordParser,
     _commits_format,
+    _record_separator,
 )
+from test_gitspect._git_fixtures import make_repository
 
 repo_path = Path(__file__).parents[3]
 repo = GitRepository(repo_path)
@@ -43,15 +47,22 @@ class TestGitRepository(unittest.TestCase):
 
     def test_get_last_commit(self):
         last_commit_log = subprocess.run(
-            ["git", "rev-list", "--all", "-1", f"--format={_commits_format}"],
+            [
+                "git",
+                "rev-list",
+                "--all",
+                "-1",
+                "--no-commit-header",
+                f"--format={_commits_format}",
+            ],
             capture_output=True,
-        ).stdout.decode()
-        builder = CommitParser(repo)
-        for ci, line in enumerate(last_commit_log.splitlines()):
-            builder.add_line(line)
+        ).stdout
+        (last_commit,) = CommitRecordParser(repo).parse(
+            last_commit_log.split(_record_separator)
+        )
         self.assertEqual(
-            repo.commits(end=0),
-            builder.build(),
+            list(repo.commits(end=1)),
+            [last_commit],
         )
 
     def test_errors_on_negative_start(self):
@@ -65,6 +76,99 @@ class TestGitRepository(unittest.TestCase):
     def test_get_commits_by_index(self):
         self.assertEqual(list(repo.commits(1, 3, reverse=True)), repo_commits[-3:-1])
 
+    def test_commit_metadata(self):
+        (commit,) = repo.commits(end=1)
+        show = (
+            subprocess.run(
+                [
+                    "git",
+                    "-C",
+                    str(repo_path),
+                    "show",
+                    "-s",
+                    "--format=%P%n%an%n%ae%n%at%n%cn%n%ce%n%ct%n%s",
+                    commit.commit_id,
+                ],
+                capture_output=True,
+            )
+            .stdout.decode()
+            .split("\n")
+        )
+        self.assertEqual(list(commit.parents), show[0].split())
+        self.assertEqual(
+            (
+                commit.author.name,
+                commit.author.email,
+                int(commit.author.time.timestamp()),
+            ),
+            (show[1], show[2], int(show[3])),
+        )
+        self.assertEqual(
+            (
+                commit.committer.name,
+                commit.committer.email,
+                int(commit.committer.time.timestamp()),
+            ),
+            (show[4], show[5], int(show[6])),
+        )
+        self.assertEqual(commit.message, show[7])
+
+    def test_record_parser_message_equal_to_commit_id(self):
+        commit_id = "15dfeb5c2949b9c77fb4264435a67ca4ac176c58"
+        record = "\x1f".join(
+            [
+                commit_id,
+                "",
+                "a",
+                "a@b",
+                "2024-01-01T00:00:00+00:00",
+                "c",
+                "c@d",
+                "2024-01-02T00:00:00+01:00",
+                commit_id,
+            ]
+        ).encode()
+        (commit,) = CommitRecordParser(repo).parse([record])
+        self.assertEqual(commit.commit_id, commit_id)
+        self.assertEqual(commit.message, commit_id)
+        self.assertEqual(commit.parents, ())
+        self.assertEqual(commit.committer.time.utcoffset().total_seconds(), 3600)
+
+    def test_commit_windows_match_full_listing(self):
+        all_ids = [c.commit_id for c in repo.commits()]
+        for start, end in [(0, 1), (1, 3), (2, None), (0, 0)]:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(
+                    [c.commit_id for c in repo.commits(start, end)],
+                    all_ids[start:end],
+                )
+                self.assertEqual(
+                    [c.commit_id for c in repo.commits(start, end, reverse=True)],
+                    all_ids[::-1][start:end],
+                )
+
+    def test_commits_path_filter(self):
+        path = "src/gitspect/respository/_git_runner.py"
+        expected = (
+            subprocess.run(
+                ["git", "-C", str(repo_path), "rev-list", "--all", "--", path],
+                capture_output=True,
+            )
+            .stdout.decode()
+            .split()
+        )
+        self.assertEqual(
+            [c.commit_id for c in repo.commits(paths=[Path(path)])], expected
+        )
+
+    def test_commits_author_and_date_filters(self):
+        self.assertEqual(list(repo.commits(author="no such author <nobody@>")), [])
+        self.assertEqual(list(repo.commits(since=datetime(2099, 1, 1))), [])
+        self.assertEqual(
+            [c.commit_id for c in repo.commits(until="2099-01-01", first_parent=True)],
+            [c.commit_id for c in repo.commits(first_parent=True)],
+        )
+
     def test_get_commits_by_commit(self):
         self.assertEqual(
             list(
@@ -123,10 +227,87 @@ class TestGitRepository(unittest.TestCase):
             file_text,
         )
 
+    def test_read_blob_bytes(self):
+        blob_id = "b2ff4a32f3ef7d86f9572c93d3ec5a8988a0408b"
+        content = subprocess.run(
+            ["git", "cat-file", "blob", blob_id], capture_output=True
+        ).stdout
+        self.assertEqual(repo.read_blob_bytes(blob_id), content)
+        self.assertEqual(list(repo.read_blobs_bytes([blob_id])), [(blob_id, content)])
+
     def test_read_blob_bad_blob_id(self):
         with self.assertRaises(ValueError):
             repo.read_blob("asdf")
 
+    def test_read_blobs(self):
+        blob_ids = [
+            "b2ff4a32f3ef7d86f9572c93d3ec5a8988a0408b",
+            "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391",
+            "b2ff4a32f3ef7d86f9572c93d3ec5a8988a0408b",
+        ]
+        self.assertEqual(
+            list(repo.read_blobs(blob_ids)),
+            [(blob_id, repo.read_blob(blob_id)) for blob_id in blob_ids],
+        )
+
+    def test_read_blobs_bad_blob_id(self):
+        with self.assertRaises(ValueError):
+            list(repo.read_blobs(["e69de29bb2d1d6434b8b29ae775ad8c2e48c5391", "asdf"]))
+        self.assertEqual(repo.read_blob("e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"), "")
+
+    def test_read_blob_context_manager(self):
+        with GitRepository(repo_path) as scoped_repo:
+            scoped_repo.read_blob("e69de29bb2d1d6434b8b29ae775ad8c2e48c5391")
+            reader = scoped_repo._blob_reader
+            self.assertIsNotNone(reader._process)
+        self.assertIsNone(reader._process)
+
     def test_commit_files_invalid_commit(self):
         with self.assertRaises(ValueError):
             list(repo.list_diff_files("asdf"))
+
+
+class TestGitRepositoryDiffFiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        path = Path(cls._tmp.name)
+        cls.commit_ids = make_repository(
+            path,
+            [
+                {"a.py": "a\n", "with space/b c.py": "b\n"},
+                {"with space/b c.py": "bb\n", "d.txt": "d\n"},
+                {"a.py": None},
+            ],
+        )
+        cls.repo = GitRepository(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls._tmp.cleanup()
+
+    def test_paths_with_spaces(self):
+        self.assertEqual(
+            [f.path for f in self.repo.list_diff_files(self.commit_ids[1])],
+            [Path("d.txt"), Path("with space/b c.py")],
+        )
+
+    def test_diff_files_matches_list_diff_files(self):
+        self.assertEqual(
+            list(self.repo.diff_files(self.commit_ids)),
+            [(c, self.repo.list_diff_files(c)) for c in self.commit_ids],
+        )
+        self.assertEqual(self.repo.list_diff_files(self.commit_ids[0]), [])
+
+    def test_diff_files_between(self):
+        self.assertEqual(
+            list(self.repo.diff_files_between(self.commit_ids[0])),
+            list(self.repo.diff_files(self.commit_ids[:0:-1])),
+        )
+
+    def test_diff_files_unknown_commit(self):
+        with self.assertRaises(ValueError):
+            list(self.repo.diff_files([self.commit_ids[0], "0" * 40]))
+        with self.assertRaises(ValueError):
+            list(self.repo.diff_files(["HEAD"]))
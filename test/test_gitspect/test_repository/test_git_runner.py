@@ -0,0 +1,55 @@
+import sys
+import unittest
+
+from gitspect.respository._git_runner import RunGit, GitError
+
+
+class TestRunGit(unittest.TestCase):
+    def test_iter_lines(self):
+        cmd = [sys.executable, "-c", "print('a'); print('b', end='')"]
+        with RunGit(cmd) as git:
+            self.assertEqual(list(git.iter_lines()), [(0, "a\n"), (1, "b")])
+
+    def test_iter_records(self):
+        cmd = [sys.executable, "-c", "print('a\\0bb\\0\\0c', end='')"]
+        with RunGit(cmd, buffer_size=2) as git:
+            self.assertEqual(list(git.iter_records(b"\0")), [b"a", b"bb", b"", b"c"])
+
+    def test_iter_records_spanning_chunks(self):
+        cmd = [
+            sys.executable,
+            "-c",
+            "print('x' * 5000 + '\\0\\0y' + 'z' * 3 + '\\0\\0', end='')",
+        ]
+        for buffer_size in (2, 3, 7, 64 * 1024):
+            with RunGit(cmd, buffer_size=buffer_size) as git:
+                self.assertEqual(
+                    list(git.iter_records(b"\0\0", keep_separator=True)),
+                    [b"x" * 5000 + b"\0\0", b"yzzz\0\0"],
+                )
+
+    def test_full_stderr_does_not_block(self):
+        cmd = [
+            sys.executable,
+            "-c",
+            "import sys; sys.stderr.write('x\\n' * 500000); print('done')",
+        ]
+        with RunGit(cmd, errors_acceptable=True) as git:
+            self.assertEqual(list(git.iter_lines()), [(0, "done\n")])
+            self.assertEqual(len(git.errors().splitlines()), 500000)
+
+    def test_errors_raised_after_output(self):
+        cmd = [
+            sys.executable,
+            "-c",
+            "import sys; sys.stderr.write('bad'); print('done')",
+        ]
+        with RunGit(cmd) as git:
+            with self.assertRaises(GitError):
+                list(git.iter_lines())
+
+    def test_early_exit_terminates_process(self):
+        cmd = [sys.executable, "-c", "while True: print('line')"]
+        with RunGit(cmd, buffer_size=16) as git:
+            self.assertEqual(next(iter(git.iter_lines())), (0, "line\n"))
+        self.assertIsNotNone(git._process.returncode)
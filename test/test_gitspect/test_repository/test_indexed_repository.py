@@ -0,0 +1,161 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from gitspect.respository import GitRepository, IndexedGitRepository
+from test_gitspect._git_fixtures import _git_env, git, make_repository
+
+
+def _commit_at(path: Path, name: str, timestamp: int) -> str:
+    (path / name).write_text(f"{name} = 1\n")
+    git(path, "add", name)
+    date = f"@{timestamp} +0000"
+    subprocess.run(
+        ["git", "-C", str(path), "commit", "-q", "-m", name],
+        check=True,
+        env={**_git_env, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+    )
+    return git(path, "rev-parse", "HEAD").strip()
+
+
+def _summary(commits):
+    return [(c.commit_id, c.parents, c.author, c.committer, c.message) for c in commits]
+
+
+class TestIndexedGitRepository(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "repo"
+        self.path.mkdir()
+        self.commit_ids = make_repository(
+            self.path,
+            [
+                {"a.py": "a = 1\n"},
+                {"a.py": "a = 2\n", "b b.py": "b = 1\n"},
+                {"a.py": None, "pkg/c.py": "c = 1\n"},
+            ],
+        )
+        git(self.path, "checkout", "-q", "-b", "side", self.commit_ids[1])
+        (self.path / "side.py").write_text("s = 1\n")
+        git(self.path, "add", "side.py")
+        git(self.path, "commit", "-q", "-m", "side")
+        git(self.path, "checkout", "-q", "main")
+        self.index_path = Path(self._tmp.name) / "index" / "commits.sqlite"
+        self.git = GitRepository(self.path)
+        self.repo = IndexedGitRepository(self.path, self.index_path)
+
+    def tearDown(self):
+        self.repo.close()
+        self.git.close()
+        self._tmp.cleanup()
+
+    def test_refresh_is_incremental(self):
+        self.assertFalse(self.repo.is_fresh())
+        self.assertEqual(self.repo.refresh(), 4)
+        self.assertTrue(self.repo.is_fresh())
+        self.assertEqual(self.repo.refresh(), 0)
+        (self.path / "d.py").write_text("d = 1\n")
+        git(self.path, "add", "d.py")
+        git(self.path, "commit", "-q", "-m", "d")
+        self.assertFalse(self.repo.is_fresh())
+        self.assertEqual(self.repo.refresh(), 1)
+
+    def test_commits_match_git(self):
+        self.repo.refresh()
+        with mock.patch("gitspect.respository._git_repository.RunGit") as run_git:
+            run_git.side_effect = AssertionError("git was called")
+            indexed = list(self.repo.commits())
+        self.assertEqual(
+            sorted(_summary(indexed)), sorted(_summary(self.git.commits()))
+        )
+        self.assertEqual([c.commit_id for c in indexed[-3:]], self.commit_ids[::-1])
+
+    def test_commit_windows_match_git(self):
+        self.repo.refresh()
+        for start, end, reverse in [(0, 2, False), (1, 3, True), (2, None, True)]:
+            with self.subTest(start=start, end=end, reverse=reverse):
+                self.assertEqual(
+                    _summary(self.repo.commits(start, end, reverse)),
+                    _summary(self.git.commits(start, end, reverse)),
+                )
+
+    def test_commits_between_match_git(self):
+        self.repo.refresh()
+        for start, end in [
+            (self.commit_ids[0], None),
+            (self.commit_ids[0], "side"),
+            ("side", "main"),
+            (self.commit_ids[2], self.commit_ids[2]),
+        ]:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(
+                    _summary(self.repo.commits_between(start, end)),
+                    _summary(self.git.commits_between(start, end)),
+                )
+
+    def test_list_diff_files_match_git(self):
+        self.repo.refresh()
+        for commit_id in self.commit_ids:
+            with self.subTest(commit_id=commit_id):
+                self.assertEqual(
+                    [(f.path, f.blob_id) for f in self.repo.list_diff_files(commit_id)],
+                    [(f.path, f.blob_id) for f in self.git.list_diff_files(commit_id)],
+                )
+
+    def test_stale_index_falls_back_to_git(self):
+        self.repo.refresh()
+        git(self.path, "branch", "-q", "-D", "side")
+        git(self.path, "reset", "-q", "--hard", self.commit_ids[1])
+        self.assertEqual(_summary(self.repo.commits()), _summary(self.git.commits()))
+        self.assertEqual(self.repo.refresh(), 0)
+        self.assertEqual(_summary(self.repo.commits()), _summary(self.git.commits()))
+
+    def test_index_persists(self):
+        self.repo.refresh()
+        self.repo.close()
+        self.repo = IndexedGitRepository(self.path, self.index_path)
+        self.assertTrue(self.repo.is_fresh())
+        self.assertEqual(self.repo.refresh(), 0)
+
+    def test_fast_forward_does_not_prune(self):
+        self.repo.refresh()
+        with mock.patch.object(self.repo, "_prune", wraps=self.repo._prune) as prune:
+            _commit_at(self.path, "d", 2000000000)
+            self.assertEqual(self.repo.refresh(), 1)
+            prune.assert_not_called()
+            git(self.path, "reset", "-q", "--hard", self.commit_ids[1])
+            self.repo.refresh()
+            prune.assert_called_once()
+        self.assertEqual(_summary(self.repo.commits()), _summary(self.git.commits()))
+
+
+class TestIndexedCommitOrder(unittest.TestCase):
+    def test_equal_and_skewed_dates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            git(path, "init", "-q", "-b", "main")
+            with GitRepository(path) as plain, IndexedGitRepository(
+                path, path / "index.sqlite"
+            ) as indexed:
+                for ci in range(3):
+                    _commit_at(path, f"c{ci}", 1000)
+                indexed.refresh()
+                # equal to its parent, older than its parent, then newest
+                for ci, timestamp in ((3, 1000), (4, 500), (5, 2000), (6, 1500)):
+                    _commit_at(path, f"c{ci}", timestamp)
+                indexed.refresh()
+                self.assertTrue(indexed.is_fresh())
+                expected = git(path, "rev-list", "--all").split()
+                self.assertEqual([c.commit_id for c in indexed.commits()], expected)
+                for start, end, reverse in [(1, 4, False), (2, 6, True)]:
+                    with self.subTest(start=start, end=end, reverse=reverse):
+                        self.assertEqual(
+                            _summary(indexed.commits(start, end, reverse)),
+                            _summary(plain.commits(start, end, reverse)),
+                        )
+                self.assertEqual(
+                    [c.commit_id for c in indexed.commits_between(expected[-1])],
+                    expected[:-1],
+                )
@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.respository import (
+    CommitBatch,
+    GitCommit,
+    GitRepository,
+    GitRepositoryFile,
+    ObjectId,
+    ObjectIdArray,
+    ObjectIdPool,
+    PackRepository,
+)
+from test_gitspect._git_fixtures import git, make_repository
+
+
+def _summary(commits):
+    return [(c.commit_id, c.parents, c.author, c.committer, c.message) for c in commits]
+
+
+class TestObjectId(unittest.TestCase):
+    def test_hex(self):
+        object_id = ObjectId.from_hex("0123456789abcdef0123456789abcdef01234567")
+        self.assertEqual(len(object_id), 20)
+        self.assertEqual(str(object_id), "0123456789abcdef0123456789abcdef01234567")
+        self.assertEqual(object_id, ObjectId.from_hex(str(object_id).encode()))
+        self.assertFalse(hasattr(object_id, "__dict__"))
+        with self.assertRaises(ValueError):
+            ObjectId.from_hex("not hex")
+
+    def test_pool(self):
+        pool = ObjectIdPool()
+        first = pool.intern("ab" * 20)
+        self.assertIs(pool.intern("ab" * 20), first)
+        self.assertIs(pool.pop("ab" * 20), first)
+        self.assertEqual(len(pool), 0)
+        self.assertIsNot(pool.pop("ab" * 20), first)
+
+    def test_array(self):
+        ids = ObjectIdArray(["01" * 20, ObjectId.from_hex("02" * 20)])
+        ids.append("03" * 20)
+        self.assertEqual([str(i) for i in ids], ["01" * 20, "02" * 20, "03" * 20])
+        self.assertEqual(ids[-1], ObjectId.from_hex("03" * 20))
+        self.assertEqual(list(ids[1:]), list(ids)[1:])
+        self.assertEqual(ids.index("02" * 20), 1)
+        self.assertIn(ObjectId.from_hex("01" * 20), ids)
+        # the bytes of two neighbouring ids are not an id of the array
+        self.assertNotIn("01" * 10 + "02" * 10, ids)
+        self.assertNotIn("zz", ids)
+        with self.assertRaises(ValueError):
+            ids.append("04" * 32)
+        with self.assertRaises(IndexError):
+            ids[3]
+
+
+class TestCompactCommits(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        cls.commit_ids = make_repository(
+            cls.path, [{"a.py": f"a = {ci}\n", "b/c.py": f"{ci}\n"} for ci in range(5)]
+        )
+        git(cls.path, "checkout", "-q", "-b", "side", cls.commit_ids[2])
+        git(cls.path, "commit", "-q", "--allow-empty", "-m", "side")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_no_instance_dict(self):
+        with GitRepository(self.path) as repo:
+            commit = next(iter(repo.commits()))
+            (file,) = repo.list_diff_files(self.commit_ids[1])[:1]
+        self.assertIsInstance(commit, GitCommit)
+        self.assertIsInstance(file, GitRepositoryFile)
+        for value in (commit, file):
+            with self.assertRaises(AttributeError):
+                value.__dict__
+        self.assertIsInstance(file.path, Path)
+        self.assertIs(file.path, file.path)
+        self.assertEqual(file.posix_path, "a.py")
+        self.assertIsInstance(file.blob_id, str)
+
+    def test_equality(self):
+        with GitRepository(self.path) as repo:
+            a, b = (GitCommit(repo, c) for c in self.commit_ids[:2])
+            self.assertEqual(a, GitCommit(repo, ObjectId.from_hex(a.commit_id)))
+            self.assertNotEqual(a, b)
+            self.assertEqual(len({a, b, GitCommit(repo, a.commit_id)}), 2)
+            files = repo.list_diff_files(self.commit_ids[1])
+            self.assertEqual(files, repo.list_diff_files(self.commit_ids[1]))
+            self.assertEqual(
+                files[0], GitRepositoryFile(repo, Path("a.py"), files[0].blob_id)
+            )
+            self.assertNotEqual(files[0], files[1])
+
+    def test_parent_ids_are_shared(self):
+        with GitRepository(self.path) as repo:
+            commits = list(repo.commits_between(self.commit_ids[0], "main"))
+        for child, parent in zip(commits, commits[1:]):
+            self.assertEqual(child.parents, (parent.commit_id,))
+            self.assertIs(child._parents[0], parent._commit_id)
+
+    def test_batches_match_commits(self):
+        for repo_type in (GitRepository, PackRepository):
+            with self.subTest(repo_type=repo_type.__name__):
+                with repo_type(self.path) as repo:
+                    batches = list(repo.commit_batches(batch_size=4))
+                    self.assertEqual([len(b) for b in batches], [4, 2])
+                    self.assertIsInstance(batches[0], CommitBatch)
+                    self.assertEqual(
+                        _summary(c for b in batches for c in b),
+                        _summary(repo.commits()),
+                    )
+                    self.assertEqual(
+                        [str(i) for b in batches for i in b.commit_ids],
+                        [c.commit_id for c in repo.commits()],
+                    )
+                    filtered = list(repo.commit_batches(paths=["b"], first_parent=True))
+                    self.assertEqual(
+                        _summary(filtered[0]),
+                        _summary(repo.commits(paths=["b"], first_parent=True)),
+                    )
+                    with self.assertRaises(ValueError):
+                        list(repo.commit_batches(batch_size=0))
@@ -0,0 +1,158 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.respository import GitRepository, PackRepository
+from test_gitspect._git_fixtures import _git_env, git, make_repository
+
+
+def _module(version: int) -> str:
+    # large enough for git to store later versions as deltas
+    return "".join(f"def f{i}():\n    return {i * version}\n\n" for i in range(200))
+
+
+def _summary(commits):
+    return [(c.commit_id, c.parents, c.author, c.committer, c.message) for c in commits]
+
+
+def _build_history(path: Path) -> list[str]:
+    commit_ids = make_repository(
+        path,
+        [
+            {"a.py": _module(1), "docs/readme.txt": "readme\n"},
+            {"a.py": _module(2), "b b.py": "b = 1\n"},
+            {"docs/readme.txt": None, "docs/guide/intro.txt": "intro\n"},
+            {"a.py": _module(3)},
+        ],
+    )
+    git(path, "checkout", "-q", "-b", "side", commit_ids[1])
+    (path / "side.py").write_text("side = 1\n")
+    git(path, "add", "side.py")
+    _commit(path, "side work\n\nwith a body", "2024-01-01T00:00:05+02:00")
+    git(path, "checkout", "-q", "main")
+    _commit(path, "merge side", "2024-01-01T00:00:06+00:00", "merge", "-q", "side")
+    git(path, "tag", "-a", "v1", "-m", "release", commit_ids[2])
+    (path / "a.py").chmod(0o755)
+    git(path, "add", "a.py")
+    _commit(path, "make a.py executable", "2024-01-01T00:00:07+00:00")
+    return commit_ids
+
+
+def _commit(path: Path, message: str, date: str, *args: str):
+    args = args or ("commit", "-q")
+    subprocess.run(
+        ["git", "-C", str(path), *args, "-m", message],
+        check=True,
+        capture_output=True,
+        env={**_git_env, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+    )
+
+
+class TestPackRepository(unittest.TestCase):
+    storage = "loose"
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        cls.commit_ids = _build_history(cls.path)
+        if cls.storage == "ofs-delta":
+            git(cls.path, "repack", "-a", "-d", "-q")
+        elif cls.storage == "ref-delta":
+            git(cls.path, "-c", "repack.useDeltaBaseOffset=false", "repack", "-adq")
+        cls.git = GitRepository(cls.path)
+        cls.repo = PackRepository(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+        cls.git.close()
+        cls._tmp.cleanup()
+
+    def test_not_a_repo(self):
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(ValueError):
+                PackRepository(Path(path))
+
+    def test_commits_match_git(self):
+        for kwargs in [
+            {},
+            {"start": 1, "end": 4},
+            {"start": 2, "end": 5, "reverse": True},
+            {"paths": ["a.py"]},
+            {"paths": ["docs"]},
+            {"first_parent": True},
+            {"since": "2024-01-01T00:00:02+00:00", "until": "2024-01-01T00:00:06Z"},
+            {"author": "Author"},
+            {"author": "nobody"},
+        ]:
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    _summary(self.repo.commits(**kwargs)),
+                    _summary(self.git.commits(**kwargs)),
+                )
+
+    def test_commits_between_match_git(self):
+        for start, end in [
+            (self.commit_ids[0], None),
+            (self.commit_ids[1], "side"),
+            ("side", "main"),
+            ("v1", "HEAD"),
+        ]:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(
+                    _summary(self.repo.commits_between(start, end)),
+                    _summary(self.git.commits_between(start, end)),
+                )
+
+    def test_unknown_revision(self):
+        with self.assertRaises(ValueError):
+            list(self.repo.commits_between("no-such-branch"))
+
+    def test_diff_files_match_git(self):
+        commit_ids = [c.commit_id for c in self.git.commits()]
+        for root in (False, True):
+            with self.subTest(root=root):
+                self.assertEqual(
+                    [
+                        (commit_id, [(f.path, f.blob_id) for f in files])
+                        for commit_id, files in self.repo.diff_files(commit_ids, root)
+                    ],
+                    [
+                        (commit_id, [(f.path, f.blob_id) for f in files])
+                        for commit_id, files in self.git.diff_files(commit_ids, root)
+                    ],
+                )
+
+    def test_read_blobs_match_git(self):
+        blob_ids = {
+            f.blob_id
+            for _, files in self.git.diff_files(self.commit_ids, root=True)
+            for f in files
+            if set(f.blob_id) != {"0"}
+        }
+        self.assertEqual(
+            dict(self.repo.read_blobs(blob_ids)), dict(self.git.read_blobs(blob_ids))
+        )
+        self.assertEqual(
+            dict(self.repo.read_blobs_bytes(blob_ids)),
+            dict(self.git.read_blobs_bytes(blob_ids)),
+        )
+
+    def test_read_blob_errors(self):
+        with self.assertRaises(ValueError):
+            self.repo.read_blob("0" * 40)
+        with self.assertRaises(ValueError):
+            self.repo.read_blob(self.commit_ids[0])
+
+
+class TestPackRepositoryOfsDelta(TestPackRepository):
+    storage = "ofs-delta"
+
+    def test_objects_are_packed(self):
+        self.assertEqual(list((self.path / ".git" / "objects").glob("??/*")), [])
+
+
+class TestPackRepositoryRefDelta(TestPackRepository):
+    storage = "ref-delta"
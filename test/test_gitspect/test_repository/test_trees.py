@@ -0,0 +1,165 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from gitspect.respository import (
+    AsyncGitRepository,
+    GitRepository,
+    IndexedGitRepository,
+    PackRepository,
+    TreeCache,
+)
+from test_gitspect._git_fixtures import git, make_repository
+
+
+def _ls_tree(path: Path, commit_id: str):
+    entries = git(path, "ls-tree", "-r", "-z", commit_id).split("\0")[:-1]
+    return [
+        (Path(name), object_id)
+        for meta, name in (entry.split("\t", 1) for entry in entries)
+        for _, _, object_id in [meta.split()]
+    ]
+
+
+def _diff_tree(path: Path, old: str, new: str):
+    tokens = git(path, "diff-tree", "-r", "--no-renames", "-z", old, new)
+    tokens = tokens.split("\0")[:-1]
+    changes = []
+    for meta, name in zip(tokens[::2], tokens[1::2]):
+        _, _, old_id, new_id, _ = meta.split()
+        changes.append((Path(name), _side(old_id), _side(new_id)))
+    return changes
+
+
+def _side(object_id: str):
+    return None if set(object_id) == {"0"} else object_id
+
+
+def _files(files):
+    return [(f.path, f.blob_id) for f in files]
+
+
+def _diffs(diffs):
+    return [
+        (
+            d.path,
+            d.before_file and d.before_file.blob_id,
+            d.after_file and d.after_file.blob_id,
+        )
+        for d in diffs
+    ]
+
+
+class TestTrees(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        files = {
+            f"pkg/sub{i}/m{j}.py": f"x = {i * j}\n" for i in range(4) for j in range(3)
+        }
+        cls.commit_ids = make_repository(
+            cls.path,
+            [
+                {**files, "a.py": "a\n", "a-b.txt": "ab\n", "c": "file\n"},
+                {"pkg/sub2/m1.py": "changed\n"},
+                {"c": None, "c/inside.py": "now a directory\n", "a.py": None},
+                {"pkg/sub0/new.py": "new\n", "a-b.txt": "changed\n"},
+            ],
+        )
+        (cls.path / "pkg" / "sub3" / "m0.py").chmod(0o755)
+        os.symlink("a-b.txt", cls.path / "link")
+        git(cls.path, "add", "-A")
+        git(cls.path, "commit", "-q", "-m", "mode and symlink")
+        cls.commit_ids.append(git(cls.path, "rev-parse", "HEAD").strip())
+        cls.pairs = [
+            (cls.commit_ids[i], cls.commit_ids[j])
+            for i in range(len(cls.commit_ids))
+            for j in range(len(cls.commit_ids))
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def check(self, files_at, diff_between):
+        for commit_id in self.commit_ids:
+            with self.subTest(commit_id=commit_id):
+                self.assertEqual(
+                    _files(files_at(commit_id)), _ls_tree(self.path, commit_id)
+                )
+        for old, new in self.pairs:
+            with self.subTest(old=old, new=new):
+                self.assertEqual(
+                    _diffs(diff_between(old, new)), _diff_tree(self.path, old, new)
+                )
+
+    def test_git_repository(self):
+        with GitRepository(self.path) as repo:
+            self.check(repo.files_at, repo.diff_between)
+            self.assertEqual(_files(repo.files_at("HEAD")), _ls_tree(self.path, "HEAD"))
+
+    def test_indexed_repository(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = IndexedGitRepository(self.path, Path(tmp) / "index.sqlite")
+            with repo:
+                self.check(repo.files_at, repo.diff_between)
+
+    def test_pack_repository(self):
+        with PackRepository(self.path) as repo:
+            self.check(repo.files_at, repo.diff_between)
+
+    def test_async_repository(self):
+        async def collect():
+            repo = await AsyncGitRepository.open(self.path)
+            files = {c: await repo.files_at(c) for c in self.commit_ids}
+            diffs = {pair: await repo.diff_between(*pair) for pair in self.pairs}
+            return files, diffs
+
+        files, diffs = asyncio.run(collect())
+        self.check(files.__getitem__, lambda old, new: diffs[old, new])
+
+    def test_unchanged_subtrees_are_not_read(self):
+        with GitRepository(self.path) as repo:
+            read = []
+            read_trees = repo._read_trees
+            repo._read_trees = lambda ids: read.extend(ids) or read_trees(ids)
+            repo.diff_between(self.commit_ids[0], self.commit_ids[1])
+            names = {
+                git(self.path, "rev-parse", f"{c}:pkg").strip()
+                for c in self.commit_ids[:2]
+            }
+            names |= {
+                git(self.path, "rev-parse", f"{c}:pkg/sub2").strip()
+                for c in self.commit_ids[:2]
+            }
+            self.assertEqual(set(read), names)
+            # trees read once are cached
+            read.clear()
+            repo.diff_between(self.commit_ids[0], self.commit_ids[1])
+            self.assertEqual(read, [])
+            repo.files_at(self.commit_ids[1])
+            read.clear()
+            repo.files_at(self.commit_ids[1])
+            self.assertEqual(read, [])
+
+    def test_unknown_revision(self):
+        with GitRepository(self.path) as repo:
+            with self.assertRaises(ValueError):
+                repo.files_at("no-such-branch")
+        with PackRepository(self.path) as repo:
+            with self.assertRaises(ValueError):
+                repo.diff_between("no-such-branch", "HEAD")
+
+
+class TestTreeCache(unittest.TestCase):
+    def test_least_recently_used_dropped(self):
+        cache = TreeCache(max_trees=2)
+        cache.put("a", {})
+        cache.put("b", {})
+        cache.get("a")
+        cache.put("c", {})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
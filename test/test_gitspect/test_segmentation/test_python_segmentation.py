@@ -1,8 +1,9 @@
+import difflib
 import unittest
 from pathlib import Path
 import inspect
 
-from gitspect.model import Segment
+from gitspect.model import Hunk, Segment
 from gitspect.segmentation.python_segmentation import (
     PythonSegmenter,
     _lookback_index,
@@ -31,6 +32,11 @@ class TestPythonSegmenter(unittest.TestCase):
         self.assertIn(expected, self.document.segments())
         self.assertEqual(python_segmentation.__file__, self.document.document_name)
 
+    def test_from_bytes(self):
+        data = Path(python_segmentation.__file__).read_bytes().replace(b"\n", b"  \r\n")
+        document = PythonSegmenter.from_bytes(python_segmentation.__file__, data)
+        self.assertEqual(document.segment().segments(), self.document.segments())
+
     def test_class_segments(self):
         for x in inspect.getmembers(
             python_segmentation,
@@ -73,3 +79,57 @@ class TestPythonSegmenter(unittest.TestCase):
             )
             self.assertIn(expected, self.document.segments())
         print(self.document.segments())
+
+
+def _hunks(old_lines, new_lines):
+    hunks = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            old_length, new_length = i2 - i1, j2 - j1
+            hunks.append(
+                Hunk(
+                    i1 + 1 if old_length else i1,
+                    old_length,
+                    j1 + 1 if new_length else j1,
+                    new_length,
+                )
+            )
+    return hunks
+
+
+class TestIncrementalSegmentation(unittest.TestCase):
+    old_lines = Path(python_segmentation.__file__).read_text().split("\n")
+    previous = PythonSegmenter("doc.py", old_lines).segment()
+
+    def assert_matches_full_segmentation(self, new_lines):
+        segmenter = PythonSegmenter("doc.py", new_lines)
+        self.assertEqual(
+            segmenter.segment_incremental(
+                self.previous, _hunks(self.old_lines, new_lines)
+            ).segments(),
+            segmenter.segment().segments(),
+        )
+
+    def test_edit_inside_function(self):
+        li = self.old_lines.index("def _closing_function_def(line):")
+        new_lines = list(self.old_lines)
+        new_lines[li + 1 : li + 1] = ["    if not line:", "        return False"]
+        self.assert_matches_full_segmentation(new_lines)
+
+    def test_add_and_remove_functions(self):
+        li = self.old_lines.index("def _valid_segment_start(line: str) -> bool:")
+        new_lines = list(self.old_lines)
+        del new_lines[li : li + 3]
+        new_lines[5:5] = ["", "", "def added():", "    return 1", ""]
+        new_lines.extend(["class Tail:", "    pass"])
+        self.assert_matches_full_segmentation(new_lines)
+
+    def test_unchanged(self):
+        self.assert_matches_full_segmentation(list(self.old_lines))
+
+    def test_mismatched_hunks(self):
+        with self.assertRaises(ValueError):
+            PythonSegmenter("doc.py", self.old_lines + ["x"]).segment_incremental(
+                self.previous, []
+            )
@@ -0,0 +1,81 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from gitspect.respository import GitRepository
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+from gitspect.segmentation.segment_cache import BlobSegmenter, SegmentCache
+
+repo_path = Path(__file__).parents[3]
+document_name = "src/gitspect/segmentation/python_segmentation.py"
+blob_id = (
+    subprocess.run(
+        ["git", "-C", str(repo_path), "rev-parse", f"HEAD:{document_name}"],
+        capture_output=True,
+    )
+    .stdout.decode()
+    .strip()
+)
+
+
+class NewerPythonSegmenter(PythonSegmenter):
+    version = PythonSegmenter.version + 1
+
+
+class TestSegmentCache(unittest.TestCase):
+    def setUp(self):
+        self.repo = GitRepository(repo_path)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self._tmp.name) / "segments.sqlite"
+
+    def tearDown(self):
+        self.repo.close()
+        self._tmp.cleanup()
+
+    def expected_segments(self):
+        lines = self.repo.read_blob(blob_id).split("\n")
+        return list(PythonSegmenter(document_name, lines).segment().segments())
+
+    def test_memory_tier(self):
+        with mock.patch.object(
+            self.repo, "read_blobs_bytes", wraps=self.repo.read_blobs_bytes
+        ) as read_blobs_bytes:
+            segmenter = BlobSegmenter(self.repo, SegmentCache())
+            first = segmenter.segments(blob_id, document_name)
+            second = segmenter.segments(blob_id, "renamed.py")
+        self.assertEqual(first, self.expected_segments())
+        self.assertEqual([s.document_name for s in second], ["renamed.py"] * len(first))
+        self.assertEqual(read_blobs_bytes.call_count, 2)
+        self.assertEqual(list(read_blobs_bytes.call_args_list[1].args[0]), [])
+
+    def test_disk_tier(self):
+        with SegmentCache(path=self.cache_path) as cache:
+            BlobSegmenter(self.repo, cache).segments(blob_id, document_name)
+        with SegmentCache(path=self.cache_path) as cache:
+            with mock.patch.object(self.repo, "read_blobs_bytes") as read_blobs_bytes:
+                read_blobs_bytes.return_value = iter([])
+                segments = BlobSegmenter(self.repo, cache).segments(
+                    blob_id, document_name
+                )
+        self.assertEqual(segments, self.expected_segments())
+        self.assertEqual(list(read_blobs_bytes.call_args.args[0]), [])
+
+    def test_segmenter_version_invalidates(self):
+        cache = SegmentCache()
+        BlobSegmenter(self.repo, cache).segments(blob_id, document_name)
+        with mock.patch.object(
+            self.repo, "read_blobs_bytes", wraps=self.repo.read_blobs_bytes
+        ) as read_blobs_bytes:
+            BlobSegmenter(self.repo, cache, NewerPythonSegmenter).segments(
+                blob_id, document_name
+            )
+        self.assertEqual(list(read_blobs_bytes.call_args.args[0]), [blob_id])
+
+    def test_lru_eviction(self):
+        cache = SegmentCache(max_entries=1)
+        cache.put("a", "s", [(0, 1)])
+        cache.put("b", "s", [(1, 2)])
+        self.assertIsNone(cache.get("a", "s"))
+        self.assertEqual(cache.get("b", "s"), [(1, 2)])
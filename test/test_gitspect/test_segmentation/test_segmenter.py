@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from pathlib import Path, PurePosixPath
+
+from gitspect.model import BlobLines
+from gitspect.segmentation import (
+    SegmenterRegistry,
+    default_registry,
+    iter_blob_lines,
+    iter_file_lines,
+)
+from gitspect.segmentation import python_segmentation
+from gitspect.segmentation.python_segmentation import PythonSegmenter
+
+_source = Path(python_segmentation.__file__)
+
+
+class TestStreamingSegmenter(unittest.TestCase):
+    def test_iter_segments_matches_segment(self):
+        expected = list(PythonSegmenter.from_path(_source).segment().segments())
+        data = _source.read_bytes()
+        for name, segmenter in [
+            ("path", PythonSegmenter.from_path(_source)),
+            ("bytes", PythonSegmenter.from_bytes(str(_source), data + b"\n")),
+            (
+                "iterator",
+                PythonSegmenter(str(_source), iter(_source.read_text().split("\n"))),
+            ),
+        ]:
+            with self.subTest(name):
+                self.assertEqual(list(segmenter.iter_segments()), expected)
+
+    def test_segments_emitted_when_blocks_close(self):
+        consumed = []
+
+        def lines():
+            for li in range(1000):
+                consumed.append(li)
+                yield f"def f{li}():" if li % 3 == 0 else ("    pass" if li % 3 else "")
+
+        segments = PythonSegmenter("a.py", lines()).iter_segments()
+        first = next(segments)
+        self.assertEqual((first.start, first.end), (0, 3))
+        self.assertLess(len(consumed), 10)
+
+    def test_one_shot_iterator_segment(self):
+        lines = ["def f():", "    return 1", ""]
+        document = PythonSegmenter("a.py", iter(lines)).segment()
+        self.assertEqual(list(document.lines()), lines)
+        self.assertEqual(
+            document.segments(), PythonSegmenter("a.py", lines).segment().segments()
+        )
+
+    def test_iter_blob_lines(self):
+        for data in [b"", b"\n", b"a", b"a\n", b"a\n\nb", b"a\r\nb\n\n"]:
+            with self.subTest(data=data):
+                self.assertEqual(list(iter_blob_lines(data)), list(BlobLines(data)))
+
+    def test_iter_file_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.py"
+            for text in ["", "\n", "a", "a\n", "a\n\nb", "a\r\nb\n\n"]:
+                with self.subTest(text=text):
+                    path.write_bytes(text.encode())
+                    self.assertEqual(
+                        list(iter_file_lines(path)), path.read_text().split("\n")
+                    )
+
+
+class TestSegmenterRegistry(unittest.TestCase):
+    def test_default_registry(self):
+        self.assertIs(default_registry.segmenter_for("pkg/a.py"), PythonSegmenter)
+        self.assertIs(
+            default_registry.segmenter_for(PurePosixPath("a.pyi")), PythonSegmenter
+        )
+        self.assertIsNone(default_registry.segmenter_for("README.md"))
+        self.assertFalse(default_registry.supports("pkg.py/Makefile"))
+
+    def test_register(self):
+        registry = SegmenterRegistry()
+        self.assertEqual(registry.suffixes, ())
+        registry.register(".pyw", PythonSegmenter)
+        self.assertTrue(registry.supports("a.pyw"))
+        self.assertEqual(registry.suffixes, (".pyw",))
+        with self.assertRaises(ValueError):
+            registry.register("py", PythonSegmenter)
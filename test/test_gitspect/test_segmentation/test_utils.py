@@ -1,6 +1,7 @@
 import unittest
 
-from gitspect.segmentation._utils import indent_len
+from gitspect.segmentation._utils import indent_len, line_indents, lookback_indices
+from gitspect.segmentation.python_segmentation import _lookback_index
 
 
 class TestSegmentationUtils(unittest.TestCase):
@@ -10,3 +11,20 @@ class TestSegmentationUtils(unittest.TestCase):
         self.assertEqual(indent_len("   a"), 3)
         self.assertEqual(indent_len("    a "), 4)
         self.assertEqual(indent_len("\ta  ", 5), 5)
+
+    def test_line_indents(self):
+        lines = ["a.", "  a\t", " \t ", "", "\ta  "]
+        self.assertEqual(line_indents(lines), [0, 2, -1, -1, 4])
+        self.assertEqual(line_indents(lines, 5)[-1], 5)
+
+    def test_lookback_indices(self):
+        for lines in [
+            ["@a(", "   b", ")", "c"],
+            ["  ", " a ", "b"],
+            ["A", " \t ", "b"],
+            ["x", "  @d", "  @e", "  def f():", "    pass", "  def g():"],
+        ]:
+            self.assertEqual(
+                lookback_indices(line_indents(lines)),
+                [_lookback_index(lines, li) for li in range(len(lines))],
+            )
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from gitspect.respository import GitRepository
+from gitspect.respository import _git_repository
+from test_gitspect._git_fixtures import make_repository
+
+# Generous enough for a loaded machine compiling without cached bytecode;
+# an accidental heavy import or process spawn per construction exceeds them.
+_import_budget_seconds = 0.5
+_construction_budget_seconds = 0.05
+_constructions = 100
+
+_import_probe = """
+import logging, sys, time
+started = time.perf_counter()
+import gitspect.segmentation.python_segmentation
+import gitspect.history
+print(time.perf_counter() - started)
+print(logging.getLogger().handlers == [])
+print("asyncio" in sys.modules)
+"""
+
+
+class TestStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = Path(cls._tmp.name)
+        make_repository(cls.path, [{"a.py": "a = 1\n"}])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_import_budget(self):
+        output = subprocess.run(
+            [sys.executable, "-c", _import_probe],
+            capture_output=True,
+            check=True,
+            text=True,
+            env={"PYTHONPATH": ":".join(sys.path)},
+        ).stdout.split()
+        self.assertLess(float(output[0]), _import_budget_seconds)
+        # importing configures no logging and does not pull in asyncio
+        self.assertEqual(output[1:], ["True", "False"])
+
+    def test_lazy_construction_spawns_no_process(self):
+        _git_repository._known_repositories.discard(self.path.resolve())
+        with mock.patch.object(_git_repository, "is_repo") as is_repo:
+            repo = GitRepository(self.path, lazy=True)
+            self.assertEqual(is_repo.call_count, 0)
+        self.assertEqual(len(list(repo.commits())), 1)
+
+    def test_validation_is_cached_per_path(self):
+        GitRepository(self.path)
+        with mock.patch.object(_git_repository, "is_repo") as is_repo:
+            GitRepository(self.path)
+            self.assertEqual(is_repo.call_count, 0)
+
+    def test_lazy_validation_fails_on_first_use(self):
+        with tempfile.TemporaryDirectory() as path:
+            repo = GitRepository(Path(path), lazy=True)
+            with self.assertRaises(ValueError):
+                list(repo.commits())
+
+    def test_not_a_directory(self):
+        with mock.patch.object(_git_repository, "is_repo") as is_repo:
+            with self.assertRaises(ValueError):
+                GitRepository(self.path / "a.py", lazy=True)
+            self.assertEqual(is_repo.call_count, 0)
+
+    def test_construction_budget(self):
+        GitRepository(self.path)
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                started = time.perf_counter()
+                for _ in range(_constructions):
+                    GitRepository(self.path, lazy=lazy)
+                elapsed = time.perf_counter() - started
+                self.assertLess(elapsed, _construction_budget_seconds)